@@ -0,0 +1,225 @@
+"""
+推理请求合批模块
+
+将并发到达的预测请求在短时间窗口内聚合为一个批次，
+在工作线程中执行一次批量前向计算，再把结果分发回各个请求。
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+import torch
+
+
+class BatchStats:
+    """合批运行统计：批大小直方图与请求延迟分位数"""
+
+    def __init__(self, max_batch_size: int, latency_window: int = 4096):
+        self.batch_size_hist = np.zeros(max_batch_size + 1, dtype=np.int64)
+        self.latencies = deque(maxlen=latency_window)  # 单位: 秒
+        self.total_requests = 0
+        self.total_batches = 0
+        self.total_errors = 0
+        self._lock = threading.Lock()
+
+    def record_batch(self, batch_size: int, latencies: list):
+        with self._lock:
+            self.batch_size_hist[batch_size] += 1
+            self.latencies.extend(latencies)
+            self.total_requests += batch_size
+            self.total_batches += 1
+
+    def record_error(self, batch_size: int):
+        with self._lock:
+            self.total_errors += batch_size
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            latencies = np.array(self.latencies, dtype=np.float64) * 1000.0
+            hist = self.batch_size_hist.copy()
+            total_requests = self.total_requests
+            total_batches = self.total_batches
+            total_errors = self.total_errors
+
+        if latencies.size:
+            p50, p90, p95, p99 = np.percentile(latencies, [50, 90, 95, 99])
+        else:
+            p50 = p90 = p95 = p99 = 0.0
+
+        return {
+            "total_requests": int(total_requests),
+            "total_batches": int(total_batches),
+            "total_errors": int(total_errors),
+            "mean_batch_size": float(total_requests / total_batches) if total_batches else 0.0,
+            "batch_size_histogram": {int(size): int(count) for size, count in enumerate(hist) if count},
+            "latency_ms": {"p50": float(p50), "p90": float(p90), "p95": float(p95), "p99": float(p99)},
+        }
+
+
+class BatchPredictor:
+    """
+    预测请求合批器
+
+    第一个请求到达后最多等待 max_wait_ms 毫秒（或凑满 max_batch_size 个请求），
+    然后在工作线程中对整个批次执行一次 model.forward。最多同时执行
+    max_concurrency 个批次，全部占满时新请求继续在队列中累积成更大的批次。
+    请求可以指定模型（见 backend/model_registry.py），同一批次只包含同一模型的请求。
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        forward_fn: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        executor: Optional[Executor] = None,
+        max_concurrency: int = 1,
+    ):
+        """
+        Args:
+            model: 已切换到 eval 模式的模型
+            max_batch_size: 单个批次的最大请求数
+            max_wait_ms: 批次收集的最长等待时间（毫秒）
+            forward_fn: 可选的批量前向函数，输入 (batch, channels, seq_len) 数组，返回 (batch, ...) 数组
+            executor: 执行 forward_fn 的线程池，默认创建单线程线程池
+            max_concurrency: 同时执行的最大批次数
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.forward_fn = forward_fn or self._forward
+        self.max_concurrency = max_concurrency
+        self.stats = BatchStats(max_batch_size)
+
+        self._pending = deque()
+        self._has_items = None
+        self._slots = None
+        self._task = None
+        self._dispatches = set()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-infer")
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        """在当前事件循环中启动合批任务"""
+        if self._task is None:
+            self._has_items = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止合批任务并让尚未处理的请求失败"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        while self._pending:
+            _, future, _, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("BatchPredictor 已停止"))
+        if self._owns_executor:
+            self._executor.shutdown(wait=False)
+
+    async def predict(self, x: np.ndarray, model=None) -> np.ndarray:
+        """
+        提交单个样本并等待其预测结果
+
+        Args:
+            x: numpy array, 形状为 (channels, sequence_length)
+            model: 可选，提供 run(inputs) 方法的模型（如 LoadedModel），默认使用 forward_fn
+
+        Returns:
+            numpy array: 该样本的模型输出
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((np.asarray(x, dtype=np.float32), future, time.perf_counter(), model))
+        self._has_items.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+            await self._slots.acquire()
+
+            # 在等待窗口内继续收集请求，直到凑满一个批次
+            deadline = loop.time() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._has_items.clear()
+                try:
+                    await asyncio.wait_for(self._has_items.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take_batch()
+            if self._pending:
+                self._has_items.set()
+            else:
+                self._has_items.clear()
+
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatch_done)
+
+    def _take_batch(self) -> list:
+        """取出与队首请求同一模型的至多 max_batch_size 个请求，其他请求保持原有顺序"""
+        if not self._pending:
+            return []
+        model = self._pending[0][3]
+        batch = []
+        others = deque()
+        while self._pending and len(batch) < self.max_batch_size:
+            item = self._pending.popleft()
+            (batch if item[3] is model else others).append(item)
+        if others:
+            others.extend(self._pending)
+            self._pending = others
+        return batch
+
+    def _dispatch_done(self, task):
+        self._dispatches.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch: list):
+        loop = asyncio.get_running_loop()
+        inputs = np.stack([x for x, _, _, _ in batch])
+        model = batch[0][3]
+        forward_fn = model.run if model is not None else self.forward_fn
+        try:
+            outputs = await loop.run_in_executor(self._executor, forward_fn, inputs)
+        except Exception as exc:
+            self.stats.record_error(len(batch))
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        finished = time.perf_counter()
+        for i, (_, future, _, _) in enumerate(batch):
+            if not future.done():
+                future.set_result(outputs[i])
+        self.stats.record_batch(len(batch), [finished - submitted for _, _, submitted, _ in batch])
+
+    def _forward(self, inputs: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return self.model(torch.from_numpy(inputs)).numpy()
@@ -0,0 +1,289 @@
+"""
+数据写入模块
+
+POST /ingest 提交的样本先进入有界的待写入队列，由单个写入任务把排队的多个批次
+合并后按时间顺序分块调用 SensorStore.append_many，块之间让出事件循环，监听器（滚动统计等）
+的逐样本处理不会长时间阻塞其他请求。队列中的样本数超过上限时立即拒绝新的请求（背压），
+并统计写入速率供压测使用。
+"""
+import asyncio
+import io
+import json
+import time
+from collections import deque
+from typing import Tuple
+
+import numpy as np
+
+from backend.sensor_store import SensorStore, to_epoch_seconds
+
+# 二进制写入格式：np.savez 生成的 .npz，包含 sensor_ids / timestamps / values 三个数组
+NPZ_CONTENT_TYPES = ("application/x-npz", "application/octet-stream")
+
+
+class IngestBackpressure(Exception):
+    """待写入样本数超过上限"""
+
+
+class IngestPartialWrite(Exception):
+    """
+    分块写入中途失败，请求的前 accepted 个样本（按时间顺序）已经写入存储
+
+    原始异常保存在 __cause__ 中。
+    """
+
+    def __init__(self, accepted: int, total: int, revision: int, cause: BaseException):
+        super().__init__(f"写入中途失败，已写入 {accepted}/{total} 个样本: {cause}")
+        self.accepted = accepted
+        self.total = total
+        self.revision = revision
+
+
+def validate_batch(sensor_ids, timestamps, values) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """检查三列均为一维数组且长度一致"""
+    if not (len(sensor_ids) == len(timestamps) == len(values)):
+        raise ValueError("sensor_ids、timestamps 与 values 长度必须一致")
+    if np.ndim(timestamps) != 1 or np.ndim(values) != 1:
+        raise ValueError("timestamps 与 values 必须为一维数组")
+    return sensor_ids, timestamps, values
+
+
+def parse_json_batch(body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    解析 JSON 批次
+
+    支持列式 {"sensor_ids": [...], "timestamps": [...], "values": [...]}
+    与按行 {"records": [[sensor_id, timestamp, flow], ...]} 两种格式；
+    timestamps 可以是 epoch 秒或 ISO 8601 字符串。
+    """
+    payload = json.loads(body)
+    if "records" in payload:
+        records = payload["records"]
+        sensor_ids = [record[0] for record in records]
+        timestamps = [record[1] for record in records]
+        values = [record[2] for record in records]
+    else:
+        sensor_ids, timestamps, values = payload["sensor_ids"], payload["timestamps"], payload["values"]
+
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype.kind in "US":
+        timestamps = timestamps.astype("datetime64[s]")
+    return validate_batch(
+        np.asarray(sensor_ids, dtype=str), to_epoch_seconds(timestamps), np.asarray(values, dtype=np.float32)
+    )
+
+
+def parse_npz_batch(body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """解析 np.savez 生成的二进制批次（不允许 pickle）"""
+    with np.load(io.BytesIO(body), allow_pickle=False) as arrays:
+        return validate_batch(
+            arrays["sensor_ids"].astype(str),
+            to_epoch_seconds(arrays["timestamps"]),
+            arrays["values"].astype(np.float32),
+        )
+
+
+class IngestStats:
+    """写入统计：累计样本数、最近一段时间的写入速率与单次写入耗时"""
+
+    def __init__(self, rate_window: float = 10.0):
+        self.rate_window = rate_window
+        self.total_samples = 0
+        self.total_requests = 0
+        self.total_writes = 0
+        self.rejected_requests = 0
+        self.failed_requests = 0
+        self.write_seconds = 0.0
+        self._recent = deque()  # (完成时间, 样本数)
+        self._started = time.perf_counter()
+
+    def record_write(self, n_requests: int, n_samples: int, seconds: float):
+        now = time.perf_counter()
+        self.total_requests += n_requests
+        self.total_samples += n_samples
+        self.total_writes += 1
+        self.write_seconds += seconds
+        self._recent.append((now, n_samples))
+        self._expire(now)
+
+    def _expire(self, now: float):
+        while self._recent and now - self._recent[0][0] > self.rate_window:
+            self._recent.popleft()
+
+    def samples_per_sec(self) -> float:
+        now = time.perf_counter()
+        self._expire(now)
+        window = min(self.rate_window, now - self._started)
+        return sum(n for _, n in self._recent) / window if window > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "total_samples": self.total_samples,
+            "total_requests": self.total_requests,
+            "total_writes": self.total_writes,
+            "rejected_requests": self.rejected_requests,
+            "failed_requests": self.failed_requests,
+            "samples_per_sec": self.samples_per_sec(),
+            "mean_write_ms": self.write_seconds / self.total_writes * 1000.0 if self.total_writes else 0.0,
+        }
+
+
+class IngestQueue:
+    """
+    带背压的写入队列
+
+    请求在事件循环中排队，写入任务每次取出全部排队的批次，按时间戳稳定排序后
+    分块写入；乱序的批次（早于该传感器最近写入的样本，见 SensorStore.append_many）单独拒绝，
+    不影响同一轮的其他批次。写入仍在事件循环中进行，与读取存储视图的请求互斥。
+    """
+
+    def __init__(self, store: SensorStore, max_pending: int = 100_000, max_write_samples: int = 16_384):
+        """
+        Args:
+            store: 写入目标
+            max_pending: 排队等待写入的最大样本数，超过时拒绝新的请求
+            max_write_samples: 单次 append_many 的最大样本数，更大的写入分块进行
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self.max_write_samples = max_write_samples
+        self.stats = IngestStats()
+
+        self._pending = deque()
+        self._pending_samples = 0
+        self._has_items = None
+        self._task = None
+
+    @property
+    def pending_samples(self) -> int:
+        return self._pending_samples
+
+    def start(self):
+        """在当前事件循环中启动写入任务"""
+        if self._task is None:
+            self._has_items = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止写入任务，尚未写入的请求失败"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            *_, future = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("IngestQueue 已停止"))
+        self._pending_samples = 0
+
+    async def submit(self, sensor_ids: np.ndarray, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """
+        提交一个批次并等待其写入
+
+        Returns:
+            int: 写入后的存储修订号
+
+        Raises:
+            IngestBackpressure: 队列已满
+            IngestPartialWrite: 分块写入中途失败，部分样本已经写入
+            ValueError: 乱序写入（时间戳早于该传感器最近写入的样本或不在保留的时间轴上）
+        """
+        n = len(values)
+        if self._pending_samples + n > self.max_pending:
+            self.stats.rejected_requests += 1
+            raise IngestBackpressure(f"待写入样本数已达上限 {self.max_pending}")
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((sensor_ids, timestamps, values, future))
+        self._pending_samples += n
+        self._has_items.set()
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+            self._has_items.clear()
+            batches = list(self._pending)
+            self._pending.clear()
+            self._pending_samples = 0
+            if batches:
+                await self._write(batches)
+            # 让出事件循环，使新请求可以在下一轮之前排队
+            await asyncio.sleep(0)
+
+    async def _write(self, batches: list):
+        start = time.perf_counter()
+
+        accepted = []
+        for sensor_ids, timestamps, values, future in batches:
+            try:
+                self.store.check_order(sensor_ids, timestamps)
+            except ValueError as exc:
+                self.stats.failed_requests += 1
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                accepted.append((sensor_ids, timestamps, values, future))
+        if not accepted:
+            return
+
+        sensor_ids = np.concatenate([batch[0] for batch in accepted])
+        timestamps = np.concatenate([batch[1] for batch in accepted])
+        values = np.concatenate([batch[2] for batch in accepted])
+
+        # 不同请求之间的时间戳可能交错，稳定排序后同一时间戳内保持提交顺序
+        order = np.argsort(timestamps, kind="stable")
+        sensor_ids, timestamps, values = sensor_ids[order], timestamps[order], values[order]
+        # 所有批次都已通过 check_order，按时间顺序写入时后面的块不会早于前面块写入的样本；
+        # 但块之间让出了事件循环，其他写入方、监听器异常或取消仍可能让后面的块失败
+        written, revision = 0, self.store.revision
+        try:
+            for offset in range(0, len(values), self.max_write_samples):
+                if offset:
+                    await asyncio.sleep(0)
+                chunk = slice(offset, offset + self.max_write_samples)
+                revision = self.store.append_many(sensor_ids[chunk], timestamps[chunk], values[chunk])
+                written = min(offset + self.max_write_samples, len(values))
+        except BaseException as exc:
+            self._fail_partial(accepted, order, written, revision, exc, start)
+            if not isinstance(exc, Exception):
+                raise
+            return
+
+        self.stats.record_write(len(accepted), len(values), time.perf_counter() - start)
+        for *_, future in accepted:
+            if not future.done():
+                future.set_result(revision)
+
+    def _fail_partial(self, accepted: list, order: np.ndarray, written: int, revision: int,
+                      exc: BaseException, start: float):
+        """
+        写入中途失败时按批次结算：已全部写入的批次成功，部分写入的批次报告已写入的样本数，
+        未写入的批次返回原始异常
+        """
+        sizes = [len(batch[2]) for batch in accepted]
+        # 排序后第 i 个样本属于哪个批次
+        owner = np.repeat(np.arange(len(accepted)), sizes)[order]
+        done = np.bincount(owner[:written], minlength=len(accepted))
+        error = exc if isinstance(exc, Exception) else RuntimeError("IngestQueue 已停止")
+
+        completed = 0
+        for (*_, future), size, count in zip(accepted, sizes, done):
+            if future.done():
+                continue
+            if count == size:
+                completed += 1
+                future.set_result(revision)
+            elif count:
+                partial = IngestPartialWrite(int(count), size, revision, error)
+                partial.__cause__ = error
+                future.set_exception(partial)
+            else:
+                future.set_exception(error)
+        self.stats.failed_requests += len(accepted) - completed
+        if written:
+            self.stats.record_write(completed, written, time.perf_counter() - start)
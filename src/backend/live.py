@@ -0,0 +1,259 @@
+"""
+实时推送模块
+
+/ws 客户端订阅传感器后只接收增量：新写入的样本与对应的最新预测。
+每个传感器的增量消息在一次发布周期内只计算、序列化一次，再分发给所有订阅者；
+每个客户端有独立的有界发送队列，跟不上的客户端会被要求重新同步，而不会拖慢其他客户端。
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+
+import numpy as np
+
+from backend.sensor_store import SensorStore, format_timestamps
+
+# 返回已序列化 JSON（bytes）的协程函数，参数为传感器ID；无可用结果时返回 None
+BodyFn = Callable[[str], Awaitable[Optional[bytes]]]
+
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+logger = logging.getLogger(__name__)
+
+
+class LiveClient:
+    """单个 WebSocket 连接的订阅与发送队列"""
+
+    def __init__(self, queue_size: int = 64):
+        self.subscriptions = set()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.resyncs = 0
+
+    def offer(self, message: str) -> bool:
+        """
+        非阻塞地放入一条消息
+
+        队列已满时丢弃积压的增量，只保留一条 resync 通知，客户端应重新获取快照。
+        通过 LiveHub.offer 发送时，溢出的客户端同时被取消全部订阅，重新订阅即可收到快照。
+
+        Returns:
+            bool: 消息是否入队
+        """
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC_MESSAGE)
+            self.resyncs += 1
+            return False
+
+    async def pump(self, send_text: Callable[[str], Awaitable[None]]):
+        """按顺序把队列中的消息发送给客户端（每个连接一个任务）"""
+        while True:
+            message = await self.queue.get()
+            await send_text(message)
+            self.sent += 1
+
+
+class LiveHub:
+    """
+    增量发布中心
+
+    作为 SensorStore 的监听器收集写入的样本，由后台发布任务按传感器合并成增量消息，
+    对每个有订阅者的传感器只计算一次预测并分发。
+    """
+
+    def __init__(self, store: SensorStore, predict_body: BodyFn, snapshot_body: BodyFn,
+                 queue_size: int = 64):
+        """
+        Args:
+            store: 传感器数据存储
+            predict_body: 返回传感器最新预测（与 /predict 响应相同）的协程函数
+            snapshot_body: 返回传感器当前数据快照（与 /data/current 响应相同）的协程函数
+            queue_size: 每个客户端发送队列的长度
+        """
+        self.store = store
+        self.predict_body = predict_body
+        self.snapshot_body = snapshot_body
+        self.queue_size = queue_size
+
+        self.clients = set()
+        self._subscribers = defaultdict(set)
+        self._pending = []
+        self._has_updates = None
+        self._loop = None
+        self._task = None
+
+        self.cycles = 0
+        self.errors = 0
+        self.messages = 0
+        self.last_cycle_ms = 0.0
+
+    def start(self, done_callback: Optional[Callable[[asyncio.Task], None]] = None):
+        """
+        在当前事件循环中启动发布任务
+
+        Args:
+            done_callback: 发布任务结束时的回调（例如记录异常），只在任务创建时注册
+        """
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._has_updates = asyncio.Event()
+            self._task = self._loop.create_task(self._run())
+            if done_callback is not None:
+                self._task.add_done_callback(done_callback)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # SensorStore 监听器接口
+
+    def on_write(self, rows, slots, old_values, new_values, timestamps):
+        if not self._subscribers or self._loop is None:
+            return
+        self._pending.append((rows.copy(), np.array(timestamps), new_values.copy()))
+        self._loop.call_soon_threadsafe(self._has_updates.set)
+
+    def on_evict(self, values, timestamps):
+        pass
+
+    # 客户端管理
+
+    def connect(self) -> LiveClient:
+        client = LiveClient(self.queue_size)
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: LiveClient):
+        self.unsubscribe(client, list(client.subscriptions))
+        self.clients.discard(client)
+
+    def offer(self, client: LiveClient, message: str) -> bool:
+        """
+        向客户端发送一条消息；发送队列溢出时取消该客户端的全部订阅
+
+        溢出后客户端只会收到 resync，重新订阅时每个传感器都会再发送一次快照。
+
+        Returns:
+            bool: 消息是否入队
+        """
+        if client.offer(message):
+            return True
+        self.unsubscribe(client, list(client.subscriptions))
+        return False
+
+    async def subscribe(self, client: LiveClient, sensor_ids):
+        """订阅传感器，并先发送一次当前快照与预测"""
+        for sensor_id in sensor_ids:
+            if sensor_id not in self.store or sensor_id in client.subscriptions:
+                continue
+            client.subscriptions.add(sensor_id)
+            self._subscribers[sensor_id].add(client)
+            snapshot = await self.snapshot_body(sensor_id)
+            prediction = await self.predict_body(sensor_id)
+            if sensor_id not in client.subscriptions:
+                # 等待期间发送队列溢出（订阅已被取消）或客户端取消了订阅
+                continue
+            self.offer(client, self._message("snapshot", sensor_id, snapshot, prediction))
+
+    def unsubscribe(self, client: LiveClient, sensor_ids):
+        for sensor_id in sensor_ids:
+            client.subscriptions.discard(sensor_id)
+            subscribers = self._subscribers.get(sensor_id)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._subscribers[sensor_id]
+
+    # 发布
+
+    async def _run(self):
+        while True:
+            await self._has_updates.wait()
+            self._has_updates.clear()
+            pending, self._pending = self._pending, []
+            if not pending:
+                continue
+            try:
+                await self._publish(pending)
+            except Exception:
+                # 单个周期失败（例如序列化异常）只丢弃这一批增量，发布任务继续运行
+                self.errors += 1
+                logger.exception("实时推送发布周期失败，丢弃 %d 批增量", len(pending))
+
+    async def _publish(self, pending: list):
+        start = time.perf_counter()
+        rows = np.concatenate([p[0] for p in pending])
+        timestamps = np.concatenate([p[1] for p in pending])
+        values = np.concatenate([p[2] for p in pending])
+
+        # 按 (行, 时间戳) 稳定排序一次，每个传感器的样本是其中连续的一段
+        order = np.lexsort((timestamps, rows))
+        rows, timestamps, values = rows[order], timestamps[order], values[order]
+        unique_rows, bounds = np.unique(rows, return_index=True)
+        bounds = np.append(bounds, len(rows)).tolist()
+
+        deltas = []
+        for i, row in enumerate(unique_rows.tolist()):
+            sensor_id = self.store.sensor_id(row)
+            if sensor_id not in self._subscribers:
+                continue
+            segment = slice(bounds[i], bounds[i + 1])
+            row_values = values[segment]
+            deltas.append((sensor_id, json.dumps({
+                "timestamps": format_timestamps(timestamps[segment]),
+                "values": np.where(np.isnan(row_values), None, row_values).tolist()
+            }, allow_nan=False).encode("utf-8")))
+
+        # 各传感器的预测并发提交，由合批器合并为少数几次前向计算
+        predictions = await asyncio.gather(
+            *(self.predict_body(sensor_id) for sensor_id, _ in deltas), return_exceptions=True
+        )
+        for (sensor_id, delta), prediction in zip(deltas, predictions):
+            if isinstance(prediction, BaseException):
+                # 推理失败时仍推送新样本，不中断发布任务
+                prediction = None
+
+            # 同一条消息分发给所有订阅者
+            message = self._message("delta", sensor_id, delta, prediction)
+            for client in list(self._subscribers.get(sensor_id, ())):
+                self.offer(client, message)
+                self.messages += 1
+
+        self.cycles += 1
+        self.last_cycle_ms = (time.perf_counter() - start) * 1000.0
+
+    @staticmethod
+    def _message(kind: str, sensor_id: str, data: Optional[bytes], prediction: Optional[bytes]) -> str:
+        # 直接拼接已序列化的响应体，避免重复序列化
+        return '{"type":%s,"sensor_id":%s,"data":%s,"prediction":%s}' % (
+            json.dumps(kind),
+            json.dumps(sensor_id, ensure_ascii=False),
+            (data or b"null").decode("utf-8"),
+            (prediction or b"null").decode("utf-8"),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "subscribed_sensors": len(self._subscribers),
+            "subscriptions": sum(len(c.subscriptions) for c in self.clients),
+            "publish_cycles": self.cycles,
+            "publish_errors": self.errors,
+            "messages": self.messages,
+            "messages_sent": sum(c.sent for c in self.clients),
+            "resyncs": sum(c.resyncs for c in self.clients),
+            "last_cycle_ms": self.last_cycle_ms,
+        }
@@ -1,12 +1,43 @@
-from fastapi import FastAPI
+import sys
+import os
+import asyncio
+import logging
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 冷启动计时：pandas / uvicorn / OpenCV / scikit-learn 等不在请求路径上的依赖只在使用时导入
+_import_started = time.perf_counter()
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 import numpy as np
-import torch
-from datetime import datetime, timedelta
-import pandas as pd
-from models.traffic_cnn import TrafficCNN
-from utils.data_processor import DataProcessor
+from datetime import datetime
+from typing import Optional
+_torch_started = time.perf_counter()
+import torch  # 推理运行时，单独计时（冷启动的主要部分）
+_torch_seconds = time.perf_counter() - _torch_started
+from models.export import load_inference_model, artifact_path
+from utils.normalization import NormalizationState, NORM_SUFFIX
+from utils.synthetic import SyntheticTrafficGenerator
+from utils.windowing import autoregressive_rollout, run_rollout_async
+from backend.batching import BatchPredictor
+from backend.serving import ServingConfig, ModelPool
+from backend.model_registry import ModelRegistry
+from backend.sensor_store import SensorStore, format_timestamps, hour_of_day
+from backend.rolling_stats import RollingStatistics
+from backend.response_cache import ResponseCache
+from backend.metrics import MetricsRegistry, MetricsMiddleware, CONTENT_TYPE as METRICS_CONTENT_TYPE, process_memory
+from backend.live import LiveHub
+from backend.scheduler import PredictionScheduler
+from backend.ingest import (
+    IngestQueue, IngestBackpressure, IngestPartialWrite, parse_json_batch, parse_npz_batch, NPZ_CONTENT_TYPES
+)
+from backend.startup import StartupReport
+
+startup_report = StartupReport()
+startup_report.record("import_torch", _torch_seconds)
+startup_report.record("import_other", time.perf_counter() - _import_started - _torch_seconds)
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Traffic Flow Prediction API")
 
@@ -19,151 +50,757 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 模型输入序列长度（与 models/train.py 训练时保持一致）
+SEQUENCE_LENGTH = 12
+
+# 模型文件：train.py 保存的检查点 (.pth) 或 models/export.py 导出的 .ts / .onnx
+# MODEL_RUNTIME=auto 时优先加载检查点旁边的 TorchScript 产物，int8 加载 models/quantize.py 生成的 .int8.ts
+MODEL_PATH = os.getenv("MODEL_PATH")
+MODEL_RUNTIME = os.getenv("MODEL_RUNTIME", "auto")
+
+# 按传感器/路段选择模型的注册表（JSON，见 backend/model_registry.py），未映射的传感器使用 MODEL_PATH
+MODEL_REGISTRY = os.getenv("MODEL_REGISTRY")
+MODEL_REGISTRY_MAX_MB = float(os.getenv("MODEL_REGISTRY_MAX_MB", "512"))
+
+# /predict?horizon=H 允许的最大预测步数
+MAX_PREDICT_HORIZON = int(os.getenv("MAX_PREDICT_HORIZON", "24"))
+
+# 数据写入配置：排队样本数上限（超过时返回 429）与单个请求体大小上限
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "100000"))
+INGEST_MAX_BODY_BYTES = int(os.getenv("INGEST_MAX_BODY_BYTES", str(16 * 1024 * 1024)))
+INGEST_MAX_WRITE_SAMPLES = int(os.getenv("INGEST_MAX_WRITE_SAMPLES", "16384"))
+
+# 预测预计算：每次数据修订后（或每隔 PREDICTION_TICK_SECONDS 秒）为所有传感器批量计算
+# PREDICTION_HORIZON 步预测，/predict 直接查表
+PREDICTION_SCHEDULER = os.getenv("PREDICTION_SCHEDULER", "1") == "1"
+PREDICTION_HORIZON = min(int(os.getenv("PREDICTION_HORIZON", "12")), MAX_PREDICT_HORIZON)
+PREDICTION_TICK_SECONDS = float(os.getenv("PREDICTION_TICK_SECONDS", "0"))
+
+# 实时推送：每个 WebSocket 客户端的发送队列长度，积压超过后要求客户端重新同步
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "64"))
+
+# 推理合批配置
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+
+# 传感器数据存储配置
+STORE_CAPACITY = int(os.getenv("STORE_CAPACITY", "1000"))
+SIMULATED_SENSORS = int(os.getenv("SIMULATED_SENSORS", "1"))
+DEFAULT_SENSOR_ID = "sensor_0"
+SAMPLE_INTERVAL_SECONDS = 3600
+
+# 响应缓存配置
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+# 推理线程与模型副本配置（见 backend/serving.py 中的环境变量说明）
+serving_config = ServingConfig()
+
 # 初始化全局变量
-current_data = None
+sensor_store = None
+rolling_stats = None
 model = None
-data_processor = None
+model_runtime = None
+model_pool = None
+model_registry = None
+normalizer = None
+normalizer_source = None
+batch_predictor = None
+response_cache = None
+ingest_queue = None
+live_hub = None
+prediction_scheduler = None
+
+# 监控指标（GET /metrics，Prometheus 文本格式）
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    "traffic_http_requests_total", "HTTP requests by route template and status", ("method", "path", "status")
+)
+http_latency = metrics.histogram(
+    "traffic_http_request_duration_seconds", "HTTP request latency by route template", ("method", "path")
+)
+prediction_stages = metrics.histogram(
+    "traffic_prediction_stage_seconds", "Time spent in each prediction stage", ("endpoint", "stage")
+)
+app.add_middleware(MetricsMiddleware, requests=http_requests, latency=http_latency)
 
 def init_app():
     """初始化应用程序"""
-    global current_data, model, data_processor
+    global sensor_store, rolling_stats, model, model_runtime, model_pool, model_registry, normalizer, normalizer_source, batch_predictor, response_cache, ingest_queue, live_hub, prediction_scheduler
     
-    if current_data is None:
-        current_data = generate_traffic_data()
+    if sensor_store is None:
+        with startup_report.phase("data_warmup"):
+            sensor_store = create_sensor_store()
+            rolling_stats = RollingStatistics(sensor_store)
     
     if model is None:
-        model = TrafficCNN()
-        # 如果有预训练模型，加载它
-        # model.load_state_dict(torch.load('best_model.pth'))
-        model.eval()
+        serving_config.apply()
+        # 权重只在这里加载一次（检查点以 mmap 方式读取），之后各副本与预计算共享同一模型池
+        with startup_report.phase("model_load"):
+            model, model_runtime = load_inference_model(
+                MODEL_PATH,
+                sequence_length=SEQUENCE_LENGTH,
+                runtime=MODEL_RUNTIME,
+                intra_op_threads=serving_config.intra_op_threads
+            )
+            model_pool = ModelPool(model, replicas=serving_config.replicas)
+        with startup_report.phase("model_warmup"):
+            warmup_model_pool()
     
-    if data_processor is None:
-        data_processor = DataProcessor()
-
-def generate_traffic_data(n_samples: int = 1000) -> pd.DataFrame:
-    """生成模拟交通数据"""
-    dates = [datetime.now() - timedelta(hours=i) for i in range(n_samples)]
-    dates.reverse()
+    if model_registry is None and MODEL_REGISTRY:
+        # 只读取映射，模型在第一次请求时加载
+        model_registry = ModelRegistry.from_file(
+            MODEL_REGISTRY,
+            max_bytes=int(MODEL_REGISTRY_MAX_MB * 1024 * 1024),
+            sequence_length=SEQUENCE_LENGTH,
+            runtime=MODEL_RUNTIME,
+            intra_op_threads=serving_config.intra_op_threads
+        )
     
-    # 生成基础流量
-    hours = np.array([t.hour for t in dates])
-    weekdays = np.array([t.weekday() for t in dates])
+    if normalizer is None:
+        with startup_report.phase("normalizer_load"):
+            normalizer, normalizer_source = load_normalizer()
     
-    # 基础日变化模式（双峰模式：早晚高峰）
-    morning_peak = np.exp(-((hours - 8) ** 2) / 8)  # 早高峰约在8点
-    evening_peak = np.exp(-((hours - 18) ** 2) / 8)  # 晚高峰约在18点
-    daily_pattern = 1000 + 1500 * (morning_peak + evening_peak)
+    if batch_predictor is None:
+        batch_predictor = BatchPredictor(
+            model,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+            forward_fn=model_pool.run,
+            executor=model_pool.executor,
+            max_concurrency=model_pool.size
+        )
+    
+    if response_cache is None:
+        response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE)
     
-    # 工作日/周末模式
-    weekday_factor = np.where(weekdays < 5, 1.2, 0.8)  # 工作日流量较大
+    if ingest_queue is None:
+        ingest_queue = IngestQueue(
+            sensor_store, max_pending=INGEST_MAX_PENDING, max_write_samples=INGEST_MAX_WRITE_SAMPLES
+        )
     
-    # 随机波动
-    base_noise = np.random.normal(0, 0.1, n_samples)
-    trend_noise = np.random.normal(0, 0.05, n_samples).cumsum() / 100
+    if live_hub is None:
+        live_hub = LiveHub(
+            sensor_store,
+            predict_body=lambda sensor_id: cached_body("predict", sensor_id, lambda: compute_prediction(sensor_id)),
+            snapshot_body=lambda sensor_id: cached_body(
+                "data/current", sensor_id, lambda: compute_current_data(sensor_id)
+            ),
+            queue_size=LIVE_QUEUE_SIZE
+        )
+        sensor_store.add_listener(live_hub)
+    
+    if prediction_scheduler is None and PREDICTION_SCHEDULER:
+        prediction_scheduler = PredictionScheduler(
+            sensor_store,
+            normalizer,
+            forward_fn=model_pool.run,
+            executor=model_pool.executor,
+            sequence_length=SEQUENCE_LENGTH,
+            horizon=PREDICTION_HORIZON,
+            sample_interval=SAMPLE_INTERVAL_SECONDS,
+            tick_seconds=PREDICTION_TICK_SECONDS,
+            # 使用注册表模型的传感器按需计算，不在每个周期加载全部模型
+            include=(lambda sensor_id: not model_registry.is_mapped(sensor_id)) if model_registry else None
+        )
+        sensor_store.add_listener(prediction_scheduler)
+
+def create_sensor_store() -> SensorStore:
+    """创建传感器存储并写入模拟数据"""
+    store = SensorStore(capacity=STORE_CAPACITY, initial_sensors=max(SIMULATED_SENSORS, 1))
+    # 所有模拟传感器共享同一时间轴，在一次写入中完成，时间槽只开辟一次
+    if SIMULATED_SENSORS > 0:
+        generator = SyntheticTrafficGenerator(n_sensors=SIMULATED_SENSORS)
+        timestamps, values = generator.generate(STORE_CAPACITY, end_time=datetime.now())
+        sensor_ids = [DEFAULT_SENSOR_ID] + [f"sensor_{i}" for i in range(1, SIMULATED_SENSORS)]
+        store.append_many(
+            np.repeat(sensor_ids, STORE_CAPACITY),
+            np.tile(timestamps, SIMULATED_SENSORS),
+            values.astype(int).ravel()
+        )
+    return store
+
+def warmup_model_pool():
+    """
+    在每个副本上以单样本与最大批大小各执行一次前向计算
+
+    TorchScript 的前几次调用会做图优化，预热后第一个请求不再承担这部分延迟。
+    """
+    for batch_size in (1, BATCH_MAX_SIZE):
+        inputs = np.zeros((batch_size, 1, SEQUENCE_LENGTH), dtype=np.float32)
+        for _ in range(model_pool.size):
+            model_pool.run(inputs)
+
+def load_normalizer():
+    """
+    加载检查点旁边保存的归一化状态（train.py 生成的 .norm.json）
+
+    不存在时用启动时存储中的数据按传感器计算一次，之后不再重新拟合。
+
+    Returns:
+        tuple: (NormalizationState, 来源)
+    """
+    if MODEL_PATH:
+        path = artifact_path(MODEL_PATH, NORM_SUFFIX)
+        if os.path.exists(path):
+            return NormalizationState.load(path), path
     
-    # 组合所有因素
-    traffic_flow = (daily_pattern * weekday_factor * (1 + base_noise + trend_noise))
-    traffic_flow = np.maximum(traffic_flow, 0)  # 确保流量非负
+    sensor_ids = sensor_store.sensor_ids
+    timestamps, values = sensor_store.latest_windows(sensor_ids, sensor_store.capacity)
+    return NormalizationState.fit(values, timestamps, sensor_ids=sensor_ids), "sensor_store"
+
+def generate_traffic_data(n_samples: int = 1000, end_time: datetime = None):
+    """生成模拟交通数据（DataFrame，包含 timestamp 与 traffic_flow 两列）"""
+    import pandas as pd
     
+    timestamps, values = SyntheticTrafficGenerator().generate(n_samples, end_time=end_time)
     return pd.DataFrame({
-        'timestamp': dates,
-        'traffic_flow': traffic_flow.astype(int)
+        'timestamp': timestamps,
+        'traffic_flow': values[0].astype(int)
     })
 
 @app.on_event("startup")
 async def startup_event():
     """启动时初始化应用"""
     init_app()
+    logger.info(startup_report.format())
+    batch_predictor.start()
+    ingest_queue.start()
+    live_hub.start(done_callback=log_task_exception)
+    if prediction_scheduler is not None:
+        prediction_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """关闭时停止推理合批与数据写入任务"""
+    if prediction_scheduler is not None:
+        await prediction_scheduler.stop()
+    if live_hub is not None:
+        await live_hub.stop()
+    if ingest_queue is not None:
+        await ingest_queue.stop()
+    if batch_predictor is not None:
+        await batch_predictor.stop()
+    if model_pool is not None:
+        model_pool.shutdown()
+    if model_registry is not None:
+        model_registry.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Traffic Flow Prediction API"}
 
-@app.get("/data/current")
-async def get_current_data():
-    """获取当前交通数据"""
-    global current_data
-    if current_data is None:
+def require_sensor(sensor_id: str):
+    """确认传感器存在，不存在时返回 404"""
+    if sensor_store is None:
+        init_app()
+    if sensor_id not in sensor_store:
+        raise HTTPException(status_code=404, detail=f"未知传感器: {sensor_id}")
+
+def get_sensor_window(sensor_id: str, size: int = None):
+    """读取传感器最新窗口"""
+    require_sensor(sensor_id)
+    return sensor_store.window(sensor_id, size)
+
+def finite_or_none(value) -> Optional[float]:
+    """NaN / inf 转换为 None（响应按 allow_nan=False 序列化）"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def nan_to_none(values: np.ndarray) -> list:
+    """缺失样本（NaN）输出为 null"""
+    result = values.astype(object)
+    result[np.isnan(values)] = None
+    return result.tolist()
+
+def require_complete_window(sensor_id: str, values: np.ndarray):
+    """
+    输入窗口必须有 SEQUENCE_LENGTH 个样本且没有缺失，否则返回 409
+
+    所有传感器共享同一时间轴，其他传感器写入新时间点时，未写入的传感器在该时间点为 NaN。
+    """
+    if len(values) < SEQUENCE_LENGTH:
+        raise HTTPException(status_code=409, detail=f"传感器 {sensor_id} 数据不足 {SEQUENCE_LENGTH} 个样本")
+    if np.isnan(values).any():
+        raise HTTPException(status_code=409, detail=f"传感器 {sensor_id} 最近 {SEQUENCE_LENGTH} 个样本中有缺失值")
+
+def require_normalization(sensor_normalizer: NormalizationState, sensor_id: str):
+    """
+    模型的归一化参数必须覆盖该传感器，否则返回 409
+
+    按小时归一化的参数没有全局的小时参数可以回退，未知传感器（且没有 default_sensor）无法预测。
+    """
+    if not sensor_normalizer.supports(sensor_id):
+        raise HTTPException(
+            status_code=409,
+            detail=f"模型的按小时归一化参数中没有传感器 {sensor_id}，且未设置 default_sensor"
+        )
+
+def cache_key(endpoint: str, sensor_id: str, *params):
+    # 注册表替换检查点后，该传感器缓存的预测随之失效
+    model_revision = model_registry.revision(sensor_id) if model_registry is not None else 0
+    return (endpoint, sensor_id, params, sensor_store.data_version(sensor_id), model_revision)
+
+async def cached_response(request: Request, endpoint: str, sensor_id: str, compute, *params):
+    """按 (接口, 参数, 数据版本) 返回缓存的响应"""
+    require_sensor(sensor_id)
+    return await response_cache.respond(
+        request, cache_key(endpoint, sensor_id, *params), compute,
+        current_key=lambda: cache_key(endpoint, sensor_id, *params)
+    )
+
+async def cached_body(endpoint: str, sensor_id: str, compute, *params) -> Optional[bytes]:
+    """与 cached_response 共享缓存条目，返回序列化后的响应体；计算失败（如数据不足）时返回 None"""
+    try:
+        entry = await response_cache.get_or_compute(
+            cache_key(endpoint, sensor_id, *params), compute,
+            current_key=lambda: cache_key(endpoint, sensor_id, *params)
+        )
+    except HTTPException:
+        return None
+    return entry.body
+
+@app.post("/ingest")
+async def ingest_samples(request: Request):
+    """
+    批量写入传感器样本
+
+    请求体为 JSON（列式或按行，见 backend/ingest.py），或 Content-Type 为
+    application/x-npz 的 np.savez 二进制数据。未知传感器自动创建。
+    """
+    if ingest_queue is None:
+        init_app()
+    
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > INGEST_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"请求体超过 {INGEST_MAX_BODY_BYTES} 字节")
+    body = await request.body()
+    if len(body) > INGEST_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"请求体超过 {INGEST_MAX_BODY_BYTES} 字节")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type in NPZ_CONTENT_TYPES:
+            sensor_ids, timestamps, values = parse_npz_batch(body)
+        else:
+            sensor_ids, timestamps, values = parse_json_batch(body)
+    except (ValueError, KeyError, TypeError, IndexError, OSError) as exc:
+        raise HTTPException(status_code=400, detail=f"无法解析写入数据: {exc}")
+    
+    try:
+        revision = await ingest_queue.submit(sensor_ids, timestamps, values)
+    except IngestBackpressure as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={"Retry-After": "1"})
+    except IngestPartialWrite as exc:
+        # 已写入的样本不会回滚，客户端只需重试剩余部分
+        status_code = 409 if isinstance(exc.__cause__, ValueError) else 500
+        raise HTTPException(status_code=status_code, detail={
+            "message": str(exc), "accepted": exc.accepted, "total": exc.total, "revision": exc.revision
+        })
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    
+    return {"accepted": int(len(values)), "revision": revision}
+
+@app.get("/ingest/stats")
+async def get_ingest_stats():
+    """获取数据写入统计信息"""
+    if ingest_queue is None:
+        init_app()
+    return {
+        "pending_samples": ingest_queue.pending_samples,
+        "max_pending": ingest_queue.max_pending,
+        "sensors": len(sensor_store.sensor_ids),
+        "latest_timestamp": sensor_store.latest_timestamp,
+        **ingest_queue.stats.snapshot()
+    }
+
+@app.websocket("/ws")
+async def live_updates(websocket: WebSocket):
+    """
+    实时推送
+
+    客户端发送 {"action": "subscribe" | "unsubscribe", "sensor_ids": [...]}；
+    订阅后先收到一条 snapshot（当前数据与预测），之后只收到 delta（新样本与新预测）。
+    收到 resync 时说明客户端处理过慢、增量已被丢弃，应重新订阅以获取快照。
+    """
+    if live_hub is None:
         init_app()
+    live_hub.start(done_callback=log_task_exception)
     
-    data = current_data.tail(100).copy()
+    await websocket.accept()
+    client = live_hub.connect()
+    sender = asyncio.create_task(client.pump(websocket.send_text))
+    sender.add_done_callback(log_task_exception)
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                action = message.get("action")
+                sensor_ids = [str(sensor_id) for sensor_id in message.get("sensor_ids", [])]
+            except (ValueError, AttributeError, TypeError):
+                live_hub.offer(client, '{"type":"error","detail":"无法解析订阅消息"}')
+                continue
+            
+            if action == "subscribe":
+                await live_hub.subscribe(client, sensor_ids)
+            elif action == "unsubscribe":
+                live_hub.unsubscribe(client, sensor_ids)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_hub.disconnect(client)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+def log_task_exception(task: asyncio.Task):
+    """后台任务异常结束时记录异常（否则只在任务被回收时打印警告）"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("后台任务异常结束: %r", task.exception(), exc_info=task.exception())
+
+@app.get("/ws/stats")
+async def get_live_stats():
+    """获取实时推送统计信息"""
+    if live_hub is None:
+        init_app()
+    return live_hub.stats()
+
+@app.get("/data/current")
+async def get_current_data(request: Request, sensor_id: str = DEFAULT_SENSOR_ID):
+    """获取当前交通数据"""
+    return await cached_response(request, "data/current", sensor_id, lambda: compute_current_data(sensor_id))
+
+def compute_current_data(sensor_id: str) -> dict:
+    timestamps, values = get_sensor_window(sensor_id, 100)
     return {
-        "timestamps": data['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
-        "values": data['traffic_flow'].tolist()
+        "timestamps": format_timestamps(timestamps),
+        "values": nan_to_none(values)
     }
 
 @app.get("/predict")
-async def predict_traffic():
-    """预测交通流量"""
-    global current_data, model, data_processor
-    if current_data is None or model is None or data_processor is None:
+async def predict_traffic(
+    request: Request,
+    sensor_id: str = DEFAULT_SENSOR_ID,
+    horizon: Optional[int] = Query(None, ge=1, le=MAX_PREDICT_HORIZON)
+):
+    """预测交通流量，指定 horizon 时返回未来 horizon 小时的完整预测轨迹"""
+    if horizon is None:
+        return await cached_response(request, "predict", sensor_id, lambda: compute_prediction(sensor_id))
+    return await cached_response(
+        request, "predict", sensor_id, lambda: compute_forecast(sensor_id, horizon), horizon
+    )
+
+async def get_sensor_model(sensor_id: str):
+    """
+    注册表中传感器专用的模型，使用默认模型时返回 None
+
+    已加载的模型直接返回；需要从磁盘加载时在注册表的线程中进行，不阻塞事件循环。
+    """
+    if model_registry is None:
+        return None
+    model_key = model_registry.model_key(sensor_id)
+    if model_key is None:
+        return None
+    entry = model_registry.cached(model_key)
+    if entry is None:
+        try:
+            entry = await asyncio.get_running_loop().run_in_executor(
+                model_registry.executor, model_registry.get, model_key
+            )
+        except (OSError, RuntimeError, ValueError) as exc:
+            raise HTTPException(status_code=503, detail=f"模型 {model_key} 加载失败: {exc}")
+    return entry
+
+def model_normalizer(sensor_model):
+    """模型检查点旁边有 .norm.json 时使用其归一化参数，否则使用服务的默认参数"""
+    if sensor_model is not None and sensor_model.normalizer is not None:
+        return sensor_model.normalizer
+    return normalizer
+
+async def compute_prediction(sensor_id: str) -> dict:
+    global model, normalizer, batch_predictor
+    if model is None or normalizer is None or batch_predictor is None:
         init_app()
     
-    # 准备输入数据
-    recent_data = current_data.tail(24)['traffic_flow'].values
-    normalized_data = data_processor.scaler.fit_transform(recent_data.reshape(-1, 1))
+    # 优先使用后台预计算的结果（只覆盖使用默认模型的传感器）
+    with prediction_stages.time("predict", "lookup"):
+        sensor_model = await get_sensor_model(sensor_id)
+        scheduled = prediction_scheduler.lookup(sensor_id) if prediction_scheduler and sensor_model is None else None
+    if scheduled is not None:
+        return {
+            "timestamp": format_timestamps(scheduled.timestamps)[0],
+            "predicted_value": float(scheduled.values[0])
+        }
     
-    # 转换为PyTorch张量
-    x = torch.FloatTensor(normalized_data).view(1, 1, -1)
+    # 准备输入数据（使用训练时保存的归一化参数）
+    with prediction_stages.time("predict", "preprocess"):
+        timestamps, recent_data = get_sensor_window(sensor_id, SEQUENCE_LENGTH)
+        require_complete_window(sensor_id, recent_data)
+        sensor_normalizer = model_normalizer(sensor_model)
+        require_normalization(sensor_normalizer, sensor_id)
+        normalized_data = sensor_normalizer.transform(recent_data, sensor_id, timestamps)
     
-    # 预测
-    with torch.no_grad():
-        prediction = model(x)
-        prediction = data_processor.scaler.inverse_transform(prediction.numpy().reshape(-1, 1))[0][0]
+    # 预测（与使用同一模型的并发请求合并为一个批次，包含在合批队列中的等待时间）
+    with prediction_stages.time("predict", "forward"):
+        output = await batch_predictor.predict(normalized_data.reshape(1, -1), model=sensor_model)
     
     # 生成预测时间点
-    next_time = current_data['timestamp'].iloc[-1] + timedelta(hours=1)
+    with prediction_stages.time("predict", "postprocess"):
+        next_time = timestamps[-1] + SAMPLE_INTERVAL_SECONDS
+        prediction = sensor_normalizer.inverse_transform(np.ravel(output)[:1], sensor_id, [next_time])[0]
+        return {
+            "timestamp": format_timestamps([next_time])[0],
+            "predicted_value": float(prediction)
+        }
+
+async def compute_forecast(sensor_id: str, horizon: int) -> dict:
+    global model, normalizer, batch_predictor
+    if model is None or normalizer is None or batch_predictor is None:
+        init_app()
     
+    with prediction_stages.time("forecast", "lookup"):
+        sensor_model = await get_sensor_model(sensor_id)
+        scheduled = (prediction_scheduler.lookup(sensor_id, horizon)
+                     if prediction_scheduler and sensor_model is None else None)
+    if scheduled is not None:
+        return {
+            "horizon": horizon,
+            "timestamps": format_timestamps(scheduled.timestamps),
+            "predicted_values": scheduled.values.tolist()
+        }
+    
+    with prediction_stages.time("forecast", "preprocess"):
+        timestamps, recent_data = get_sensor_window(sensor_id, SEQUENCE_LENGTH)
+        require_complete_window(sensor_id, recent_data)
+        sensor_normalizer = model_normalizer(sensor_model)
+        require_normalization(sensor_normalizer, sensor_id)
+        window = sensor_normalizer.transform(recent_data, sensor_id, timestamps).astype(np.float32)
+    
+    # 服务端自回归展开：每一步都经过合批器，与其他请求的当前步合并前向计算；
+    # 多输出模型一次返回多步，循环次数相应减少
+    with prediction_stages.time("forecast", "forward"):
+        rollout = autoregressive_rollout(window.reshape(1, -1), horizon, SEQUENCE_LENGTH)
+        predictions = (await run_rollout_async(
+            rollout, lambda x: batch_predictor.predict(x, model=sensor_model)
+        ))[0]
+    
+    with prediction_stages.time("forecast", "postprocess"):
+        future_times = timestamps[-1] + SAMPLE_INTERVAL_SECONDS * np.arange(1, horizon + 1)
+        values = sensor_normalizer.inverse_transform(predictions, sensor_id, future_times)
+        return {
+            "horizon": horizon,
+            "timestamps": format_timestamps(future_times),
+            "predicted_values": values.tolist()
+        }
+
+@app.get("/predict/stats")
+async def get_prediction_stats():
+    """获取推理合批统计信息"""
+    if batch_predictor is None:
+        init_app()
+    
+    return {
+        "queue_depth": batch_predictor.queue_depth,
+        "max_batch_size": batch_predictor.max_batch_size,
+        "max_wait_ms": batch_predictor.max_wait * 1000.0,
+        **batch_predictor.stats.snapshot()
+    }
+
+@app.get("/predict/schedule")
+async def get_schedule_stats():
+    """获取预测预计算的周期耗时与结果新鲜度"""
+    if model is None:
+        init_app()
+    if prediction_scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_scheduler.stats()}
+
+@app.get("/serving")
+async def get_serving_status():
+    """获取推理线程配置与各模型副本利用率"""
+    if model_pool is None:
+        init_app()
     return {
-        "timestamp": next_time.strftime('%Y-%m-%d %H:%M:%S'),
-        "predicted_value": float(prediction)
+        **serving_config.to_dict(),
+        "model_path": MODEL_PATH,
+        "model_runtime": model_runtime,
+        "normalization": {"source": normalizer_source, "per_hour": normalizer.per_hour},
+        "startup": startup_report.to_dict(),
+        "replica_utilization": model_pool.utilization()
     }
 
+@app.get("/models")
+async def get_model_registry():
+    """获取模型注册表状态：已加载的模型、占用内存与命中/淘汰次数"""
+    if model is None:
+        init_app()
+    if model_registry is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_registry.stats()}
+
+@app.post("/models/{model_key}")
+async def swap_model(model_key: str, request: Request):
+    """
+    把模型键切换到新的检查点：{"checkpoint": "model_20240101_120000.pth"}
+
+    新模型加载完成后才切换，正在处理的请求继续使用旧模型。
+    """
+    if model is None:
+        init_app()
+    if model_registry is None:
+        raise HTTPException(status_code=404, detail="未配置模型注册表 (MODEL_REGISTRY)")
+    try:
+        body = await request.json()
+        checkpoint = body["checkpoint"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail='请求体应为 {"checkpoint": "<文件名>"}')
+    try:
+        entry = await asyncio.get_running_loop().run_in_executor(
+            model_registry.executor, model_registry.swap, model_key, checkpoint
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except (OSError, RuntimeError) as exc:
+        raise HTTPException(status_code=400, detail=f"检查点加载失败: {exc}")
+    return {"model_key": model_key, **entry.to_dict()}
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """获取响应缓存统计信息"""
+    if response_cache is None:
+        init_app()
+    return response_cache.stats()
+
+def register_runtime_metrics():
+    """注册抓取时读取的指标，组件尚未初始化时不输出样本"""
+    metrics.gauge_callback("traffic_startup_seconds", "Cold start time by phase",
+                           lambda: {(name,): seconds for name, seconds in startup_report.phases.items()},
+                           ("phase",))
+    metrics.gauge_callback("traffic_model_info", "Loaded inference model",
+                           lambda: {(model_runtime, MODEL_PATH or ""): 1} if model_runtime else None,
+                           ("runtime", "path"))
+    metrics.gauge_callback("traffic_registry_loaded_models", "Models loaded from the model registry",
+                           lambda: model_registry.loaded_models if model_registry is not None else None)
+    metrics.gauge_callback("traffic_registry_loaded_bytes", "Resident memory of registry models (mmap-backed weights excluded)",
+                           lambda: model_registry.loaded_bytes if model_registry is not None else None)
+    metrics.counter_callback("traffic_registry_lookups_total", "Model registry lookups",
+                             lambda: {("hit",): model_registry.hits, ("load",): model_registry.misses}
+                             if model_registry is not None else None, ("result",))
+    metrics.counter_callback("traffic_registry_evictions_total", "Models evicted from the registry",
+                             lambda: model_registry.evictions if model_registry is not None else None)
+    metrics.gauge_callback("traffic_store_sensors", "Sensors in the data store",
+                           lambda: len(sensor_store) if sensor_store is not None else None)
+    metrics.gauge_callback("traffic_store_capacity_samples", "Samples retained per sensor",
+                           lambda: sensor_store.capacity if sensor_store is not None else None)
+    metrics.gauge_callback("traffic_store_bytes", "Memory used by the data store arrays",
+                           lambda: sensor_store.nbytes if sensor_store is not None else None)
+    metrics.gauge_callback("traffic_store_revision", "Data store write revision",
+                           lambda: sensor_store.revision if sensor_store is not None else None)
+    metrics.gauge_callback("traffic_process_resident_memory_bytes", "Resident memory of this process",
+                           lambda: process_memory()["rss"])
+    metrics.gauge_callback("traffic_process_max_resident_memory_bytes", "Peak resident memory of this process",
+                           lambda: process_memory()["max_rss"])
+    metrics.gauge_callback("traffic_batch_queue_depth", "Requests waiting in the inference batcher",
+                           lambda: batch_predictor.queue_depth if batch_predictor is not None else None)
+    metrics.counter_callback("traffic_batch_requests_total", "Requests served by the inference batcher",
+                             lambda: batch_predictor.stats.total_requests if batch_predictor is not None else None)
+    metrics.counter_callback("traffic_batches_total", "Forward passes run by the inference batcher",
+                             lambda: batch_predictor.stats.total_batches if batch_predictor is not None else None)
+    metrics.counter_callback("traffic_cache_requests_total", "Response cache lookups",
+                             lambda: {("hit",): response_cache.hits, ("miss",): response_cache.misses}
+                             if response_cache is not None else None, ("result",))
+    metrics.counter_callback("traffic_ingest_samples_total", "Samples written through POST /ingest",
+                             lambda: ingest_queue.stats.total_samples if ingest_queue is not None else None)
+    metrics.gauge_callback("traffic_ingest_pending_samples", "Samples queued for writing",
+                           lambda: ingest_queue.pending_samples if ingest_queue is not None else None)
+    metrics.gauge_callback("traffic_live_clients", "Connected WebSocket clients",
+                           lambda: len(live_hub.clients) if live_hub is not None else None)
+    metrics.gauge_callback("traffic_scheduler_last_cycle_seconds", "Duration of the last precompute cycle",
+                           lambda: prediction_scheduler.last_cycle_ms / 1000.0 if prediction_scheduler is not None else None)
+    metrics.counter_callback("traffic_scheduler_lookups_total", "Precomputed prediction lookups",
+                             lambda: {("hit",): prediction_scheduler.hits, ("miss",): prediction_scheduler.misses}
+                             if prediction_scheduler is not None else None, ("result",))
+
+register_runtime_metrics()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus 文本格式的监控指标（不会触发初始化）"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/stats")
-async def get_statistics():
+async def get_statistics(request: Request, sensor_id: str = DEFAULT_SENSOR_ID):
     """获取统计信息"""
-    global current_data
-    if current_data is None:
-        init_app()
+    return await cached_response(request, "stats", sensor_id, lambda: compute_statistics(sensor_id))
+
+def compute_statistics(sensor_id: str) -> dict:
+    recent_timestamps, recent_data = get_sensor_window(sensor_id, 24)
+    summary = rolling_stats.summary(sensor_id)
     
-    recent_data = current_data.tail(24)
-    hourly_stats = recent_data.groupby(recent_data['timestamp'].dt.hour)['traffic_flow'].mean()
+    # 最近24个样本按小时求均值（固定长度窗口，跳过缺失值）
+    valid = ~np.isnan(recent_data)
+    hours = hour_of_day(recent_timestamps)[valid]
+    hourly_sum = np.bincount(hours, weights=recent_data[valid], minlength=24)
+    hourly_count = np.bincount(hours, minlength=24)
+    present_hours = np.flatnonzero(hourly_count)
+    hourly_stats = hourly_sum[present_hours] / hourly_count[present_hours]
+    
+    # 窗口内第一个与最后一个有效样本之间的变化率，有效样本不足两个时为 null
+    observed = recent_data[valid]
+    last_24h_change = None
+    if len(observed) >= 2 and observed[0] != 0:
+        last_24h_change = finite_or_none((float(observed[-1]) - float(observed[0])) / float(observed[0]) * 100)
     
     return {
-        "mean": float(current_data['traffic_flow'].mean()),
-        "max": float(current_data['traffic_flow'].max()),
-        "min": float(current_data['traffic_flow'].min()),
-        "std": float(current_data['traffic_flow'].std()),
-        "peak_hour": int(hourly_stats.idxmax()),
-        "off_peak_hour": int(hourly_stats.idxmin()),
-        "hourly_trend": hourly_stats.to_dict(),
-        "last_24h_change": float(
-            (recent_data['traffic_flow'].iloc[-1] - recent_data['traffic_flow'].iloc[0]) 
-            / recent_data['traffic_flow'].iloc[0] * 100
-        )
+        "mean": finite_or_none(summary["mean"]),
+        "max": finite_or_none(summary["max"]),
+        "min": finite_or_none(summary["min"]),
+        "std": finite_or_none(summary["std"]),
+        "peak_hour": int(present_hours[np.argmax(hourly_stats)]) if len(present_hours) else None,
+        "off_peak_hour": int(present_hours[np.argmin(hourly_stats)]) if len(present_hours) else None,
+        "hourly_trend": {int(h): float(v) for h, v in zip(present_hours, hourly_stats)},
+        "last_24h_change": last_24h_change
     }
 
 @app.get("/analysis")
-async def get_analysis():
+async def get_analysis(request: Request, sensor_id: str = DEFAULT_SENSOR_ID):
     """获取分析数据"""
-    global current_data
-    if current_data is None:
-        init_app()
-    
-    weekday_avg = current_data[current_data['timestamp'].dt.weekday < 5]['traffic_flow'].mean()
-    weekend_avg = current_data[current_data['timestamp'].dt.weekday >= 5]['traffic_flow'].mean()
+    return await cached_response(request, "analysis", sensor_id, lambda: compute_analysis(sensor_id))
+
+def compute_analysis(sensor_id: str) -> dict:
+    weekday_avg = rolling_stats.group_mean(sensor_id, day_types=[0])
+    weekend_avg = rolling_stats.group_mean(sensor_id, day_types=[1])
     
-    morning_peak = current_data[current_data['timestamp'].dt.hour.between(7, 9)]['traffic_flow'].mean()
-    evening_peak = current_data[current_data['timestamp'].dt.hour.between(17, 19)]['traffic_flow'].mean()
+    morning_peak = rolling_stats.group_mean(sensor_id, hours=range(7, 10))
+    evening_peak = rolling_stats.group_mean(sensor_id, hours=range(17, 20))
+    overall_mean = rolling_stats.group_mean(sensor_id)
     
+    # 分组内没有样本时均值为 NaN，输出为 null
+    peak = max(morning_peak, evening_peak)
+    has_peaks = not (np.isnan(morning_peak) or np.isnan(evening_peak))
     return {
-        "weekday_avg": float(weekday_avg),
-        "weekend_avg": float(weekend_avg),
-        "morning_peak_avg": float(morning_peak),
-        "evening_peak_avg": float(evening_peak),
-        "peak_ratio": float(max(morning_peak, evening_peak) / current_data['traffic_flow'].mean()),
-        "daily_pattern": "双峰" if abs(morning_peak - evening_peak) < 0.2 * max(morning_peak, evening_peak) else "单峰"
+        "weekday_avg": finite_or_none(weekday_avg),
+        "weekend_avg": finite_or_none(weekend_avg),
+        "morning_peak_avg": finite_or_none(morning_peak),
+        "evening_peak_avg": finite_or_none(evening_peak),
+        "peak_ratio": finite_or_none(peak / overall_mean) if has_peaks and overall_mean else None,
+        "daily_pattern": ("双峰" if abs(morning_peak - evening_peak) < 0.2 * peak else "单峰") if has_peaks else None
     }
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    import copy
+    import uvicorn
+    from uvicorn.config import LOGGING_CONFIG
+    
+    # 应用以 "main" 模块导入；沿用 uvicorn 的日志格式输出 INFO 日志（包括启动耗时报告）
+    log_config = copy.deepcopy(LOGGING_CONFIG)
+    log_config["loggers"]["main"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
+    
+    # 多进程部署时关闭热重载，每个进程按 serving_config 划分 CPU
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=int(os.getenv("PORT", "8000")),
+        reload=serving_config.workers == 1,
+        workers=serving_config.workers,
+        log_config=log_config
+    ) 
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""
+按传感器/路段选择模型的注册表
+
+注册表文件（MODEL_REGISTRY，JSON）把路段或传感器映射到 train.py 保存的检查点：
+
+    {
+        "checkpoint_dir": "src/models/checkpoints",
+        "models": {"corridor_a": "model_20240101_120000.pth", "sensor_7": "model_20240102_080000.pth"},
+        "sensors": {"sensor_1": "corridor_a", "sensor_2": "corridor_a"}
+    }
+
+传感器先按 sensors 找到模型键，不在其中但本身是模型键时直接使用；都没有时使用默认模型（MODEL_PATH）。
+模型在第一次使用时加载，按常驻内存做 LRU 淘汰（mmap 加载的权重是进程间共享、可被回收的页缓存，
+单独统计，不计入上限）；使用同一检查点的模型键与传感器共享同一份权重。
+替换检查点时先加载新模型再原子地切换映射，已经拿到旧模型的请求继续用旧模型完成。
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import torch
+
+from models.export import load_inference_model, artifact_path
+from utils.normalization import NormalizationState, NORM_SUFFIX
+
+
+def file_mappings(path: str) -> list:
+    """当前进程中映射了 path 的地址范围 [(start, end), ...]（读取 /proc/self/maps，其他平台返回空列表）"""
+    real = os.path.realpath(path)
+    ranges = []
+    try:
+        with open("/proc/self/maps", "r") as f:
+            for line in f:
+                fields = line.split(None, 5)
+                if len(fields) == 6 and fields[5].rstrip("\n") == real:
+                    start, end = (int(x, 16) for x in fields[0].split("-"))
+                    ranges.append((start, end))
+    except OSError:
+        pass
+    return ranges
+
+
+def model_memory(model, path: str) -> Tuple[int, int]:
+    """
+    模型权重占用的内存（字节）
+
+    load_checkpoint 以 mmap 方式读取检查点并直接把映射的张量作为参数（assign=True），
+    这部分权重位于检查点文件的映射中，单独统计；共享存储的张量只统计一次。
+    无法统计张量时（如 ONNX）按文件大小计为常驻内存。
+
+    Returns:
+        tuple: (常驻字节数, 文件映射字节数)
+    """
+    state_dict = getattr(model, "state_dict", None)
+    tensors = [t for t in state_dict().values() if isinstance(t, torch.Tensor)] if state_dict is not None else []
+    if not tensors:
+        return os.path.getsize(path), 0
+
+    mappings = file_mappings(path)
+    resident = mapped = 0
+    seen = set()
+    for tensor in tensors:
+        try:
+            storage = tensor.untyped_storage()
+            ptr, nbytes = storage.data_ptr(), storage.nbytes()
+        except (RuntimeError, NotImplementedError):
+            # 量化张量等没有普通存储，按元素大小计为常驻内存
+            resident += tensor.numel() * tensor.element_size()
+            continue
+        if ptr in seen:
+            continue
+        seen.add(ptr)
+        if any(start <= ptr < end for start, end in mappings):
+            mapped += nbytes
+        else:
+            resident += nbytes
+    return resident, mapped
+
+
+class LoadedModel:
+    """已加载的检查点：模型、运行时、配套的归一化参数与占用内存"""
+
+    def __init__(self, path: str, model, runtime: str, normalizer: Optional[NormalizationState], nbytes: int,
+                 mapped_bytes: int = 0):
+        """
+        Args:
+            path: 检查点路径
+            model: 可调用的推理模型
+            runtime: 运行时名称
+            normalizer: 配套的归一化参数，None 时使用服务的默认参数
+            nbytes: 常驻内存（计入注册表的内存上限）
+            mapped_bytes: 以 mmap 方式映射的权重字节数（不计入上限）
+        """
+        self.path = path
+        self.model = model
+        self.runtime = runtime
+        self.normalizer = normalizer  # None 时使用服务的默认归一化参数
+        self.nbytes = nbytes
+        self.mapped_bytes = mapped_bytes
+        self.loaded_at = time.time()
+        self.batches = 0
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def run(self, inputs: np.ndarray) -> np.ndarray:
+        """批量前向计算（阻塞，应在线程池中调用，多个副本线程可以并发调用）"""
+        with torch.no_grad():
+            outputs = self.model(torch.from_numpy(inputs)).numpy()
+        with self._lock:
+            self.batches += 1
+            self.samples += len(inputs)
+        return outputs
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            batches, samples = self.batches, self.samples
+        return {
+            "path": self.path,
+            "runtime": self.runtime,
+            "bytes": self.nbytes,
+            "mapped_bytes": self.mapped_bytes,
+            "has_normalizer": self.normalizer is not None,
+            "loaded_at": self.loaded_at,
+            "batches": batches,
+            "samples": samples,
+        }
+
+
+class ModelRegistry:
+    """
+    模型注册表
+
+    get 可能需要从磁盘加载（阻塞），在事件循环中应先用 cached 查询，未命中时放到 executor 中执行。
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        sensors: Optional[Dict[str, str]] = None,
+        checkpoint_dir: str = ".",
+        max_bytes: int = 512 * 1024 * 1024,
+        loader: Optional[Callable[[str], LoadedModel]] = None,
+        sequence_length: int = 12,
+        runtime: str = "auto",
+        intra_op_threads: int = 1,
+    ):
+        """
+        Args:
+            models: 模型键 -> 检查点路径（相对路径基于 checkpoint_dir）
+            sensors: 传感器ID -> 模型键
+            checkpoint_dir: 检查点目录，swap 只接受该目录下的文件
+            max_bytes: 已加载模型的常驻内存上限，超出时淘汰最久未使用的模型（至少保留一个）
+            loader: 加载函数，默认按 MODEL_RUNTIME 规则加载检查点及同名 .norm.json
+            sequence_length: 模型输入序列长度
+            runtime: 同 load_inference_model 的 runtime
+            intra_op_threads: ONNX Runtime 的 intra-op 线程数
+        """
+        self.checkpoint_dir = os.path.realpath(checkpoint_dir)
+        self.max_bytes = max_bytes
+        self.sequence_length = sequence_length
+        self.runtime = runtime
+        self.intra_op_threads = intra_op_threads
+        self.loader = loader or self._load_checkpoint
+
+        self._models = {key: self._resolve(path) for key, path in models.items()}
+        self._sensors = dict(sensors or {})
+        self._revisions = {key: 0 for key in self._models}
+
+        self._loaded = OrderedDict()  # 检查点路径 -> LoadedModel，按最近使用排序
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-load")
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.swaps = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ModelRegistry":
+        """读取注册表 JSON；未指定 checkpoint_dir 时以注册表文件所在目录为准"""
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        checkpoint_dir = config.get("checkpoint_dir") or os.path.dirname(os.path.abspath(path))
+        return cls(config.get("models", {}), config.get("sensors", {}), checkpoint_dir=checkpoint_dir, **kwargs)
+
+    def _resolve(self, path: str) -> str:
+        return os.path.realpath(os.path.join(self.checkpoint_dir, path))
+
+    def _load_checkpoint(self, path: str) -> LoadedModel:
+        model, runtime = load_inference_model(
+            path, sequence_length=self.sequence_length, runtime=self.runtime,
+            intra_op_threads=self.intra_op_threads
+        )
+        norm_path = artifact_path(path, NORM_SUFFIX)
+        normalizer = NormalizationState.load(norm_path) if os.path.exists(norm_path) else None
+        return LoadedModel(path, model, runtime, normalizer, *model_memory(model, path))
+
+    @property
+    def loaded_models(self) -> int:
+        return len(self._loaded)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return self._loaded_bytes
+
+    def model_key(self, sensor_id: str) -> Optional[str]:
+        """传感器对应的模型键，使用默认模型时返回 None"""
+        key = self._sensors.get(sensor_id)
+        if key is None and sensor_id in self._models:
+            key = sensor_id
+        return key if key in self._models else None
+
+    def revision(self, sensor_id: str) -> int:
+        """传感器所用模型的替换次数，用作响应缓存键的一部分"""
+        key = self.model_key(sensor_id)
+        return self._revisions[key] if key is not None else 0
+
+    def is_mapped(self, sensor_id: str) -> bool:
+        return self.model_key(sensor_id) is not None
+
+    def cached(self, model_key: str) -> Optional[LoadedModel]:
+        """已加载时返回模型（不会阻塞），否则返回 None"""
+        path = self._models[model_key]
+        with self._lock:
+            entry = self._loaded.get(path)
+            if entry is not None:
+                self._loaded.move_to_end(path)
+                self.hits += 1
+            return entry
+
+    def get(self, model_key: str) -> LoadedModel:
+        """
+        返回模型键对应的模型，未加载时加载（阻塞）
+
+        Raises:
+            KeyError: 未知的模型键
+            OSError / RuntimeError: 检查点无法加载
+        """
+        entry = self.cached(model_key)
+        if entry is not None:
+            return entry
+        return self._load(self._models[model_key])
+
+    def _load(self, path: str, replace: bool = False) -> LoadedModel:
+        # 同一检查点只加载一次，并发的其他请求等待同一次加载
+        with self._lock:
+            lock = self._load_locks.setdefault(path, threading.Lock())
+        with lock:
+            with self._lock:
+                entry = self._loaded.get(path)
+                if entry is not None and not replace:
+                    self._loaded.move_to_end(path)
+                    return entry
+                self.misses += 1
+
+            entry = self.loader(path)
+
+            with self._lock:
+                old = self._loaded.pop(path, None)
+                if old is not None:
+                    self._loaded_bytes -= old.nbytes
+                self._loaded[path] = entry
+                self._loaded_bytes += entry.nbytes
+                self._evict()
+            return entry
+
+    def _evict(self):
+        # 调用方持有 self._lock；被淘汰的模型只是不再被注册表引用，进行中的请求不受影响
+        while self._loaded_bytes > self.max_bytes and len(self._loaded) > 1:
+            _, entry = self._loaded.popitem(last=False)
+            self._loaded_bytes -= entry.nbytes
+            self.evictions += 1
+
+    def swap(self, model_key: str, checkpoint: str) -> LoadedModel:
+        """
+        把模型键切换到新的检查点（阻塞）
+
+        先完整加载新模型，加载失败时映射保持不变；同一路径的检查点被覆盖时强制重新加载，
+        早于新检查点的导出产物（.ts 等）不会被使用（见 load_inference_model）。
+        使用同一检查点的所有模型键的修订号都会增加，使它们的缓存响应失效。
+
+        Args:
+            model_key: 模型键，不存在时新建
+            checkpoint: checkpoint_dir 下的检查点路径
+
+        Raises:
+            ValueError: 检查点不在 checkpoint_dir 下或文件不存在
+        """
+        path = self._resolve(checkpoint)
+        if os.path.commonpath([path, self.checkpoint_dir]) != self.checkpoint_dir:
+            raise ValueError(f"检查点必须位于 {self.checkpoint_dir} 下")
+        if not os.path.isfile(path):
+            raise ValueError(f"检查点不存在: {checkpoint}")
+
+        entry = self._load(path, replace=True)
+        with self._lock:
+            self._models[model_key] = path
+            for key, key_path in self._models.items():
+                if key_path == path:
+                    self._revisions[key] = self._revisions.get(key, 0) + 1
+            self.swaps += 1
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = [entry.to_dict() for entry in self._loaded.values()]
+            return {
+                "models": len(self._models),
+                "sensors": len(self._sensors),
+                "checkpoint_dir": self.checkpoint_dir,
+                "max_bytes": self.max_bytes,
+                "loaded_bytes": self._loaded_bytes,
+                "mapped_bytes": sum(entry["mapped_bytes"] for entry in loaded),
+                "loaded": loaded,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "swaps": self.swaps,
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,142 @@
+"""
+响应缓存模块
+
+按 (接口, 参数, 数据版本) 缓存已序列化的 JSON 响应体，并基于 ETag 支持
+If-None-Match 条件请求。数据版本变化后旧条目自然失效，由 LRU 淘汰。
+"""
+import asyncio
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from fastapi import Request, Response
+
+
+class CachedResponse:
+    """已序列化的响应体及其 ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def serialize(content: Any) -> bytes:
+    """与 FastAPI 默认 JSONResponse 相同的序列化方式"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class _ComputeCancelled(Exception):
+    """计算被发起它的请求取消，等待同一结果的其他请求应重新计算"""
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    """带 LRU 上限的版本化响应缓存，并发的相同未命中请求只计算一次"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                             current_key: Optional[Callable[[], Hashable]] = None) -> CachedResponse:
+        """
+        获取缓存的响应，未命中时调用 compute 计算并缓存
+
+        Args:
+            key: 缓存键，应包含数据版本
+            compute: 返回可 JSON 序列化结果的函数（可以是协程函数）
+            current_key: 可选，返回当前缓存键的函数；计算完成后键已变化（计算期间有新数据写入）时
+                结果只返回给本次等待的请求，不写入缓存，避免新数据被存到旧版本下
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except _ComputeCancelled:
+                return await self.get_or_compute(key, compute, current_key)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = compute()
+            if inspect.isawaitable(result):
+                result = await result
+            entry = CachedResponse(serialize(result))
+        except asyncio.CancelledError:
+            # 发起计算的请求被取消时不把取消传给其他等待者，由它们重新计算
+            future.set_exception(_ComputeCancelled())
+            future.exception()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # 避免未被等待时产生警告
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(entry)
+        if current_key is not None and current_key() != key:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def respond(self, request: Request, key: Hashable, compute: Callable[[], Any],
+                      current_key: Optional[Callable[[], Hashable]] = None) -> Response:
+        """返回缓存的 JSON 响应，ETag 匹配时返回 304"""
+        entry = await self.get_or_compute(key, compute, current_key)
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,184 @@
+"""
+增量滚动统计模块
+
+作为 SensorStore 的监听器，在数据写入与淘汰时增量更新每个传感器的统计量，
+使 /stats 与 /analysis 能以 O(1) 的代价返回结果：
+- 均值/方差: Welford（Chan 批量合并）算法，支持样本的加入与移除
+- 最大/最小值: 单调双端队列，写入与查询时弹出过期元素
+- 按 (工作日/周末, 小时) 分组的求和与计数
+"""
+from collections import deque
+
+import numpy as np
+
+from backend.sensor_store import SensorStore, hour_of_day, day_of_week
+
+
+def _batch_moments(rows: np.ndarray, values: np.ndarray):
+    """按行分组计算批次的样本数、均值与二阶中心矩"""
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    count = np.bincount(inverse).astype(np.float64)
+    mean = np.bincount(inverse, weights=values) / count
+    m2 = np.bincount(inverse, weights=(values - mean[inverse]) ** 2)
+    return unique_rows, count, mean, m2
+
+
+class RollingStatistics:
+    """传感器保留窗口内的增量统计"""
+
+    def __init__(self, store: SensorStore):
+        self.store = store
+        self._allocated = 0
+        self._count = np.zeros(0, dtype=np.float64)
+        self._mean = np.zeros(0, dtype=np.float64)
+        self._m2 = np.zeros(0, dtype=np.float64)
+        self._hour_sum = np.zeros((0, 2, 24), dtype=np.float64)
+        self._hour_count = np.zeros((0, 2, 24), dtype=np.int64)
+        self._max_deques = []
+        self._min_deques = []
+        self._ensure_rows(store.n_rows)
+
+        # 从已有数据初始化
+        for sensor_id in store.sensor_ids:
+            self._rebuild(store.row(sensor_id))
+
+        store.add_listener(self)
+
+    def summary(self, sensor_id) -> dict:
+        """保留窗口内的均值、标准差（ddof=1）、最大值与最小值"""
+        row = self.store.row(sensor_id)
+        count = self._count[row]
+        return {
+            "count": int(count),
+            "mean": float(self._mean[row]) if count else float('nan'),
+            "std": float(np.sqrt(self._m2[row] / (count - 1))) if count > 1 else float('nan'),
+            "max": self._extreme(self._max_deques[row]),
+            "min": self._extreme(self._min_deques[row]),
+        }
+
+    def group_mean(self, sensor_id, day_types=(0, 1), hours=range(24)) -> float:
+        """
+        指定日期类型与小时范围内的平均流量
+
+        Args:
+            sensor_id: 传感器ID
+            day_types: 0 表示工作日，1 表示周末
+            hours: 小时列表
+        """
+        row = self.store.row(sensor_id)
+        day_types, hours = np.asarray(day_types), np.asarray(hours)
+        total = self._hour_sum[row][np.ix_(day_types, hours)].sum()
+        count = self._hour_count[row][np.ix_(day_types, hours)].sum()
+        return float(total / count) if count else float('nan')
+
+    def on_write(self, rows, slots, old_values, new_values, timestamps):
+        self._ensure_rows(self.store.n_rows)
+
+        overwritten = ~np.isnan(old_values)
+        if overwritten.any():
+            self._remove(rows[overwritten], old_values[overwritten], timestamps[overwritten])
+
+        valid = ~np.isnan(new_values)
+        rows, slots = rows[valid], slots[valid]
+        values, timestamps = new_values[valid].astype(np.float64), timestamps[valid]
+        if len(rows):
+            self._add(rows, values, timestamps)
+
+        # 样本已按 (行, 时间槽) 排序，依次压入单调队列
+        for row, slot, value in zip(rows.tolist(), slots.tolist(), values.tolist()):
+            self._push(self._max_deques[row], slot, value, lambda a, b: a <= b)
+            self._push(self._min_deques[row], slot, value, lambda a, b: a >= b)
+
+        # 覆盖写入会破坏单调队列的不变式，需要重建
+        for row in np.unique(rows[overwritten[valid]]).tolist():
+            self._rebuild_extremes(row)
+
+        # 写入的行同时弹出过期元素，不被查询的传感器的队列长度也不超过 capacity
+        oldest = self.store.head - self.store.capacity
+        for row in np.unique(rows).tolist():
+            self._prune(self._max_deques[row], oldest)
+            self._prune(self._min_deques[row], oldest)
+
+    def on_evict(self, values, timestamps):
+        n_rows = min(len(values), self._allocated)
+        values = values[:n_rows]
+        rows, cols = np.nonzero(~np.isnan(values))
+        if len(rows):
+            self._remove(rows, values[rows, cols].astype(np.float64), timestamps[cols])
+
+    def _add(self, rows, values, timestamps):
+        unique_rows, nb, mb, m2b = _batch_moments(rows, values)
+        na, ma = self._count[unique_rows], self._mean[unique_rows]
+        n = na + nb
+        delta = mb - ma
+        self._mean[unique_rows] = ma + delta * nb / n
+        self._m2[unique_rows] += m2b + delta ** 2 * na * nb / n
+        self._count[unique_rows] = n
+        self._update_groups(rows, values, timestamps, 1)
+
+    def _remove(self, rows, values, timestamps):
+        unique_rows, nb, mb, m2b = _batch_moments(rows, values.astype(np.float64))
+        n, mean = self._count[unique_rows], self._mean[unique_rows]
+        na = n - nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ma = np.where(na > 0, (n * mean - nb * mb) / na, 0.0)
+            m2 = self._m2[unique_rows] - m2b - (mb - ma) ** 2 * na * nb / n
+        self._mean[unique_rows] = ma
+        self._m2[unique_rows] = np.where(na > 0, np.maximum(m2, 0.0), 0.0)
+        self._count[unique_rows] = na
+        self._update_groups(rows, values, timestamps, -1)
+
+    def _update_groups(self, rows, values, timestamps, sign):
+        day_type = (day_of_week(timestamps) >= 5).astype(np.int64)
+        hours = hour_of_day(timestamps)
+        np.add.at(self._hour_sum, (rows, day_type, hours), sign * values)
+        np.add.at(self._hour_count, (rows, day_type, hours), sign)
+
+    @staticmethod
+    def _push(window: deque, slot: int, value: float, dominated):
+        while window and dominated(window[-1][1], value):
+            window.pop()
+        window.append((slot, value))
+
+    @staticmethod
+    def _prune(window: deque, oldest: int):
+        while window and window[0][0] < oldest:
+            window.popleft()
+
+    def _extreme(self, window: deque) -> float:
+        self._prune(window, self.store.head - self.store.capacity)
+        return window[0][1] if window else float('nan')
+
+    def _rebuild(self, row: int):
+        """根据存储中的数据重新计算某一行的全部统计量"""
+        timestamps, values = self.store.window(self.store.sensor_id(row))
+        valid = ~np.isnan(values)
+        self._count[row] = self._mean[row] = self._m2[row] = 0.0
+        self._hour_sum[row] = 0.0
+        self._hour_count[row] = 0
+        if valid.any():
+            self._add(np.full(valid.sum(), row), values[valid].astype(np.float64), timestamps[valid])
+        self._rebuild_extremes(row)
+
+    def _rebuild_extremes(self, row: int):
+        _, values = self.store.window(self.store.sensor_id(row))
+        first_slot = self.store.head - len(values)
+        self._max_deques[row].clear()
+        self._min_deques[row].clear()
+        for i, value in enumerate(values.tolist()):
+            if value == value:  # 跳过 NaN
+                self._push(self._max_deques[row], first_slot + i, value, lambda a, b: a <= b)
+                self._push(self._min_deques[row], first_slot + i, value, lambda a, b: a >= b)
+
+    def _ensure_rows(self, n_rows: int):
+        if n_rows <= self._allocated:
+            return
+        extra = n_rows - self._allocated
+        self._count = np.concatenate([self._count, np.zeros(extra)])
+        self._mean = np.concatenate([self._mean, np.zeros(extra)])
+        self._m2 = np.concatenate([self._m2, np.zeros(extra)])
+        self._hour_sum = np.concatenate([self._hour_sum, np.zeros((extra, 2, 24))])
+        self._hour_count = np.concatenate([self._hour_count, np.zeros((extra, 2, 24), dtype=np.int64)])
+        self._max_deques.extend(deque() for _ in range(extra))
+        self._min_deques.extend(deque() for _ in range(extra))
+        self._allocated = n_rows
@@ -0,0 +1,231 @@
+"""
+预测预计算模块
+
+输入窗口只在写入新样本时变化，因此在每次数据修订（或固定间隔）后，
+对所有传感器做一次批量推理并把多步预测存入内存表，/predict 直接查表。
+"""
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+import numpy as np
+
+from backend.sensor_store import SensorStore
+from utils.normalization import NormalizationState
+from utils.windowing import autoregressive_rollout, run_rollout
+
+
+class PredictionEntry:
+    """单个传感器的预计算结果"""
+
+    __slots__ = ("data_version", "timestamps", "values", "computed_at")
+
+    def __init__(self, data_version, timestamps: np.ndarray, values: np.ndarray, computed_at: float):
+        self.data_version = data_version
+        self.timestamps = timestamps  # (horizon,) epoch 秒
+        self.values = values          # (horizon,) 反归一化后的预测值
+        self.computed_at = computed_at
+
+
+class PredictionScheduler:
+    """
+    后台预测调度器
+
+    每个周期在事件循环中取出所有传感器的最新窗口与数据版本，然后在线程池中
+    对整批窗口做自回归多步推理，结果按 (传感器, 步数) 查询。查询时数据版本
+    必须与结果一致，否则视为未命中，由调用方按需计算。
+    """
+
+    def __init__(
+        self,
+        store: SensorStore,
+        normalizer: NormalizationState,
+        forward_fn: Callable[[np.ndarray], np.ndarray],
+        executor: Optional[Executor] = None,
+        sequence_length: int = 12,
+        horizon: int = 12,
+        sample_interval: int = 3600,
+        tick_seconds: float = 0.0,
+        min_interval_ms: float = 50.0,
+        max_batch_size: int = 1024,
+        include: Optional[Callable[[str], bool]] = None,
+    ):
+        """
+        Args:
+            store: 传感器数据存储
+            normalizer: 归一化状态
+            forward_fn: 批量前向函数，输入 (batch, 1, sequence_length) 数组，返回 (batch, k) 数组
+            executor: 执行推理的线程池
+            sequence_length: 输入序列长度
+            horizon: 预计算的最大步数
+            sample_interval: 采样间隔（秒），用于生成预测时间点与评估周期耗时
+            tick_seconds: 大于 0 时即使没有新数据也按固定间隔重新计算
+            min_interval_ms: 两个周期之间的最短间隔，用于合并密集的写入
+            max_batch_size: 单次前向计算的最大窗口数
+            include: 可选，返回 False 的传感器不做预计算（例如使用其他模型的传感器）
+        """
+        self.store = store
+        self.normalizer = normalizer
+        self.forward_fn = forward_fn
+        self.executor = executor
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.sample_interval = sample_interval
+        self.tick_seconds = tick_seconds
+        self.min_interval = min_interval_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.include = include
+
+        self._table = {}
+        self._dirty = None
+        self._loop = None
+        self._task = None
+
+        self.cycles = 0
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_cycle_ms = 0.0
+        self.last_cycle_sensors = 0
+        self.last_cycle_skipped = 0
+        self.last_cycle_finished = None
+        self.last_data_revision = None
+
+    def start(self):
+        """在当前事件循环中启动调度任务，并立即计算一次"""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._dirty = asyncio.Event()
+            self._dirty.set()
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # SensorStore 监听器接口
+
+    def on_write(self, rows, slots, old_values, new_values, timestamps):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._dirty.set)
+
+    def on_evict(self, values, timestamps):
+        pass
+
+    def lookup(self, sensor_id: str, horizon: int = 1) -> Optional[PredictionEntry]:
+        """
+        查询预计算结果
+
+        Returns:
+            PredictionEntry: 数据版本一致且步数足够时返回前 horizon 步，否则返回 None
+        """
+        entry = self._table.get(sensor_id)
+        if (entry is None or horizon > self.horizon
+                or entry.data_version != self.store.data_version(sensor_id)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return PredictionEntry(entry.data_version, entry.timestamps[:horizon],
+                               entry.values[:horizon], entry.computed_at)
+
+    async def _run(self):
+        while True:
+            if self.tick_seconds > 0:
+                try:
+                    await asyncio.wait_for(self._dirty.wait(), self.tick_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._dirty.wait()
+            self._dirty.clear()
+
+            try:
+                await self.run_cycle()
+            except Exception:
+                self.errors += 1
+            await asyncio.sleep(self.min_interval)
+
+    async def run_cycle(self):
+        """计算一个周期：快照所有传感器的最新窗口，在线程池中批量推理后替换结果表"""
+        start = time.perf_counter()
+        sensor_ids = [s for s in self.store.sensor_ids if self.store.length(s) >= self.sequence_length
+                      and (self.include is None or self.include(s))]
+        # 没有归一化参数的传感器跳过（/predict 对其返回 409），不影响其他传感器
+        supported = [s for s in sensor_ids if self.normalizer.supports(s)]
+        self.last_cycle_skipped = len(sensor_ids) - len(supported)
+        sensor_ids = supported
+        revision = self.store.revision
+        if not sensor_ids:
+            return
+
+        # 快照在事件循环中完成，与写入任务互斥；推理在线程池中进行
+        timestamps, windows = self.store.latest_windows(sensor_ids, self.sequence_length)
+        versions = [self.store.data_version(s) for s in sensor_ids]
+        complete = ~np.isnan(windows).any(axis=1)
+        sensor_ids = [s for s, ok in zip(sensor_ids, complete) if ok]
+        versions = [v for v, ok in zip(versions, complete) if ok]
+        windows = windows[complete]
+        if not sensor_ids:
+            return
+
+        future_times = timestamps[-1] + self.sample_interval * np.arange(1, self.horizon + 1)
+        inputs = self.normalizer.transform_many(windows, sensor_ids, timestamps).astype(np.float32)
+        loop = asyncio.get_running_loop()
+        outputs = await loop.run_in_executor(self.executor, self._forecast, inputs)
+        values = self.normalizer.inverse_transform_many(outputs, sensor_ids, future_times)
+
+        finished = time.time()
+        table = dict(self._table)
+        for i, sensor_id in enumerate(sensor_ids):
+            table[sensor_id] = PredictionEntry(versions[i], future_times, values[i], finished)
+        self._table = table
+
+        self.cycles += 1
+        self.last_cycle_ms = (time.perf_counter() - start) * 1000.0
+        self.last_cycle_sensors = len(sensor_ids)
+        self.last_cycle_finished = finished
+        self.last_data_revision = revision
+
+    def _forecast(self, inputs: np.ndarray) -> np.ndarray:
+        """对整批窗口做自回归展开（阻塞，应在线程池中调用）"""
+        predictions = np.empty((len(inputs), self.horizon), dtype=np.float32)
+        for start in range(0, len(inputs), self.max_batch_size):
+            window = inputs[start:start + self.max_batch_size]
+            rollout = autoregressive_rollout(window, self.horizon, self.sequence_length)
+            predictions[start:start + len(window)] = run_rollout(
+                rollout, lambda x: self.forward_fn(x[:, None, :])
+            )
+        return predictions
+
+    def stats(self) -> dict:
+        now = time.time()
+        stale = sum(
+            1 for sensor_id, entry in self._table.items()
+            if sensor_id in self.store and entry.data_version != self.store.data_version(sensor_id)
+        )
+        total = self.hits + self.misses
+        return {
+            "horizon": self.horizon,
+            "tick_seconds": self.tick_seconds,
+            "cycles": self.cycles,
+            "errors": self.errors,
+            "sensors": len(self._table),
+            "stale_sensors": stale,
+            "last_cycle_sensors": self.last_cycle_sensors,
+            "last_cycle_skipped": self.last_cycle_skipped,
+            "last_cycle_ms": self.last_cycle_ms,
+            # 周期耗时占采样间隔的比例，接近 1 说明一个周期已跟不上数据到达速度
+            "cycle_budget_ratio": self.last_cycle_ms / 1000.0 / self.sample_interval,
+            "staleness_seconds": now - self.last_cycle_finished if self.last_cycle_finished else None,
+            "data_revision": self.store.revision,
+            "computed_revision": self.last_data_revision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,331 @@
+"""
+多传感器时间序列存储模块
+
+每个传感器占用一行预分配的 float32 环形缓冲区，所有传感器共享一条
+以 epoch 秒为单位的时间戳时钟。缓冲区按"镜像"方式写入（每个位置同时写入
+p 与 p + capacity），因此任意长度不超过 capacity 的最新窗口都是一个连续的视图。
+写入顺序按传感器检查：落后于其他传感器的传感器可以补写时间轴上已有的时间槽。
+"""
+import threading
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+def to_epoch_seconds(timestamps) -> np.ndarray:
+    """将 datetime / datetime64 / 数值时间戳统一转换为 int64 epoch 秒"""
+    ts = np.asarray(timestamps)
+    if np.issubdtype(ts.dtype, np.datetime64) or ts.dtype == object:
+        return ts.astype('datetime64[s]').astype(np.int64)
+    return ts.astype(np.int64)
+
+
+def format_timestamps(epoch_seconds: np.ndarray) -> list:
+    """将 epoch 秒批量格式化为 '%Y-%m-%d %H:%M:%S' 字符串"""
+    strings = np.datetime_as_string(np.asarray(epoch_seconds, dtype='datetime64[s]'))
+    return np.char.replace(strings, 'T', ' ').tolist()
+
+
+def hour_of_day(epoch_seconds: np.ndarray) -> np.ndarray:
+    return (np.asarray(epoch_seconds) // 3600) % 24
+
+
+def day_of_week(epoch_seconds: np.ndarray) -> np.ndarray:
+    """星期几，周一为 0（1970-01-01 为周四）"""
+    return (np.asarray(epoch_seconds) // 86400 + 3) % 7
+
+
+class SensorStore:
+    """
+    传感器时间序列环形缓冲存储
+
+    - 追加: 摊还 O(1)（缓冲区写满后，新增时间槽时需要把被复用的列置为 NaN，代价与传感器数成正比）
+    - 最新窗口: O(1)，返回底层缓冲区的只读视图
+
+    capacity 按共享时钟的时间槽计数，而不是按单个传感器的样本数：任一传感器写入新的时间戳都会
+    为所有传感器开辟一个时间槽（未写入的传感器在该槽为 NaN）。上报时间与其他传感器错开的传感器
+    因此会占用额外的时间槽，使所有传感器保留的时间跨度缩短；时间戳应对齐到统一的采样间隔。
+
+    可以通过 add_listener 注册监听器，监听器需实现:
+    - on_write(rows, slots, old_values, new_values, timestamps): 样本写入
+    - on_evict(values, timestamps): 时间槽被覆盖，values 形状为 (n_rows, n_evicted)
+    """
+
+    def __init__(self, capacity: int = 1000, initial_sensors: int = 16):
+        """
+        Args:
+            capacity: 每个传感器保留的最大样本数
+            initial_sensors: 预分配的传感器行数，不足时按倍数扩容
+        """
+        self.capacity = capacity
+        self.revision = 0
+
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.full((initial_sensors, 2 * capacity), np.nan, dtype=np.float32)
+        self._first_slot = np.zeros(initial_sensors, dtype=np.int64)
+        self._last_slot = np.full(initial_sensors, -1, dtype=np.int64)  # 每个传感器最近写入的时间槽
+        self._sensor_revision = np.zeros(initial_sensors, dtype=np.int64)
+        self._index = {}
+        self._row_ids = []  # 行号 -> 传感器ID
+        self._head = 0  # 已写入的时间槽总数（单调递增）
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __contains__(self, sensor_id) -> bool:
+        return sensor_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def sensor_ids(self) -> list:
+        return list(self._index)
+
+    @property
+    def latest_timestamp(self) -> Optional[int]:
+        if self._head == 0:
+            return None
+        return int(self._timestamps[(self._head - 1) % self.capacity])
+
+    @property
+    def head(self) -> int:
+        """已写入的时间槽总数，当前保留的时间槽为 [head - capacity, head)"""
+        return self._head
+
+    @property
+    def n_rows(self) -> int:
+        """已分配的传感器行数"""
+        return len(self._values)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._values.nbytes + self._timestamps.nbytes)
+
+    def length(self, sensor_id) -> int:
+        """传感器当前保留的样本数"""
+        row = self._index[sensor_id]
+        return int(max(0, min(self._head - self._first_slot[row], self.capacity)))
+
+    def row(self, sensor_id) -> int:
+        """传感器对应的缓冲区行号"""
+        return self._index[sensor_id]
+
+    def sensor_id(self, row: int):
+        """缓冲区行号对应的传感器ID"""
+        return self._row_ids[row]
+
+    def add_listener(self, listener):
+        """注册写入/淘汰监听器"""
+        self._listeners.append(listener)
+
+    def sensor_revision(self, sensor_id) -> int:
+        """传感器最近一次被写入时的全局修订号"""
+        return int(self._sensor_revision[self._index[sensor_id]])
+
+    def data_version(self, sensor_id) -> Tuple[int, int]:
+        """
+        传感器数据版本
+
+        (时间槽总数, 传感器修订号) 任一变化都意味着该传感器的保留窗口发生了变化：
+        新时间槽会使旧样本被淘汰，即使该传感器本身没有写入。
+        """
+        return self._head, self.sensor_revision(sensor_id)
+
+    def window(self, sensor_id, size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        获取传感器最新的 size 个样本
+
+        Args:
+            sensor_id: 传感器ID
+            size: 窗口长度，默认为全部保留样本
+
+        Returns:
+            tuple: (timestamps, values) 两个只读视图，分别为 int64 epoch 秒与 float32 流量
+        """
+        row = self._index[sensor_id]
+        available = self.length(sensor_id)
+        size = available if size is None else min(size, available)
+
+        start = (self._head - size) % self.capacity
+        timestamps = self._timestamps[start:start + size]
+        values = self._values[row, start:start + size]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def latest_windows(self, sensor_ids: Iterable, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次取出多个传感器的最新窗口
+
+        Returns:
+            tuple: (timestamps, values)，values 形状为 (n_sensors, size)
+        """
+        rows = np.array([self._index[s] for s in sensor_ids], dtype=np.int64)
+        size = min(size, self._head, self.capacity)
+        start = (self._head - size) % self.capacity
+        return self._timestamps[start:start + size].copy(), self._values[rows, start:start + size]
+
+    def append(self, sensor_id, timestamp, value: float):
+        """追加单个样本"""
+        self.append_many([sensor_id], [timestamp], [value])
+
+    def append_many(self, sensor_ids, timestamps, values) -> int:
+        """
+        批量追加样本
+
+        时间戳晚于当前最新时间槽的样本会开启新的时间槽；不晚于最新时间槽的样本
+        写入时间轴上时间戳相同的已有时间槽（其他传感器已经开辟的时间点）。
+        时间戳早于该传感器自己最近写入的样本、或不在保留时间轴上的样本视为乱序，整批拒绝。
+
+        Args:
+            sensor_ids: 每个样本的传感器ID
+            timestamps: 每个样本的时间戳（datetime / datetime64 / epoch 秒）
+            values: 每个样本的流量值
+
+        Returns:
+            int: 写入后的全局修订号
+
+        Raises:
+            ValueError: 长度不一致或存在乱序样本
+        """
+        ts = to_epoch_seconds(timestamps)
+        vals = np.asarray(values, dtype=np.float32)
+        if not (len(sensor_ids) == len(ts) == len(vals)):
+            raise ValueError("sensor_ids、timestamps 与 values 长度必须一致")
+        if len(ts) == 0:
+            return self.revision
+
+        with self._lock:
+            latest = self.latest_timestamp
+            old, old_slots = self._locate(sensor_ids, ts)
+
+            unique_ids, inverse = np.unique(np.asarray(sensor_ids, dtype=object), return_inverse=True)
+            rows = np.array([self._row(s) for s in unique_ids], dtype=np.int64)[inverse]
+
+            # 为新的时间戳开辟时间槽
+            new_ts = np.unique(ts if latest is None else ts[ts > latest])
+            base = self._head
+            if len(new_ts):
+                self._advance(new_ts)
+
+            slots = base + np.searchsorted(new_ts, ts)
+            slots[old] = old_slots
+
+            # 同一批次内已被覆盖的旧样本直接丢弃
+            live = slots >= self._head - self.capacity
+            rows, slots, vals = rows[live], slots[live], vals[live]
+
+            # 同一传感器同一时间槽重复写入时保留最后一个，并按 (行, 时间槽) 排序
+            keys = rows * (self._head + 1) + slots
+            _, last = np.unique(keys[::-1], return_index=True)
+            keep = len(keys) - 1 - last
+            rows, slots, vals = rows[keep], slots[keep], vals[keep]
+
+            positions = slots % self.capacity
+            old_values = self._values[rows, positions] if self._listeners else None
+            self._values[rows, positions] = vals
+            self._values[rows, positions + self.capacity] = vals
+            np.minimum.at(self._first_slot, rows, slots)
+            np.maximum.at(self._last_slot, rows, slots)
+
+            for listener in self._listeners:
+                listener.on_write(rows, slots, old_values, vals, self._timestamps[positions])
+
+            self.revision += 1
+            self._sensor_revision[rows] = self.revision
+            return self.revision
+
+    def check_order(self, sensor_ids, timestamps):
+        """
+        检查一批样本能否写入（不修改存储）
+
+        Raises:
+            ValueError: 存在乱序样本，规则同 append_many
+        """
+        ts = to_epoch_seconds(timestamps)
+        if len(ts):
+            with self._lock:
+                self._locate(sensor_ids, ts)
+
+    def _locate(self, sensor_ids, ts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        定位不晚于最新时间的样本所在的已有时间槽，并按传感器检查写入顺序（调用方持有锁）
+
+        Returns:
+            tuple: (old, slots)，old 为这些样本的布尔掩码，slots 为它们的时间槽
+        """
+        latest = self.latest_timestamp
+        old = np.zeros(len(ts), dtype=bool) if latest is None else ts <= latest
+        if not old.any():
+            return old, np.empty(0, dtype=np.int64)
+
+        # 共享时钟单调递增，保留的时间槽按时间顺序构成一个连续视图
+        n_retained = min(self._head, self.capacity)
+        start = (self._head - n_retained) % self.capacity
+        retained = self._timestamps[start:start + n_retained]
+        old_ts = ts[old]
+        index = np.minimum(np.searchsorted(retained, old_ts), n_retained - 1)
+        missing = retained[index] != old_ts
+        if missing.any():
+            raise ValueError(
+                f"时间戳 {int(old_ts[missing][0])} 早于当前最新时间 {latest} 且不在保留的时间轴上，拒绝乱序写入"
+            )
+        slots = self._head - n_retained + index
+
+        old_ids = np.asarray(sensor_ids, dtype=object)[old]
+        unique_ids, inverse = np.unique(old_ids, return_inverse=True)
+        last = np.array(
+            [self._last_slot[self._index[s]] if s in self._index else -1 for s in unique_ids], dtype=np.int64
+        )[inverse]
+        behind = slots < last
+        if behind.any():
+            sensor_id = old_ids[behind][0]
+            raise ValueError(
+                f"传感器 {sensor_id} 的时间戳 {int(old_ts[behind][0])} 早于该传感器最近写入的样本，拒绝乱序写入"
+            )
+        return old, slots
+
+    def _advance(self, new_ts: np.ndarray):
+        n_new = len(new_ts)
+        n_write = min(n_new, self.capacity)
+        slots = self._head + n_new - n_write + np.arange(n_write)
+        positions = slots % self.capacity
+
+        # 通知监听器即将被覆盖的旧时间槽
+        evicted = positions[(slots >= self.capacity) & (slots - self.capacity < self._head)]
+        if self._listeners and len(evicted):
+            evicted_values = self._values[:, evicted]
+            evicted_timestamps = self._timestamps[evicted]
+            for listener in self._listeners:
+                listener.on_evict(evicted_values, evicted_timestamps)
+
+        self._timestamps[positions] = new_ts[-n_write:]
+        self._timestamps[positions + self.capacity] = new_ts[-n_write:]
+        # 缓冲区第一次写满之前的位置从未写入过（仍为 NaN），只需清空被复用的位置；
+        # 尚未分配给传感器的行也一直是 NaN
+        recycled = positions[slots >= self.capacity]
+        if len(recycled):
+            n_used = len(self._index)
+            self._values[:n_used, recycled] = np.nan
+            self._values[:n_used, recycled + self.capacity] = np.nan
+        self._head += n_new
+
+    def _row(self, sensor_id) -> int:
+        row = self._index.get(sensor_id)
+        if row is None:
+            row = len(self._index)
+            if row == len(self._values):
+                self._grow()
+            self._index[sensor_id] = row
+            self._row_ids.append(sensor_id)
+            self._first_slot[row] = np.iinfo(np.int64).max
+        return row
+
+    def _grow(self):
+        n_rows = len(self._values)
+        values = np.full((2 * n_rows, 2 * self.capacity), np.nan, dtype=np.float32)
+        values[:n_rows] = self._values
+        self._values = values
+        self._first_slot = np.concatenate([self._first_slot, np.zeros(n_rows, dtype=np.int64)])
+        self._last_slot = np.concatenate([self._last_slot, np.full(n_rows, -1, dtype=np.int64)])
+        self._sensor_revision = np.concatenate([self._sensor_revision, np.zeros(n_rows, dtype=np.int64)])
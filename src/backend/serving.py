@@ -0,0 +1,127 @@
+"""
+CPU 推理服务配置模块
+
+按机器核数与 uvicorn 进程数划分 PyTorch 线程，并在线程池中运行多个模型副本，
+避免多进程部署时默认线程设置导致的 CPU 超额订阅。
+"""
+import copy
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+import torch
+
+
+class ServingConfig:
+    """
+    推理服务配置
+
+    环境变量:
+        WEB_CONCURRENCY: uvicorn 工作进程数
+        TORCH_NUM_THREADS: 每个模型副本的 intra-op 线程数
+        TORCH_NUM_INTEROP_THREADS: inter-op 线程数
+        MODEL_REPLICAS: 每个工作进程中的模型副本数，默认用满分配给该进程的核
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+        replicas: Optional[int] = None,
+        cpu_count: Optional[int] = None,
+    ):
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.workers = max(1, workers or int(os.getenv("WEB_CONCURRENCY", "1")))
+        cores_per_worker = max(1, self.cpu_count // self.workers)
+
+        self.intra_op_threads = max(1, intra_op_threads or int(os.getenv("TORCH_NUM_THREADS", "1")))
+        self.inter_op_threads = max(1, inter_op_threads or int(os.getenv("TORCH_NUM_INTEROP_THREADS", "1")))
+        default_replicas = max(1, cores_per_worker // self.intra_op_threads)
+        self.replicas = max(1, replicas or int(os.getenv("MODEL_REPLICAS", str(default_replicas))))
+
+    def apply(self):
+        """设置当前进程的 PyTorch 线程数"""
+        torch.set_num_threads(self.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError:
+            # inter-op 线程池启动后不能再修改（例如热重载后再次初始化）
+            pass
+
+    def to_dict(self) -> dict:
+        return {
+            "cpu_count": self.cpu_count,
+            "workers": self.workers,
+            "replicas": self.replicas,
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "torch_num_threads": torch.get_num_threads(),
+            "torch_num_interop_threads": torch.get_num_interop_threads(),
+        }
+
+
+class ModelPool:
+    """
+    模型副本池
+
+    每个副本同一时刻只处理一个批次；调用方在线程池中执行 run，
+    空闲副本通过队列分配，并统计每个副本的忙碌时间。
+    """
+
+    def __init__(self, model: torch.nn.Module, replicas: int = 1):
+        self.models = [model] + [copy.deepcopy(model) for _ in range(replicas - 1)]
+        for replica in self.models:
+            replica.eval()
+
+        self.executor = ThreadPoolExecutor(max_workers=replicas, thread_name_prefix="model-replica")
+        self._idle = queue.SimpleQueue()
+        for i in range(replicas):
+            self._idle.put(i)
+
+        self._busy_seconds = [0.0] * replicas
+        self._batches = [0] * replicas
+        self._samples = [0] * replicas
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.models)
+
+    def run(self, inputs: np.ndarray) -> np.ndarray:
+        """在空闲副本上执行一次批量前向计算（阻塞，应在线程池中调用）"""
+        index = self._idle.get()
+        start = time.perf_counter()
+        try:
+            with torch.no_grad():
+                return self.models[index](torch.from_numpy(inputs)).numpy()
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._busy_seconds[index] += elapsed
+                self._batches[index] += 1
+                self._samples[index] += len(inputs)
+            self._idle.put(index)
+
+    def utilization(self) -> list:
+        """每个副本的忙碌时间占比"""
+        uptime = max(time.perf_counter() - self._started, 1e-9)
+        with self._lock:
+            return [
+                {
+                    "replica": i,
+                    "batches": self._batches[i],
+                    "samples": self._samples[i],
+                    "busy_seconds": self._busy_seconds[i],
+                    "utilization": self._busy_seconds[i] / uptime,
+                }
+                for i in range(self.size)
+            ]
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,52 @@
+"""
+启动耗时统计模块
+
+记录冷启动各阶段（模块导入、模型加载、数据预热等）的耗时，启动完成后输出一次报告，
+并通过 /serving 与 /metrics 暴露，便于评估自动扩缩容时新实例的就绪时间。
+"""
+import time
+from collections import OrderedDict
+
+
+class _Phase:
+    __slots__ = ("report", "name", "start")
+
+    def __init__(self, report: "StartupReport", name: str):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.report.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StartupReport:
+    """按阶段累计启动耗时（秒），同名阶段多次记录时累加"""
+
+    def __init__(self):
+        self.phases = OrderedDict()
+
+    def phase(self, name: str) -> _Phase:
+        """计时上下文管理器：with report.phase("model_load"): ..."""
+        return _Phase(self, name)
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "phases_seconds": dict(self.phases),
+            "total_seconds": self.total,
+        }
+
+    def format(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000.0:.0f}ms" for name, seconds in self.phases.items())
+        return f"Startup finished in {self.total * 1000.0:.0f}ms ({parts})"
@@ -0,0 +1,3 @@
+"""
+Traffic Flow Prediction Benchmarks Package
+"""
@@ -0,0 +1,171 @@
+"""
+基准测试公共工具
+
+计时、运行环境记录、结果保存与基线对比。每个基准结果是一个字典，
+至少包含 median_ms，对比时以中位数耗时为准。
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import torch
+
+
+def autorange(fn: Callable[[], object], min_time_ms: float = 20.0) -> int:
+    """与 timeit.Timer.autorange 相同：找到使单轮耗时不少于 min_time_ms 的调用次数"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if (time.perf_counter() - start) * 1000.0 >= min_time_ms:
+            return number
+        number *= 2
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1, number: Optional[int] = None,
+            items: Optional[int] = None) -> dict:
+    """
+    多次运行并统计耗时
+
+    计时期间关闭垃圾回收（与 timeit 相同），避免回收时机造成的抖动。
+
+    Args:
+        fn: 被测函数（无参数）
+        repeat: 计时轮数
+        warmup: 预热次数（不计时）
+        number: 每轮连续调用次数，耗时按单次调用计算；为 None 时自动确定，使每轮不少于 20ms
+        items: 每次调用处理的样本数，提供时额外给出吞吐量
+
+    Returns:
+        dict: median_ms / mean_ms / min_ms / max_ms / stdev_ms 等统计量
+    """
+    for _ in range(warmup):
+        fn()
+    if number is None:
+        number = autorange(fn)
+
+    times = []
+    gc.collect()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            times.append((time.perf_counter() - start) / number * 1000.0)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    result = {
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.fmean(times),
+        "min_ms": min(times),
+        "max_ms": max(times),
+        "stdev_ms": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+    if items is not None:
+        result["items"] = items
+        result["items_per_sec"] = items / (result["median_ms"] / 1000.0) if result["median_ms"] > 0 else 0.0
+    return result
+
+
+def environment() -> dict:
+    """记录影响结果的运行环境"""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def save_results(path: str, results: Dict[str, dict], env: Optional[dict] = None, config: Optional[dict] = None):
+    """保存为 JSON：{"environment": ..., "config": ..., "results": {名称: 统计量}}"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "environment": env or environment(),
+            "config": config or {},
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float = 0.1) -> list:
+    """
+    与基线逐项对比中位数耗时
+
+    Args:
+        current: 本次结果
+        baseline: 基线结果
+        threshold: 相对变化超过该比例才视为变快或变慢
+
+    Returns:
+        list: 每项为 {"name", "baseline_ms", "current_ms", "ratio", "status"}，
+            status 为 faster / slower / same / new / missing
+    """
+    rows = []
+    for name in sorted(set(current) | set(baseline)):
+        if name not in baseline:
+            rows.append({"name": name, "baseline_ms": None, "current_ms": current[name]["median_ms"],
+                         "ratio": None, "status": "new"})
+            continue
+        if name not in current:
+            rows.append({"name": name, "baseline_ms": baseline[name]["median_ms"], "current_ms": None,
+                         "ratio": None, "status": "missing"})
+            continue
+
+        base = baseline[name]["median_ms"]
+        value = current[name]["median_ms"]
+        ratio = value / base if base > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "slower"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "same"
+        rows.append({"name": name, "baseline_ms": base, "current_ms": value, "ratio": ratio, "status": status})
+    return rows
+
+
+def format_comparison(rows: list) -> str:
+    """对比结果的文本表格"""
+    width = max([len(row["name"]) for row in rows] + [4])
+    lines = [f"{'name':<{width}}  {'baseline_ms':>12}  {'current_ms':>12}  {'ratio':>7}  status"]
+    for row in rows:
+        base = f"{row['baseline_ms']:.3f}" if row["baseline_ms"] is not None else "-"
+        value = f"{row['current_ms']:.3f}" if row["current_ms"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        lines.append(f"{row['name']:<{width}}  {base:>12}  {value:>12}  {ratio:>7}  {row['status']}")
+    return "\n".join(lines)
+
+
+def format_results(results: Dict[str, dict]) -> str:
+    """本次结果的文本表格"""
+    width = max([len(name) for name in results] + [4])
+    lines = [f"{'name':<{width}}  {'median_ms':>12}  {'min_ms':>12}  {'items/s':>12}"]
+    for name, result in results.items():
+        rate = f"{result['items_per_sec']:.1f}" if "items_per_sec" in result else "-"
+        lines.append(f"{name:<{width}}  {result['median_ms']:>12.3f}  {result.get('min_ms', result['median_ms']):>12.3f}  {rate:>12}")
+    return "\n".join(lines)
@@ -0,0 +1,78 @@
+"""
+数据准备基准：时序窗口构建与 TrafficDataPreprocessor 各步骤
+"""
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.core import measure
+from models.traffic_cnn import create_sequences
+from utils.data_utils import TrafficDataPreprocessor
+from utils.synthetic import SyntheticTrafficGenerator
+from utils.windowing import sliding_windows, multi_sensor_windows
+
+SEQUENCE_LENGTH = 12
+MULTI_SENSORS = 100
+
+
+def make_series(n_steps: int, n_sensors: int = 1, seed: int = 0) -> np.ndarray:
+    """固定种子的模拟流量，形状为 (n_sensors, n_steps)"""
+    _, values = SyntheticTrafficGenerator.random_profiles(n_sensors, seed=seed).generate(n_steps)
+    return values.astype(np.float32)
+
+
+def make_frame(n_steps: int, missing_fraction: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """带少量缺失值的单传感器 DataFrame（timestamp / traffic_flow）"""
+    generator = SyntheticTrafficGenerator(seed=seed)
+    timestamps, values = generator.generate(n_steps, end_time=np.datetime64("2024-01-01T00:00:00"))
+    flow = values[0]
+    missing = np.random.default_rng(seed).random(n_steps) < missing_fraction
+    flow[missing] = np.nan
+    return pd.DataFrame({"timestamp": timestamps, "traffic_flow": flow})
+
+
+def run(sizes: Sequence[int] = (1_000, 100_000, 1_000_000), repeat: int = 5, seed: int = 0) -> Dict[str, dict]:
+    """
+    Args:
+        sizes: 单传感器序列长度
+        repeat: 每项计时轮数
+        seed: 数据随机种子
+
+    Returns:
+        dict: {基准名称: 统计量}
+    """
+    results = {}
+    preprocessor = TrafficDataPreprocessor(sequence_length=SEQUENCE_LENGTH)
+
+    for n in sizes:
+        series = make_series(n, seed=seed)[0]
+        n_windows = n - SEQUENCE_LENGTH
+
+        results[f"windows/sliding_view/n={n}"] = measure(
+            lambda: sliding_windows(series, SEQUENCE_LENGTH), repeat=repeat, items=n_windows)
+        results[f"windows/sliding_copy/n={n}"] = measure(
+            lambda: sliding_windows(series, SEQUENCE_LENGTH, copy=True), repeat=repeat, items=n_windows)
+        results[f"windows/torch_create_sequences/n={n}"] = measure(
+            lambda: create_sequences(series, SEQUENCE_LENGTH), repeat=repeat, items=n_windows)
+
+        # 多传感器：总样本数与单传感器相同
+        steps = max(n // MULTI_SENSORS, SEQUENCE_LENGTH + 1)
+        matrix = make_series(steps, MULTI_SENSORS, seed=seed)
+        results[f"windows/multi_sensor_copy/n={n}"] = measure(
+            lambda: multi_sensor_windows(matrix, SEQUENCE_LENGTH, copy=True),
+            repeat=repeat, items=MULTI_SENSORS * (steps - SEQUENCE_LENGTH))
+
+        frame = make_frame(n, seed=seed)
+        filled = frame.dropna()
+        results[f"preprocess/interpolate_missing/n={n}"] = measure(
+            lambda: preprocessor.interpolate_missing(frame), repeat=repeat, items=n)
+        results[f"preprocess/remove_outliers/n={n}"] = measure(
+            lambda: preprocessor.remove_outliers(filled, "traffic_flow"), repeat=repeat, items=len(filled))
+        values = filled["traffic_flow"].to_numpy()
+        results[f"preprocess/normalize_data/n={n}"] = measure(
+            lambda: preprocessor.normalize_data(values), repeat=repeat, items=len(values))
+        results[f"preprocess/create_sequences/n={n}"] = measure(
+            lambda: preprocessor.create_sequences(values), repeat=repeat, items=len(values))
+
+    return results
@@ -0,0 +1,111 @@
+"""
+模型基准：TrafficCNN 前向推理、图像+流量融合模型推理与 train_model 单个 epoch
+"""
+import contextlib
+import io
+import os
+import tempfile
+from typing import Dict, Sequence
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+from torch.utils.data import TensorDataset
+
+from benchmarks.core import measure
+from benchmarks.data_prep import SEQUENCE_LENGTH, make_series
+from models.cnn_model import FusionPredictor, TrafficCNN as FusionCNN
+from models.traffic_cnn import TrafficCNN
+from models.train import train_model, create_data_loaders
+from utils.windowing import sliding_windows
+
+
+def run_forward(batch_sizes: Sequence[int] = (1, 8, 64, 256, 1024), repeat: int = 20,
+                seed: int = 0) -> Dict[str, dict]:
+    """eval 模式、inference_mode 下的前向耗时"""
+    torch.manual_seed(seed)
+    model = TrafficCNN(sequence_length=SEQUENCE_LENGTH).eval()
+    generator = torch.Generator().manual_seed(seed)
+
+    results = {}
+    for batch_size in batch_sizes:
+        x = torch.randn(batch_size, 1, SEQUENCE_LENGTH, generator=generator)
+
+        def forward():
+            with torch.inference_mode():
+                model(x)
+
+        results[f"model/forward/b={batch_size}"] = measure(
+            forward, repeat=repeat, warmup=3, items=batch_size)
+    return results
+
+
+def run_fusion(batch_sizes: Sequence[int] = (1, 8, 64, 256), image_size=(64, 64), flow_steps: int = 12,
+               repeat: int = 10, seed: int = 0) -> Dict[str, dict]:
+    """
+    models/cnn_model.py 融合模型的 FusionPredictor 推理耗时
+
+    full 每次都运行卷积分支，cached 的帧嵌入已缓存，只计算流量分支与融合层。
+    """
+    torch.manual_seed(seed)
+    model = FusionCNN(image_size=image_size).eval()
+    rng = np.random.default_rng(seed)
+
+    results = {}
+    for batch_size in batch_sizes:
+        images = rng.integers(0, 256, size=(batch_size, 3) + tuple(image_size), dtype=np.uint8)
+        flows = rng.standard_normal((batch_size, flow_steps, 128), dtype=np.float32)
+        keys = list(range(batch_size))
+        predictor = FusionPredictor(model, max_batch_size=max(batch_sizes), cache_size=max(batch_sizes))
+
+        results[f"model/fusion_full/b={batch_size}"] = measure(
+            lambda: predictor.predict(images, flows), repeat=repeat, warmup=2, items=batch_size)
+        predictor.predict(images, flows, frame_keys=keys)
+        results[f"model/fusion_cached/b={batch_size}"] = measure(
+            lambda: predictor.predict(None, flows, frame_keys=keys), repeat=repeat, warmup=2, items=batch_size)
+    return results
+
+
+def build_training_data(n_samples: int, seed: int = 0):
+    """固定种子的训练/验证集（80/20 划分，全局归一化）"""
+    series = make_series(n_samples + SEQUENCE_LENGTH, seed=seed)[0]
+    series = (series - series.mean()) / series.std()
+    X, y = sliding_windows(series, SEQUENCE_LENGTH, copy=True)
+    X = torch.from_numpy(np.array(X)).view(-1, 1, SEQUENCE_LENGTH)
+    y = torch.from_numpy(np.array(y)).view(-1, 1)
+    split = int(len(X) * 0.8)
+    return TensorDataset(X[:split], y[:split]), TensorDataset(X[split:], y[split:])
+
+
+def run_training(sample_sizes: Sequence[int] = (10_000, 100_000), batch_size: int = 32,
+                 repeat: int = 3, seed: int = 0) -> Dict[str, dict]:
+    """
+    train_model 单个 epoch（含验证）的耗时
+
+    每轮使用相同初始权重的新模型与优化器，训练过程的输出被丢弃。
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_path = os.path.join(tmpdir, "model.pth")
+        for n_samples in sample_sizes:
+            train_dataset, val_dataset = build_training_data(n_samples, seed=seed)
+            throughput = []
+
+            def epoch():
+                torch.manual_seed(seed)
+                model = TrafficCNN(sequence_length=SEQUENCE_LENGTH)
+                train_loader, val_loader = create_data_loaders(
+                    train_dataset, val_dataset, batch_size=batch_size, seed=seed)
+                optimizer = optim.Adam(model.parameters(), lr=0.001)
+                with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+                    *_, epoch_stats = train_model(
+                        model, train_loader, val_loader, nn.MSELoss(), optimizer,
+                        num_epochs=1, device=torch.device("cpu"), save_path=save_path)
+                throughput.append(epoch_stats[0]["samples_per_sec"])
+
+            result = measure(epoch, repeat=repeat, warmup=1, number=1, items=len(train_dataset))
+            # train_model 自身统计的训练阶段吞吐量（不含验证）
+            result["train_samples_per_sec"] = float(np.median(throughput[-repeat:]))
+            results[f"train/epoch/n={n_samples}/b={batch_size}"] = result
+    return results
@@ -0,0 +1,112 @@
+"""
+运行基准测试并与基线对比
+
+示例:
+    python src/benchmarks/run.py --output benchmarks/results.json
+    python src/benchmarks/run.py --suites model,serving --baseline benchmarks/baseline.json
+    python src/benchmarks/run.py --quick --save-baseline benchmarks/baseline.json
+"""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from benchmarks.core import (
+    environment, save_results, load_results, compare_results, format_comparison, format_results
+)
+
+SUITES = ("data", "model", "train", "serving")
+
+# 各基准组结果名称的前缀，对比时只比较本次运行的组
+SUITE_PREFIXES = {
+    "data": ("windows/", "preprocess/"),
+    "model": ("model/",),
+    "train": ("train/",),
+    "serving": ("serving/",),
+}
+
+
+def run_suites(suites, quick: bool = False, seed: int = 0, serving_cache: bool = True) -> dict:
+    """
+    按顺序运行选中的基准组
+
+    quick 模式使用更小的数据量与更少的轮数，用于快速检查。
+    """
+    results = {}
+    if "data" in suites:
+        from benchmarks import data_prep
+        sizes = (1_000, 10_000) if quick else (1_000, 100_000, 1_000_000)
+        results.update(data_prep.run(sizes=sizes, repeat=3 if quick else 5, seed=seed))
+    if "model" in suites:
+        from benchmarks import model
+        results.update(model.run_forward(repeat=5 if quick else 20, seed=seed))
+        results.update(model.run_fusion(repeat=3 if quick else 10, seed=seed))
+    if "train" in suites:
+        from benchmarks import model
+        sizes = (2_000,) if quick else (10_000, 100_000)
+        results.update(model.run_training(sample_sizes=sizes, repeat=1 if quick else 3, seed=seed))
+    if "serving" in suites:
+        from benchmarks import serving
+        results.update(serving.run(requests=100 if quick else 500, cache=serving_cache))
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='运行性能基准测试')
+    parser.add_argument('--suites', default=','.join(SUITES),
+                        help=f'逗号分隔的基准组：{",".join(SUITES)}')
+    parser.add_argument('--quick', action='store_true', help='使用较小的工作负载')
+    parser.add_argument('--seed', type=int, default=0, help='工作负载随机种子')
+    parser.add_argument('--threads', type=int, default=None, help='torch 计算线程数（默认不修改）')
+    parser.add_argument('--no-serving-cache', action='store_true', help='服务基准关闭响应缓存')
+    parser.add_argument('--output', default=None, help='结果 JSON 路径')
+    parser.add_argument('--baseline', default=None, help='用于对比的基线结果 JSON')
+    parser.add_argument('--save-baseline', default=None, help='把本次结果另存为基线')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='相对变化超过该比例才视为变快或变慢')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='任一基准比基线变慢时以非零状态退出')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    suites = [s.strip() for s in args.suites.split(',') if s.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        raise SystemExit(f"未知的基准组: {', '.join(sorted(unknown))}")
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    config = {
+        "suites": suites,
+        "quick": args.quick,
+        "seed": args.seed,
+        "serving_cache": not args.no_serving_cache,
+    }
+    env = environment()
+    results = run_suites(suites, quick=args.quick, seed=args.seed, serving_cache=not args.no_serving_cache)
+    print(format_results(results))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            save_results(path, results, env=env, config=config)
+            print(f"Results saved to {path}")
+
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        if baseline.get("config", {}).get("quick") != args.quick:
+            print("Warning: baseline was recorded with a different --quick setting")
+        prefixes = tuple(p for suite in suites for p in SUITE_PREFIXES[suite])
+        reference = {name: r for name, r in baseline["results"].items() if name.startswith(prefixes)}
+        rows = compare_results(results, reference, threshold=args.threshold)
+        print()
+        print(format_comparison(rows))
+        if args.fail_on_regression and any(row["status"] == "slower" for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
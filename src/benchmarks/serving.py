@@ -0,0 +1,87 @@
+"""
+服务基准：进程内对 /predict、/stats、/analysis 做 HTTP 压测
+
+通过 TestClient 直接驱动 ASGI 应用（包括启动事件、推理合批与响应缓存），
+不经过网络。后端的环境变量在导入 backend.main 时读取，因此 run() 会在首次导入前设置
+SIMULATED_SENSORS 与 RESPONSE_CACHE_SIZE。
+"""
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Sequence
+
+import numpy as np
+
+ENDPOINTS = ("/predict", "/stats", "/analysis")
+
+
+def _percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def load_test(client, path: str, sensor_ids: Sequence[str], requests: int, concurrency: int) -> dict:
+    """
+    以固定并发数发送请求，传感器轮流使用
+
+    Returns:
+        dict: 延迟分位数（毫秒）、吞吐量与错误数；median_ms 为 p50
+    """
+    latencies = []
+    errors = 0
+
+    def send(i: int):
+        start = time.perf_counter()
+        response = client.get(path, params={"sensor_id": sensor_ids[i % len(sensor_ids)]})
+        return (time.perf_counter() - start) * 1000.0, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, status in executor.map(send, range(requests)):
+            latencies.append(latency)
+            errors += status != 200
+    elapsed = time.perf_counter() - started
+
+    return {
+        "median_ms": statistics.median(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "min_ms": min(latencies),
+        "p95_ms": _percentile(latencies, 95),
+        "p99_ms": _percentile(latencies, 99),
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "items": requests,
+        "items_per_sec": requests / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def run(requests: int = 500, concurrency_levels: Sequence[int] = (1, 8), sensors: int = 64,
+        cache: bool = True) -> Dict[str, dict]:
+    """
+    Args:
+        requests: 每个接口、每个并发级别的请求数
+        concurrency_levels: 并发数
+        sensors: 模拟传感器数量（请求轮流访问，避免只测到单个缓存条目）
+        cache: 是否启用响应缓存；关闭时每个请求都重新计算
+
+    Returns:
+        dict: {基准名称: 统计量}
+    """
+    os.environ.setdefault("SIMULATED_SENSORS", str(sensors))
+    if not cache:
+        os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+    from fastapi.testclient import TestClient
+    from backend import main
+
+    sensor_ids = [main.DEFAULT_SENSOR_ID] + [f"sensor_{i}" for i in range(1, main.SIMULATED_SENSORS)]
+    results = {}
+    with TestClient(main.app) as client:
+        for path in ENDPOINTS:
+            # 预热：加载模型、填充预计算结果与缓存
+            load_test(client, path, sensor_ids, len(sensor_ids), 1)
+            for concurrency in concurrency_levels:
+                results[f"serving{path}/c={concurrency}"] = load_test(
+                    client, path, sensor_ids, requests, concurrency)
+    return results
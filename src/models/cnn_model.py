@@ -1,10 +1,25 @@
+from collections import OrderedDict
+
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+# 图像分支输出的嵌入维度（fc1 输出）与时序分支的隐藏维度
+IMAGE_EMBEDDING_DIM = 512
+FLOW_HIDDEN_DIM = 64
+
+
 class TrafficCNN(nn.Module):
-    def __init__(self, input_channels=3, num_classes=1):
+    def __init__(self, input_channels=3, num_classes=1, image_size=(64, 64)):
+        """
+        Args:
+            input_channels: 图像通道数
+            num_classes: 输出维度
+            image_size: 输入图像的 (高, 宽)，三次 2x2 池化后展平，决定 fc1 的输入维度
+        """
         super(TrafficCNN, self).__init__()
+        self.image_size = tuple(image_size)
         
         # 图像特征提取
         self.conv1 = nn.Conv2d(input_channels, 32, kernel_size=3, padding=1)
@@ -14,18 +29,31 @@ class TrafficCNN(nn.Module):
         self.dropout = nn.Dropout(0.5)
         
         # 时序特征提取
-        self.lstm = nn.LSTM(input_size=128, hidden_size=64, num_layers=2, batch_first=True)
+        self.lstm = nn.LSTM(input_size=128, hidden_size=FLOW_HIDDEN_DIM, num_layers=2, batch_first=True)
         
         # 全连接层
-        self.fc1 = nn.Linear(128 * 8 * 8, 512)
-        self.fc2 = nn.Linear(512, 128)
+        height, width = self.image_size
+        self.fc1 = nn.Linear(128 * (height // 8) * (width // 8), IMAGE_EMBEDDING_DIM)
+        self.fc2 = nn.Linear(IMAGE_EMBEDDING_DIM + FLOW_HIDDEN_DIM, 128)
         self.fc3 = nn.Linear(128, num_classes)
         
-        # 注意力机制
-        self.attention = nn.MultiheadAttention(embed_dim=64, num_heads=4)
+        # 注意力机制（与 LSTM 输出一致，按 (batch, 时间, 特征) 排列，在时间维度上计算注意力）
+        self.attention = nn.MultiheadAttention(embed_dim=FLOW_HIDDEN_DIM, num_heads=4, batch_first=True)
+        
+    def encode_image(self, x_img):
+        """
+        图像分支：卷积特征提取与 fc1
+        
+        Args:
+            x_img: (N, C, 高, 宽) 的浮点或 uint8 图像
+            
+        Returns:
+            torch.Tensor: (N, IMAGE_EMBEDDING_DIM) 的图像嵌入
+        """
+        # uint8 图像批次（utils/image_pipeline.py）在模型侧转换为 [0, 1] 浮点
+        if x_img.dtype == torch.uint8:
+            x_img = x_img.float().div_(255.0)
         
-    def forward(self, x_img, x_flow):
-        # 图像特征提取
         x_img = F.relu(self.conv1(x_img))
         x_img = self.pool(x_img)
         x_img = F.relu(self.conv2(x_img))
@@ -34,24 +62,167 @@ class TrafficCNN(nn.Module):
         x_img = self.pool(x_img)
         
         # 展平图像特征
-        x_img = x_img.view(-1, 128 * 8 * 8)
+        x_img = torch.flatten(x_img, 1)
         x_img = self.dropout(x_img)
-        x_img = F.relu(self.fc1(x_img))
+        return F.relu(self.fc1(x_img))
+    
+    def fuse(self, image_embedding, x_flow):
+        """
+        时序分支与融合输出
         
+        Args:
+            image_embedding: encode_image 的输出
+            x_flow: (N, 时间步, 128) 的流量特征
+        """
         # 时序特征提取
         x_flow, _ = self.lstm(x_flow)
         
         # 注意力机制
-        x_flow, _ = self.attention(x_flow, x_flow, x_flow)
+        x_flow, _ = self.attention(x_flow, x_flow, x_flow, need_weights=False)
         
         # 特征融合
-        x_combined = torch.cat((x_img, x_flow[:, -1, :]), dim=1)
+        x_combined = torch.cat((image_embedding, x_flow[:, -1, :]), dim=1)
         x_combined = self.dropout(x_combined)
         x_combined = F.relu(self.fc2(x_combined))
         
         # 输出预测
-        out = self.fc3(x_combined)
-        return out
+        return self.fc3(x_combined)
+        
+    def forward(self, x_img, x_flow):
+        return self.fuse(self.encode_image(x_img), x_flow)
+
+
+class FusionPredictor:
+    """
+    TrafficCNN 的批量推理封装
+    
+    同一摄像头帧往往对应多次流量更新，因此按调用方给出的帧键（例如 (摄像头, 帧时间)）
+    缓存图像嵌入：已缓存的帧跳过卷积分支，只计算 LSTM、注意力与融合层。
+    嵌入存放在预分配的张量中，超出容量时淘汰最久未使用的帧；预测结果写入预分配的输出数组。
+    """
+    
+    def __init__(self, model, max_batch_size=1024, cache_size=4096):
+        """
+        Args:
+            model: TrafficCNN
+            max_batch_size: 单次前向的最大批量，更大的输入分块计算
+            cache_size: 最多缓存的图像嵌入数，为 0 时不缓存
+        """
+        self.model = model.eval()
+        self.device = next(model.parameters()).device
+        self.max_batch_size = max_batch_size
+        self.num_classes = model.fc3.out_features
+        self.output = np.empty((max_batch_size, self.num_classes), dtype=np.float32)
+        
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._embeddings = torch.empty(cache_size, IMAGE_EMBEDDING_DIM, device=self.device)
+        self._slots = OrderedDict()  # 帧键 -> 槽位，按最近使用排序
+        self._free = list(range(cache_size - 1, -1, -1))
+        
+    def _to_tensor(self, value):
+        if isinstance(value, np.ndarray):
+            value = torch.from_numpy(value)
+        return value.to(self.device, non_blocking=True)
+    
+    def _check_images(self, images):
+        if tuple(images.shape[-2:]) != self.model.image_size:
+            raise ValueError(f"图像尺寸 {tuple(images.shape[-2:])} 与模型的 {self.model.image_size} 不一致")
+    
+    def _store(self, key, embedding):
+        if key in self._slots:
+            slot = self._slots[key]
+            self._slots.move_to_end(key)
+        elif self._free:
+            slot = self._free.pop()
+            self._slots[key] = slot
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self._slots[key] = slot
+        self._embeddings[slot] = embedding
+    
+    def _image_embeddings(self, images, frame_keys):
+        """查缓存，只对未命中的帧（同一批内去重）运行卷积分支"""
+        if frame_keys is None or self.cache_size == 0:
+            if images is None:
+                raise ValueError("未提供图像")
+            self._check_images(images)
+            return self.model.encode_image(self._to_tensor(images))
+        
+        if images is not None and len(images) != len(frame_keys):
+            raise ValueError("图像数与帧键数不一致")
+        if len(set(frame_keys)) > self.cache_size:
+            raise ValueError("批内不同的帧数超过嵌入缓存容量")
+        missing = {}
+        for i, key in enumerate(frame_keys):
+            if key in self._slots:
+                self._slots.move_to_end(key)
+            elif key not in missing:
+                missing[key] = i
+        self.hits += len(frame_keys) - len(missing)
+        self.misses += len(missing)
+        
+        if missing:
+            if images is None:
+                raise KeyError(f"图像嵌入未缓存: {next(iter(missing))}")
+            self._check_images(images)
+            rows = list(missing.values())
+            embeddings = self.model.encode_image(self._to_tensor(images[rows]))
+            for key, embedding in zip(missing, embeddings):
+                self._store(key, embedding)
+        slots = torch.tensor([self._slots[key] for key in frame_keys], device=self.device)
+        return self._embeddings.index_select(0, slots)
+    
+    def predict(self, images, flows, frame_keys=None, out=None):
+        """
+        批量预测
+        
+        Args:
+            images: (N, C, 高, 宽) 的 uint8 或浮点图像（numpy 数组或张量）；
+                提供 frame_keys 且所有帧均已缓存时可以为 None
+            flows: (N, 时间步, 128) 的流量特征
+            frame_keys: 可选，每个样本对应的可哈希帧键，用于缓存图像嵌入
+            out: 可选的输出数组，形状至少为 (N, num_classes)
+            
+        Returns:
+            np.ndarray: (N, num_classes) 的预测值；未提供 out 时为内部缓冲区的视图，
+                下一次调用会覆盖，需要保留时应自行复制
+            
+        Raises:
+            KeyError: images 为 None 且存在未缓存的帧
+            ValueError: 图像尺寸与模型不一致
+        """
+        n = len(flows)
+        if out is None:
+            if n > self.max_batch_size:
+                self.output = np.empty((n, self.num_classes), dtype=np.float32)
+            out = self.output
+        result = out[:n]
+        
+        with torch.inference_mode():
+            for start in range(0, n, self.max_batch_size):
+                stop = min(start + self.max_batch_size, n)
+                chunk_images = images[start:stop] if images is not None else None
+                chunk_keys = frame_keys[start:stop] if frame_keys is not None else None
+                embedding = self._image_embeddings(chunk_images, chunk_keys)
+                prediction = self.model.fuse(embedding, self._to_tensor(flows[start:stop]).float())
+                torch.from_numpy(result[start:stop]).copy_(prediction.reshape(stop - start, -1))
+        return result
+    
+    def clear_cache(self):
+        self._slots.clear()
+        self._free = list(range(self.cache_size - 1, -1, -1))
+    
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "capacity": self.cache_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
 
 class TrafficDataset(torch.utils.data.Dataset):
     def __init__(self, images, flow_data, labels):
@@ -117,18 +288,21 @@ def train_model(model, train_loader, val_loader, criterion, optimizer, num_epoch
 def evaluate_model(model, test_loader):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     model = model.to(device)
-    model.eval()
+    predictor = FusionPredictor(model, max_batch_size=test_loader.batch_size or 1024, cache_size=0)
     
-    predictions = []
-    actual = []
+    # 预测值与真实值直接写入预分配的数组
+    n = len(test_loader.dataset)
+    predictions = np.empty((n, predictor.num_classes), dtype=np.float32)
+    actual = None
     
-    with torch.no_grad():
-        for images, flows, labels in test_loader:
-            images = images.to(device)
-            flows = flows.to(device)
-            
-            outputs = model(images, flows)
-            predictions.extend(outputs.cpu().numpy())
-            actual.extend(labels.numpy())
+    start = 0
+    for images, flows, labels in test_loader:
+        stop = start + len(flows)
+        predictor.predict(images, flows, out=predictions[start:stop])
+        labels = labels.numpy()
+        if actual is None:
+            actual = np.empty((n,) + labels.shape[1:], dtype=labels.dtype)
+        actual[start:stop] = labels
+        start = stop
             
-    return predictions, actual 
\ No newline at end of file
+    return predictions, actual
@@ -0,0 +1,247 @@
+import sys
+import os
+import argparse
+import copy
+import inspect
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from models.traffic_cnn import TrafficCNN, checkpoint_horizon
+
+# 导出产物的扩展名，与检查点同名放在同一目录
+TORCHSCRIPT_SUFFIX = '.ts'
+ONNX_SUFFIX = '.onnx'
+INT8_SUFFIX = '.int8.ts'  # models/quantize.py 生成的 int8 量化 TorchScript
+
+
+def artifact_path(checkpoint_path, suffix):
+    """
+    检查点对应的导出产物路径，例如 model_xxx.pth -> model_xxx.ts
+    """
+    if checkpoint_path.endswith(INT8_SUFFIX):
+        return checkpoint_path[:-len(INT8_SUFFIX)] + suffix
+    return os.path.splitext(checkpoint_path)[0] + suffix
+
+
+def is_stale(checkpoint_path, artifact):
+    """
+    导出产物是否早于检查点（检查点被覆盖后没有重新导出），只部署了导出产物时视为有效
+    """
+    if not os.path.exists(checkpoint_path):
+        return False
+    return os.path.getmtime(artifact) < os.path.getmtime(checkpoint_path)
+
+
+def load_checkpoint(checkpoint_path=None, sequence_length=12):
+    """
+    加载 train.py 保存的 TrafficCNN 检查点（未指定路径时返回随机初始化的模型）
+    
+    输出头的预测步数从检查点推断。权重以 mmap 方式读取并直接作为模型参数（不再复制一份），
+    同一台机器上的多个工作进程共享页缓存；旧格式的检查点不支持 mmap，按常规方式读取。
+    """
+    if not checkpoint_path:
+        return TrafficCNN(sequence_length=sequence_length).eval()
+    try:
+        state_dict = torch.load(checkpoint_path, map_location='cpu', mmap=True, weights_only=True)
+        assign = True
+    except RuntimeError:
+        state_dict = torch.load(checkpoint_path, map_location='cpu', weights_only=True)
+        assign = False
+    model = TrafficCNN(sequence_length=sequence_length, horizon=checkpoint_horizon(state_dict))
+    model.load_state_dict(state_dict, assign=assign)
+    return model.eval()
+
+
+def fold_batchnorm(model):
+    """
+    将 Conv1d + BatchNorm1d 折叠为单个卷积，并移除所有 Dropout
+
+    Args:
+        model: eval 模式下的 TrafficCNN
+
+    Returns:
+        nn.Module: 推理专用的模型副本，原模型不受影响
+    """
+    model = copy.deepcopy(model).eval()
+
+    for name, module in model.named_children():
+        if isinstance(module, nn.Sequential):
+            layers = []
+            children = list(module.children())
+            i = 0
+            while i < len(children):
+                layer = children[i]
+                if (isinstance(layer, nn.Conv1d) and i + 1 < len(children)
+                        and isinstance(children[i + 1], nn.BatchNorm1d)):
+                    layers.append(fuse_conv_bn_eval(layer, children[i + 1]))
+                    i += 2
+                    continue
+                if not isinstance(layer, nn.Dropout):
+                    layers.append(layer)
+                i += 1
+            setattr(model, name, nn.Sequential(*layers))
+        elif isinstance(module, nn.Dropout):
+            setattr(model, name, nn.Identity())
+
+    return model
+
+
+def export_torchscript(model, path, sequence_length=12):
+    """
+    折叠 BatchNorm 后追踪并冻结为 TorchScript
+    """
+    folded = fold_batchnorm(model)
+    example = torch.randn(2, 1, sequence_length)
+    with torch.no_grad():
+        traced = torch.jit.trace(folded, example)
+    frozen = torch.jit.freeze(traced)
+    torch.jit.save(frozen, path)
+    return frozen
+
+
+def export_onnx(model, path, sequence_length=12, opset_version=17):
+    """
+    导出为 ONNX（batch 维为动态维度），供 onnxruntime CPU 推理使用
+    """
+    folded = fold_batchnorm(model)
+    example = torch.randn(2, 1, sequence_length)
+    kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # torch>=2.5 才有 dynamo 参数，且新版本默认使用 dynamo 导出器，这里固定使用 TorchScript 导出器
+        kwargs['dynamo'] = False
+    torch.onnx.export(
+        folded,
+        (example,),
+        path,
+        input_names=['x'],
+        output_names=['y'],
+        dynamic_axes={'x': {0: 'batch'}, 'y': {0: 'batch'}},
+        opset_version=opset_version,
+        **kwargs
+    )
+    return path
+
+
+class OnnxModel:
+    """
+    onnxruntime 推理会话的轻量封装，调用方式与 nn.Module 相同（输入输出均为张量）
+    """
+
+    def __init__(self, path, intra_op_threads=1):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, x):
+        outputs = self.session.run(None, {'x': x.detach().cpu().numpy().astype(np.float32, copy=False)})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # 推理会话本身是线程安全的，副本之间共享同一个会话
+        return self
+
+
+def validate_equivalence(reference, candidate, sequence_length=12, batch_sizes=(1, 8, 64), atol=1e-4):
+    """
+    比较导出模型与 eager 模型的输出
+
+    Returns:
+        float: 所有批大小上的最大绝对误差
+
+    Raises:
+        ValueError: 误差超过 atol
+    """
+    max_error = 0.0
+    with torch.no_grad():
+        for batch_size in batch_sizes:
+            x = torch.randn(batch_size, 1, sequence_length)
+            expected = reference(x)
+            actual = candidate(x)
+            max_error = max(max_error, (expected - actual).abs().max().item())
+
+    if max_error > atol:
+        raise ValueError(f"导出模型与 eager 模型不一致: 最大误差 {max_error:.3e} > {atol:.0e}")
+    return max_error
+
+
+def load_inference_model(checkpoint_path=None, sequence_length=12, runtime='auto', intra_op_threads=1):
+    """
+    加载推理模型，优先使用检查点旁边的导出产物
+
+    Args:
+        checkpoint_path: 检查点（.pth）或导出产物（.ts / .onnx）路径
+        sequence_length: 输入序列长度
+        runtime: 'auto'、'eager'、'torchscript'、'onnx' 或 'int8'；auto 依次尝试 TorchScript 与 eager
+        intra_op_threads: onnxruntime 的 intra-op 线程数
+
+    早于检查点的导出产物视为过期：auto / torchscript 忽略过期的 .ts 改用 eager，
+    明确指定 onnx / int8 时报错。
+
+    Returns:
+        tuple: (model, runtime)，model 可像 nn.Module 一样调用
+
+    Raises:
+        ValueError: 指定的 onnx / int8 产物早于检查点
+    """
+    if checkpoint_path and checkpoint_path.endswith(INT8_SUFFIX):
+        return torch.jit.load(checkpoint_path, map_location='cpu').eval(), 'int8'
+    if checkpoint_path and checkpoint_path.endswith(TORCHSCRIPT_SUFFIX):
+        return torch.jit.load(checkpoint_path, map_location='cpu').eval(), 'torchscript'
+    if checkpoint_path and checkpoint_path.endswith(ONNX_SUFFIX):
+        return OnnxModel(checkpoint_path, intra_op_threads), 'onnx'
+
+    if checkpoint_path and runtime in ('auto', 'torchscript'):
+        compiled = artifact_path(checkpoint_path, TORCHSCRIPT_SUFFIX)
+        if os.path.exists(compiled) and not is_stale(checkpoint_path, compiled):
+            return torch.jit.load(compiled, map_location='cpu').eval(), 'torchscript'
+    if checkpoint_path and runtime in ('int8', 'onnx'):
+        artifact = artifact_path(checkpoint_path, INT8_SUFFIX if runtime == 'int8' else ONNX_SUFFIX)
+        if os.path.exists(artifact) and is_stale(checkpoint_path, artifact):
+            raise ValueError(f"{artifact} 早于检查点 {checkpoint_path}，请重新导出")
+        if runtime == 'int8':
+            return torch.jit.load(artifact, map_location='cpu').eval(), 'int8'
+        return OnnxModel(artifact, intra_op_threads), 'onnx'
+
+    return load_checkpoint(checkpoint_path, sequence_length), 'eager'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='导出推理专用的 TrafficCNN（折叠 BatchNorm、移除 Dropout）')
+    parser.add_argument('checkpoint', help='train.py 保存的检查点 (.pth)')
+    parser.add_argument('--sequence-length', type=int, default=12, help='输入序列长度')
+    parser.add_argument('--onnx', action='store_true', help='同时导出 ONNX 模型')
+    parser.add_argument('--atol', type=float, default=1e-4, help='数值一致性校验的容差')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = load_checkpoint(args.checkpoint, args.sequence_length)
+
+    ts_path = artifact_path(args.checkpoint, TORCHSCRIPT_SUFFIX)
+    scripted = export_torchscript(model, ts_path, args.sequence_length)
+    error = validate_equivalence(model, scripted, args.sequence_length, atol=args.atol)
+    print(f"TorchScript saved to: {ts_path} (max abs error {error:.3e})")
+
+    if args.onnx:
+        onnx_path = export_onnx(model, artifact_path(args.checkpoint, ONNX_SUFFIX), args.sequence_length)
+        try:
+            onnx_model = OnnxModel(onnx_path)
+        except ImportError:
+            print(f"ONNX saved to: {onnx_path} (onnxruntime 未安装，跳过一致性校验)")
+        else:
+            error = validate_equivalence(model, onnx_model, args.sequence_length, atol=args.atol)
+            print(f"ONNX saved to: {onnx_path} (max abs error {error:.3e})")
+
+
+if __name__ == "__main__":
+    main()
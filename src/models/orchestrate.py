@@ -0,0 +1,327 @@
+import sys
+import os
+import argparse
+import contextlib
+import itertools
+import json
+import time
+import traceback
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+STATE_FILE = 'sweep_state.json'
+SUMMARY_FILE = 'summary.csv'
+
+
+def parse_list(text, cast):
+    """逗号分隔的取值列表，例如 "0.001,0.0005" """
+    return [cast(item) for item in str(text).split(',') if item.strip()]
+
+
+def load_groups(data_dir, groups_path=None, per_sensor=False):
+    """
+    传感器分组：{组名: [传感器ID, ...]}
+
+    groups_path 为 JSON 文件（与模型注册表的 sensors 映射对应的路段分组），
+    per_sensor 时每个传感器单独一组，都未指定时所有传感器为一组 "all"。
+    """
+    from utils.mmap_dataset import load_sensor_ids
+
+    sensor_ids = load_sensor_ids(data_dir)
+    if groups_path:
+        with open(groups_path, 'r', encoding='utf-8') as f:
+            groups = json.load(f)
+    elif per_sensor:
+        groups = {sensor_id: [sensor_id] for sensor_id in sensor_ids}
+    else:
+        groups = {'all': sensor_ids}
+
+    known = set(sensor_ids)
+    for name, members in groups.items():
+        unknown = [sensor_id for sensor_id in members if sensor_id not in known]
+        if unknown:
+            raise ValueError(f"分组 {name} 中的传感器不在数据目录中: {unknown[:5]}")
+    return groups
+
+
+def build_jobs(groups, sequence_lengths, batch_sizes, learning_rates):
+    """传感器分组与超参数网格的笛卡尔积，任务编号由组名与超参数确定（恢复时据此匹配）"""
+    jobs = []
+    for (group, sensors), sequence_length, batch_size, lr in itertools.product(
+            groups.items(), sequence_lengths, batch_sizes, learning_rates):
+        jobs.append({
+            'job_id': f'{group}-seq{sequence_length}-bs{batch_size}-lr{lr:g}',
+            'group': group,
+            'sensors': list(sensors),
+            'sequence_length': sequence_length,
+            'batch_size': batch_size,
+            'lr': lr,
+        })
+    return jobs
+
+
+def partition_threads(n_jobs, workers=None, threads_per_job=None, cpu_count=None):
+    """
+    在并行任务之间划分 CPU：workers * threads_per_job 不超过核数
+
+    Returns:
+        tuple: (workers, threads_per_job)
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if workers is None and threads_per_job is None:
+        threads_per_job = 1
+    if workers is None:
+        workers = max(1, cpu_count // threads_per_job)
+    if threads_per_job is None:
+        threads_per_job = max(1, cpu_count // workers)
+    return max(1, min(workers, n_jobs)), threads_per_job
+
+
+class SweepState:
+    """
+    任务进度文件（output_dir/sweep_state.json）
+
+    每个任务完成或失败后立即原子写入；恢复时跳过已完成且检查点仍存在的任务，
+    失败或中断的任务重新训练。
+    """
+
+    def __init__(self, output_dir, config):
+        self.path = os.path.join(output_dir, STATE_FILE)
+        self.config = config
+        self.jobs = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('config') != config:
+                raise ValueError(f"{self.path} 由不同的训练配置生成，请使用新的输出目录或 --restart")
+            self.jobs = state.get('jobs', {})
+
+    def is_done(self, job_id):
+        entry = self.jobs.get(job_id)
+        return (entry is not None and entry['status'] == 'done'
+                and os.path.exists(entry['result']['checkpoint']))
+
+    def record(self, job_id, status, result=None, error=None):
+        self.jobs[job_id] = {'status': status, 'result': result, 'error': error, 'updated_at': time.time()}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'config': self.config, 'jobs': self.jobs}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def results(self):
+        return {job_id: entry['result'] for job_id, entry in self.jobs.items() if entry['status'] == 'done'}
+
+
+def init_worker(threads_per_job):
+    """工作进程初始化：每个进程只使用分配给它的线程数"""
+    import torch
+    torch.set_num_threads(threads_per_job)
+    torch.set_num_interop_threads(1)
+
+
+def run_job(job, data_dir, output_dir, num_epochs=50, horizon=1, patience=5, augment=True, seed=42):
+    """
+    训练单个任务（在工作进程中执行）
+
+    数据集直接读取共享的内存映射数据目录，各进程共享同一份页缓存，不复制数据。
+    训练输出写入 output_dir/<job_id>.log。
+
+    Returns:
+        dict: 超参数、验证集上的 MAE / RMSE / MAPE（原始单位）与训练耗时
+    """
+    import torch
+    import torch.nn as nn
+    import torch.optim as optim
+
+    from models.traffic_cnn import TrafficCNN
+    from models.train import train_model, create_data_loaders
+    from models.export import artifact_path
+    from utils.data_processor import ModelEvaluator
+    from utils.mmap_dataset import MmapWindowDataset, load_meta, load_sensor_ids
+    from utils.normalization import NormalizationState, NORM_SUFFIX
+
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    device = torch.device('cpu')
+
+    meta = load_meta(data_dir)
+    sensor_ids = load_sensor_ids(data_dir)
+    rows = {sensor_id: i for i, sensor_id in enumerate(sensor_ids)}
+    sensors = [rows[sensor_id] for sensor_id in job['sensors']]
+    sequence_length = job['sequence_length']
+
+    # 与 train.py 的 build_mmap_datasets 相同的时间划分
+    split = int(meta['n_steps'] * 0.8)
+    train_dataset = MmapWindowDataset(data_dir, sequence_length, horizon=horizon, stop=split, sensors=sensors)
+    val_dataset = MmapWindowDataset(data_dir, sequence_length, horizon=horizon,
+                                    start=max(0, split - sequence_length), sensors=sensors)
+    train_loader, val_loader = create_data_loaders(
+        train_dataset, val_dataset, batch_size=job['batch_size'], pin_memory=False, augment=augment, seed=seed
+    )
+
+    model = TrafficCNN(sequence_length=sequence_length, horizon=horizon).to(device)
+    optimizer = optim.Adam(model.parameters(), lr=job['lr'])
+    save_path = os.path.join(output_dir, f"{job['job_id']}.pth")
+    NormalizationState.from_meta(meta, job['sensors']).save(artifact_path(save_path, NORM_SUFFIX))
+
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, f"{job['job_id']}.log"), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        train_losses, val_losses, epoch_stats = train_model(
+            model=model,
+            train_loader=train_loader,
+            val_loader=val_loader,
+            criterion=nn.MSELoss(),
+            optimizer=optimizer,
+            num_epochs=num_epochs,
+            device=device,
+            save_path=save_path,
+            early_stopping_patience=patience
+        )
+    train_seconds = time.perf_counter() - start
+
+    # 用最佳检查点在验证集上评估，预测值与真实值写入预分配的数组后还原为原始单位
+    model.load_state_dict(torch.load(save_path, map_location=device, weights_only=True))
+    model.eval()
+    y_pred = np.empty((len(val_dataset), horizon), dtype=np.float32)
+    y_true = np.empty((len(val_dataset), horizon), dtype=np.float32)
+    offset = 0
+    with torch.inference_mode():
+        for batch_x, batch_y in val_loader:
+            n = len(batch_x)
+            y_pred[offset:offset + n] = model(batch_x).reshape(n, -1)
+            y_true[offset:offset + n] = batch_y.reshape(n, -1)
+            offset += n
+    metrics = ModelEvaluator.calculate_metrics(y_true * meta['std'] + meta['mean'],
+                                               y_pred * meta['std'] + meta['mean'])
+
+    return {
+        **{key: value for key, value in job.items() if key != 'sensors'},
+        'n_sensors': len(sensors),
+        **{name: float(value) for name, value in metrics.items()},
+        'best_val_loss': float(min(val_losses)),
+        'epochs': len(train_losses),
+        'train_seconds': train_seconds,
+        'samples_per_sec': float(np.mean([stats['samples_per_sec'] for stats in epoch_stats])),
+        'checkpoint': save_path,
+    }
+
+
+def summarize(results):
+    """按 ModelEvaluator.compare_models 的格式汇总：行为指标，列为任务"""
+    from utils.data_processor import ModelEvaluator
+
+    return ModelEvaluator.compare_models({
+        job_id: {name: result[name] for name in ('MAE', 'RMSE', 'MAPE')}
+        for job_id, result in results.items()
+    })
+
+
+def run_sweep(jobs, data_dir, output_dir, workers, threads_per_job, state, **train_kwargs):
+    """
+    在进程池中并行训练尚未完成的任务
+
+    Returns:
+        tuple: (完成的任务数, 失败的任务数)
+    """
+    pending = [job for job in jobs if not state.is_done(job['job_id'])]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(jobs)} jobs already done")
+    if not pending:
+        return 0, 0
+
+    completed = failed = 0
+    # spawn：工作进程不继承父进程的线程池状态
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(threads_per_job,)) as executor:
+        futures = {
+            executor.submit(run_job, job, data_dir, output_dir, **train_kwargs): job['job_id']
+            for job in pending
+        }
+        for future in as_completed(futures):
+            job_id = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                failed += 1
+                state.record(job_id, 'failed', error=traceback.format_exc())
+                print(f"[{completed + failed}/{len(pending)}] {job_id} failed (see {state.path})")
+                continue
+            completed += 1
+            state.record(job_id, 'done', result=result)
+            print(f"[{completed + failed}/{len(pending)}] {job_id}: RMSE {result['RMSE']:.2f}, "
+                  f"{result['epochs']} epochs in {result['train_seconds']:.1f}s")
+    return completed, failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='并行训练多个传感器分组 / 超参数组合')
+    parser.add_argument('data_dir', help='write_series 生成的内存映射数据目录（所有任务共享）')
+    parser.add_argument('output_dir', help='检查点、训练日志、进度文件与汇总表的输出目录')
+    parser.add_argument('--groups', default=None,
+                        help='传感器分组 JSON：{"corridor_a": ["sensor_1", "sensor_2"], ...}')
+    parser.add_argument('--per-sensor', action='store_true', help='每个传感器单独训练一个模型')
+    parser.add_argument('--sequence-length', default='12', help='输入序列长度，逗号分隔多个取值')
+    parser.add_argument('--batch-size', default='32', help='批大小，逗号分隔多个取值')
+    parser.add_argument('--lr', default='0.001', help='学习率，逗号分隔多个取值')
+    parser.add_argument('--epochs', type=int, default=50, help='最大 epoch 数')
+    parser.add_argument('--patience', type=int, default=5, help='早停耐心值')
+    parser.add_argument('--horizon', type=int, default=1, help='输出头一次预测的步数')
+    parser.add_argument('--no-augment', action='store_true', help='关闭训练集的数据增强')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--workers', type=int, default=None, help='并行任务数，默认核数 / --threads-per-job')
+    parser.add_argument('--threads-per-job', type=int, default=None, help='每个任务的 PyTorch 线程数')
+    parser.add_argument('--restart', action='store_true', help='忽略已有的进度文件，重新训练所有任务')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    groups = load_groups(args.data_dir, args.groups, args.per_sensor)
+    jobs = build_jobs(groups, parse_list(args.sequence_length, int), parse_list(args.batch_size, int),
+                      parse_list(args.lr, float))
+    workers, threads_per_job = partition_threads(len(jobs), args.workers, args.threads_per_job)
+
+    train_kwargs = {
+        'num_epochs': args.epochs,
+        'horizon': args.horizon,
+        'patience': args.patience,
+        'augment': not args.no_augment,
+        'seed': args.seed,
+    }
+    # 影响结果但不体现在任务编号中的配置，恢复时必须一致
+    config = {'data_dir': os.path.abspath(args.data_dir), 'groups': groups, **train_kwargs}
+    if args.restart and os.path.exists(os.path.join(args.output_dir, STATE_FILE)):
+        os.remove(os.path.join(args.output_dir, STATE_FILE))
+    state = SweepState(args.output_dir, config)
+
+    print(f"{len(jobs)} jobs, {workers} workers x {threads_per_job} threads")
+    start = time.perf_counter()
+    completed, failed = run_sweep(jobs, args.data_dir, args.output_dir, workers, threads_per_job, state,
+                                  **train_kwargs)
+    print(f"Trained {completed} jobs in {time.perf_counter() - start:.1f}s ({failed} failed)")
+
+    job_ids = {job['job_id'] for job in jobs}
+    results = {job_id: result for job_id, result in state.results().items() if job_id in job_ids}
+    if results:
+        summary = summarize(results)
+        summary_path = os.path.join(args.output_dir, SUMMARY_FILE)
+        summary.to_csv(summary_path)
+        print(summary.to_string())
+        best = min(results, key=lambda job_id: results[job_id]['RMSE'])
+        print(f"Best job by RMSE: {best} ({results[best]['checkpoint']})")
+        print(f"Summary saved to: {summary_path}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import sys
+import os
+import argparse
+import json
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic, get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+from models.export import load_checkpoint, fold_batchnorm, artifact_path, INT8_SUFFIX
+from utils.data_utils import TrafficDataGenerator, TrafficDataPreprocessor
+from utils.data_processor import ModelEvaluator
+from utils.mmap_dataset import open_values, load_meta
+from utils.windowing import sliding_windows
+
+
+def quantize_dynamic_model(model):
+    """
+    全连接层动态 int8 量化（权重离线量化，激活在运行时量化）
+    """
+    return quantize_dynamic(fold_batchnorm(model), {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static_model(model, calibration_data, backend='x86', batch_size=256):
+    """
+    卷积层静态 int8 量化 + 全连接层动态 int8 量化
+
+    Args:
+        model: eval 模式下的 TrafficCNN
+        calibration_data: 形状为 (n, 1, sequence_length) 的校准输入
+        backend: 量化后端，x86 / fbgemm / qnnpack
+        batch_size: 校准批大小
+    """
+    torch.backends.quantized.engine = backend
+    folded = fold_batchnorm(model)
+
+    # 卷积块使用静态量化，全连接层保持浮点，随后再做动态量化
+    qconfig_mapping = get_default_qconfig_mapping(backend).set_object_type(nn.Linear, None)
+    example = torch.as_tensor(calibration_data[:2])
+    prepared = prepare_fx(folded, qconfig_mapping, (example,))
+
+    with torch.no_grad():
+        for start in range(0, len(calibration_data), batch_size):
+            prepared(torch.as_tensor(calibration_data[start:start + batch_size]))
+
+    converted = convert_fx(prepared)
+    return quantize_dynamic(converted, {nn.Linear}, dtype=torch.qint8)
+
+
+def load_windows(sequence_length=12, data_dir=None, n_samples=2000, seed=0):
+    """
+    校准与评估用的窗口数据
+
+    指定 data_dir 时从内存映射数据目录读取真实数据，否则使用 TrafficDataGenerator 生成模拟数据。
+
+    Returns:
+        tuple: (X, y, mean, std)，X 形状为 (n, 1, sequence_length)，均为归一化后的值
+    """
+    if data_dir:
+        meta = load_meta(data_dir)
+        X, y = [], []
+        for row in open_values(data_dir):
+            X_row, y_row = sliding_windows(row, sequence_length)
+            X.append(X_row)
+            y.append(y_row)
+        X, y = np.concatenate(X), np.concatenate(y)
+        mean, std = meta['mean'], meta['std']
+    else:
+        np.random.seed(seed)
+        data = TrafficDataGenerator().generate_time_series(n_samples=n_samples)
+        preprocessor = TrafficDataPreprocessor(sequence_length=sequence_length)
+        data = preprocessor.remove_outliers(data, 'traffic_flow')
+        data = preprocessor.interpolate_missing(data)
+        flow = data['traffic_flow'].values.astype(np.float64)
+        mean, std = float(flow.mean()), float(flow.std())
+        X, y = sliding_windows((flow - mean) / std, sequence_length)
+
+    X = np.ascontiguousarray(X, dtype=np.float32).reshape(-1, 1, sequence_length)
+    return X, np.asarray(y, dtype=np.float32), mean, std
+
+
+def predict(model, X, batch_size=1024):
+    """
+    分批前向计算
+
+    Returns:
+        np.ndarray: 形状为 (n, horizon) 的预测值
+    """
+    outputs = []
+    with torch.inference_mode():
+        for start in range(0, len(X), batch_size):
+            batch = X[start:start + batch_size]
+            outputs.append(model(torch.from_numpy(batch)).numpy().reshape(len(batch), -1))
+    return np.concatenate(outputs)
+
+
+def measure_latency(model, sequence_length=12, batch_size=1, repeats=200):
+    """
+    单次前向计算的平均耗时（毫秒）
+    """
+    x = torch.randn(batch_size, 1, sequence_length)
+    with torch.inference_mode():
+        for _ in range(10):
+            model(x)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(x)
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+
+def accuracy_report(float_model, quantized_model, X, y, mean, std, sequence_length=12):
+    """
+    对比浮点模型与量化模型的 MAE/RMSE/MAPE（原始流量单位）与延迟
+
+    y 为下一步的目标值，多输出模型按第一步预测评估。
+
+    Returns:
+        dict: {模型名: 指标}
+    """
+    y_true = y * std + mean
+    report = {}
+    for name, model in (('float32', float_model), ('int8', quantized_model)):
+        y_pred = predict(model, X)[:, 0] * std + mean
+        metrics = {k: float(v) for k, v in ModelEvaluator.calculate_metrics(y_true, y_pred).items()}
+        metrics['Latency_ms_b1'] = measure_latency(model, sequence_length, batch_size=1)
+        metrics['Latency_ms_b64'] = measure_latency(model, sequence_length, batch_size=64)
+        report[name] = metrics
+
+    report['int8']['Speedup_b1'] = report['float32']['Latency_ms_b1'] / report['int8']['Latency_ms_b1']
+    report['int8']['Speedup_b64'] = report['float32']['Latency_ms_b64'] / report['int8']['Latency_ms_b64']
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='TrafficCNN int8 量化')
+    parser.add_argument('checkpoint', help='train.py 保存的检查点 (.pth)')
+    parser.add_argument('--sequence-length', type=int, default=12, help='输入序列长度')
+    parser.add_argument('--static', action='store_true', help='卷积层使用静态量化（需要校准数据）')
+    parser.add_argument('--backend', default='x86', help='量化后端: x86 / fbgemm / qnnpack')
+    parser.add_argument('--data-dir', default=None, help='用于校准与评估的内存映射数据目录')
+    parser.add_argument('--calibration-samples', type=int, default=512, help='校准样本数')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    model = load_checkpoint(args.checkpoint, args.sequence_length)
+    X, y, mean, std = load_windows(args.sequence_length, args.data_dir)
+
+    # 前一部分窗口用于校准，其余用于评估
+    n_calibration = min(args.calibration_samples, len(X) // 2)
+    if args.static:
+        quantized = quantize_static_model(model, X[:n_calibration], backend=args.backend)
+    else:
+        quantized = quantize_dynamic_model(model)
+
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(quantized, torch.from_numpy(X[:2])))
+    output_path = artifact_path(args.checkpoint, INT8_SUFFIX)
+    torch.jit.save(scripted, output_path)
+
+    report = accuracy_report(model, scripted, X[n_calibration:], y[n_calibration:], mean, std,
+                             args.sequence_length)
+    with open(os.path.splitext(output_path)[0] + '.report.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(ModelEvaluator.compare_models(report))
+    print(f"Quantized model saved to: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
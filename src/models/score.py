@@ -0,0 +1,193 @@
+import sys
+import os
+import argparse
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from models.export import load_inference_model
+from utils.mmap_dataset import load_meta, load_sensor_ids, open_values, open_timestamps
+from utils.windowing import num_windows, sliding_windows
+
+
+class NpyPredictionWriter:
+    """
+    将预测写入形状为 (n_sensors, n_windows, k) 的 .npy 文件
+
+    文件以内存映射方式预分配，按块写入，内存占用与数据规模无关。
+    第 w 个窗口对应的目标时间步为 start + w * stride + sequence_length。
+    """
+
+    def __init__(self, path, n_sensors, n_windows, outputs):
+        self.path = path
+        self.outputs = outputs
+        self.predictions = np.lib.format.open_memmap(
+            path, mode='w+', dtype=np.float32, shape=(n_sensors, n_windows, outputs)
+        )
+
+    def write(self, row, window_start, sensor_id, timestamps, predictions):
+        self.predictions[row, window_start:window_start + len(predictions)] = predictions
+
+    def close(self):
+        self.predictions.flush()
+        del self.predictions
+
+
+class ParquetPredictionWriter:
+    """
+    将预测按行组流式写入 Parquet 文件（需要 pyarrow）
+
+    列: sensor_id、timestamp（目标时间点）、prediction（多输出模型为 prediction_1..prediction_k）
+    """
+
+    def __init__(self, path, outputs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self.path = path
+        self.outputs = outputs
+        self.columns = ['prediction'] if outputs == 1 else [f'prediction_{i + 1}' for i in range(outputs)]
+        self.schema = pa.schema(
+            [('sensor_id', pa.string()), ('timestamp', pa.timestamp('s'))]
+            + [(name, pa.float32()) for name in self.columns]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, row, window_start, sensor_id, timestamps, predictions):
+        pa = self._pa
+        arrays = [
+            pa.array([sensor_id] * len(predictions), type=pa.string()),
+            pa.array(timestamps.astype('datetime64[s]'), type=pa.timestamp('s')),
+        ] + [pa.array(predictions[:, i]) for i in range(self.outputs)]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def model_outputs(model, sequence_length):
+    """
+    模型每个窗口输出的预测步数
+    """
+    with torch.inference_mode():
+        return model(torch.zeros(1, 1, sequence_length)).reshape(1, -1).shape[1]
+
+
+def score_series(model, data_dir, writer, sequence_length=12, batch_size=4096, chunk_windows=1 << 16,
+                 stride=1, start=0, stop=None, progress=True):
+    """
+    对内存映射数据目录中的全部传感器做批量推理
+
+    按传感器、按块读取数据，块内用跨步视图构建窗口，以大批次在 inference_mode 下前向计算，
+    反归一化后交给 writer 流式写出。
+
+    Args:
+        model: 可调用的推理模型，输入 (batch_size, 1, sequence_length)
+        data_dir: write_series 生成的数据目录
+        writer: NpyPredictionWriter 或 ParquetPredictionWriter
+        sequence_length: 输入序列长度
+        batch_size: 单次前向计算的窗口数
+        chunk_windows: 每次从磁盘读取的窗口数，决定内存占用上限
+        stride: 相邻窗口起点的间隔
+        start: 使用的时间范围起点（含）
+        stop: 使用的时间范围终点（不含），默认为序列末尾
+        progress: 是否显示进度条
+
+    Returns:
+        dict: 写出的行数、耗时与吞吐量（rows/sec）
+    """
+    meta = load_meta(data_dir)
+    sensor_ids = load_sensor_ids(data_dir)
+    values = open_values(data_dir)
+    timestamps = open_timestamps(data_dir)
+    stop = meta['n_steps'] if stop is None else min(stop, meta['n_steps'])
+    n_windows = num_windows(stop - start, sequence_length, stride=stride)
+    mean, std = meta['mean'], meta['std']
+
+    rows = 0
+    started = time.perf_counter()
+    with tqdm(total=len(sensor_ids) * n_windows, unit='rows', disable=not progress) as bar:
+        for row, sensor_id in enumerate(sensor_ids):
+            for first in range(0, n_windows, chunk_windows):
+                count = min(chunk_windows, n_windows - first)
+                lo = start + first * stride
+                hi = lo + (count - 1) * stride + sequence_length + 1
+
+                # 只把当前块读入内存，窗口是该块上的跨步视图
+                segment = np.array(values[row, lo:hi], dtype=np.float32)
+                X, _ = sliding_windows(segment, sequence_length, stride=stride)
+                target_times = timestamps[lo + sequence_length:hi:stride][:count]
+
+                predictions = np.empty((count, writer.outputs), dtype=np.float32)
+                with torch.inference_mode():
+                    for b in range(0, count, batch_size):
+                        x = torch.from_numpy(np.array(X[b:b + batch_size])).unsqueeze(1)
+                        predictions[b:b + len(x)] = model(x).reshape(len(x), -1).numpy()
+                predictions = predictions * std + mean
+
+                writer.write(row, first, sensor_id, target_times, predictions)
+                rows += count
+                bar.update(count)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='对历史数据做离线批量推理（回填预测）')
+    parser.add_argument('checkpoint', help='train.py 保存的检查点 (.pth) 或导出产物 (.ts / .onnx / .int8.ts)')
+    parser.add_argument('data_dir', help='write_series 生成的内存映射数据目录')
+    parser.add_argument('output', help='输出文件，.parquet 写 Parquet（需要 pyarrow），其他写 .npy')
+    parser.add_argument('--sequence-length', type=int, default=12, help='输入序列长度')
+    parser.add_argument('--runtime', default='auto', help='auto / eager / torchscript / onnx / int8')
+    parser.add_argument('--batch-size', type=int, default=4096, help='单次前向计算的窗口数')
+    parser.add_argument('--chunk-windows', type=int, default=1 << 16, help='每次读取的窗口数（内存上限）')
+    parser.add_argument('--stride', type=int, default=1, help='相邻窗口起点的间隔')
+    parser.add_argument('--threads', type=int, default=None, help='PyTorch intra-op 线程数')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model, runtime = load_inference_model(
+        args.checkpoint, args.sequence_length, runtime=args.runtime,
+        intra_op_threads=args.threads or torch.get_num_threads()
+    )
+    outputs = model_outputs(model, args.sequence_length)
+
+    if args.output.endswith('.parquet'):
+        writer = ParquetPredictionWriter(args.output, outputs)
+    else:
+        meta = load_meta(args.data_dir)
+        n_windows = num_windows(meta['n_steps'], args.sequence_length, stride=args.stride)
+        writer = NpyPredictionWriter(args.output, meta['n_sensors'], n_windows, outputs)
+
+    try:
+        report = score_series(
+            model, args.data_dir, writer,
+            sequence_length=args.sequence_length,
+            batch_size=args.batch_size,
+            chunk_windows=args.chunk_windows,
+            stride=args.stride
+        )
+    finally:
+        writer.close()
+
+    print(f"Scored {report['rows']} windows with {runtime} model in {report['seconds']:.2f}s "
+          f"({report['rows_per_sec']:.0f} rows/sec)")
+    print(f"Predictions saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
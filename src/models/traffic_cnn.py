@@ -1,11 +1,17 @@
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from utils.windowing import torch_sliding_windows, autoregressive_rollout, run_rollout
+
 class TrafficCNN(nn.Module):
-    def __init__(self, input_channels=1, sequence_length=12):
+    def __init__(self, input_channels=1, sequence_length=12, horizon=1):
         super(TrafficCNN, self).__init__()
         
+        # 输出头一次预测 horizon 个时间点
+        self.horizon = horizon
+        
         # 第一个卷积层块
         self.conv1 = nn.Sequential(
             nn.Conv1d(input_channels, 64, kernel_size=3, padding=1),
@@ -41,7 +47,7 @@ class TrafficCNN(nn.Module):
         # 全连接层
         self.fc1 = nn.Linear(256 * sequence_length, 512)
         self.fc2 = nn.Linear(512, 128)
-        self.fc3 = nn.Linear(128, 1)
+        self.fc3 = nn.Linear(128, horizon)
         
         self.dropout = nn.Dropout(0.5)
         
@@ -65,16 +71,55 @@ class TrafficCNN(nn.Module):
         x = self.dropout(x)
         x = F.relu(self.fc2(x))
         x = self.dropout(x)
-        x = self.fc3(x)
+        x = self.fc3(x)  # (batch_size, horizon)
         
         return x
 
+def checkpoint_horizon(state_dict):
+    """
+    根据检查点中输出层的形状推断模型的预测步数
+    """
+    return state_dict['fc3.weight'].shape[0]
+
+def autoregressive_forecast(model, x, horizon):
+    """
+    批量自回归多步预测
+    
+    每次前向计算取模型输出的全部步数（单输出模型为 1 步，多输出头为 H 步），
+    追加到输入窗口末尾后继续预测，直到凑满 horizon 步（展开逻辑见 utils.windowing.autoregressive_rollout）。
+    
+    Args:
+        model: 可调用的模型，输入 (batch_size, 1, sequence_length)，输出 (batch_size, k)
+        x: 形状为 (batch_size, 1, sequence_length) 的张量
+        horizon: 预测步数
+        
+    Returns:
+        torch.Tensor: 形状为 (batch_size, horizon) 的预测值
+    """
+    def forward(window):
+        inputs = torch.from_numpy(window).unsqueeze(1).to(device=x.device, dtype=x.dtype)
+        return model(inputs).cpu().numpy()
+
+    rollout = autoregressive_rollout(x.detach().reshape(x.shape[0], -1).cpu().numpy(), horizon, x.shape[-1])
+    with torch.no_grad():
+        predictions = run_rollout(rollout, forward)
+    return torch.from_numpy(predictions).to(x.device)
+
 class TrafficPredictor:
     def __init__(self, model_path=None):
+        if model_path and model_path.endswith(('.ts', '.onnx')):
+            # models/export.py 导出的推理产物（折叠 BatchNorm，CPU 推理）
+            from models.export import load_inference_model
+            self.device = torch.device("cpu")
+            self.model, _ = load_inference_model(model_path)
+            return
+        
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = TrafficCNN().to(self.device)
-        if model_path:
-            self.model.load_state_dict(torch.load(model_path))
+        state_dict = torch.load(model_path, map_location=self.device) if model_path else None
+        horizon = checkpoint_horizon(state_dict) if state_dict else 1
+        self.model = TrafficCNN(horizon=horizon).to(self.device)
+        if state_dict:
+            self.model.load_state_dict(state_dict)
         self.model.eval()
         
     def predict(self, sequence):
@@ -91,10 +136,28 @@ class TrafficPredictor:
             # 准备输入数据
             x = torch.FloatTensor(sequence).view(1, 1, -1).to(self.device)
             
-            # 进行预测
+            # 进行预测（多输出模型只取第一步）
             prediction = self.model(x)
             
-            return prediction.item()
+            return prediction.reshape(-1)[0].item()
+    
+    def predict_horizon(self, sequence, horizon):
+        """
+        预测未来 horizon 个时间点的交通流量
+        
+        单输出模型在一个批量循环中自回归展开，多输出模型一次前向计算即可得到多步结果。
+        
+        Args:
+            sequence: numpy array, 形状为 (sequence_length,) 或 (batch_size, sequence_length)
+            horizon: int, 预测步数
+            
+        Returns:
+            numpy array: 形状为 (horizon,) 或 (batch_size, horizon) 的预测值
+        """
+        sequence = np.asarray(sequence, dtype=np.float32)
+        x = torch.from_numpy(sequence.reshape(-1, 1, sequence.shape[-1])).to(self.device)
+        predictions = autoregressive_forecast(self.model, x, horizon).cpu().numpy()
+        return predictions.reshape(sequence.shape[:-1] + (horizon,))
     
     def train_step(self, x_batch, y_batch, optimizer, criterion):
         """
@@ -131,10 +194,6 @@ def create_sequences(data, sequence_length):
         sequence_length: int, 序列长度
         
     Returns:
-        tuple: (X, y) 其中X是输入序列，y是目标值
+        tuple: (X, y) 其中X是输入序列，y是目标值（共享同一存储的张量视图）
     """
-    X, y = [], []
-    for i in range(len(data) - sequence_length):
-        X.append(data[i:(i + sequence_length)])
-        y.append(data[i + sequence_length])
-    return torch.FloatTensor(X), torch.FloatTensor(y) 
\ No newline at end of file
+    return torch_sliding_windows(data, sequence_length) 
\ No newline at end of file
@@ -1,5 +1,7 @@
 import sys
 import os
+import time
+import argparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import torch
@@ -8,11 +10,18 @@ import torch.optim as optim
 from torch.utils.data import DataLoader, TensorDataset
 import numpy as np
 from tqdm import tqdm
-import matplotlib.pyplot as plt
 from datetime import datetime
 
-from models.traffic_cnn import TrafficCNN, create_sequences
-from utils.data_utils import TrafficDataGenerator, TrafficDataPreprocessor, TrafficDataAugmentation
+from models.traffic_cnn import TrafficCNN
+from utils.data_utils import TrafficDataGenerator, TrafficDataPreprocessor
+from utils.augmentation import AugmentedCollate, default_augmentation, seed_worker
+from utils.mmap_dataset import MmapWindowDataset, write_series, load_meta, load_sensor_ids
+from utils.windowing import sliding_windows
+from utils.normalization import NormalizationState, NORM_SUFFIX
+from models.export import artifact_path
+
+# 内存数据集的单条序列在归一化参数中使用的传感器ID（与 backend/main.py 的 DEFAULT_SENSOR_ID 一致）
+DEFAULT_SENSOR_ID = 'sensor_0'
 
 def train_model(
     model,
@@ -27,21 +36,37 @@ def train_model(
 ):
     """
     训练模型
+    
+    损失在设备上累加，每个 epoch 只同步一次。
+    
+    Returns:
+        tuple: (train_losses, val_losses, epoch_stats)，epoch_stats 为每个 epoch 的
+            吞吐量（samples/sec）、数据等待时间与计算时间
     """
     best_val_loss = float('inf')
     patience_counter = 0
     train_losses = []
     val_losses = []
+    epoch_stats = []
+    non_blocking = getattr(train_loader, 'pin_memory', False)
     
     for epoch in range(num_epochs):
         # 训练阶段
         model.train()
-        train_loss = 0.0
+        train_loss = torch.zeros((), device=device)
         train_steps = 0
+        train_samples = 0
+        data_time = 0.0
+        compute_time = 0.0
         
+        epoch_start = time.perf_counter()
+        batch_start = epoch_start
         for batch_x, batch_y in tqdm(train_loader, desc=f'Epoch {epoch + 1}/{num_epochs}'):
-            batch_x = batch_x.to(device)
-            batch_y = batch_y.to(device)
+            compute_start = time.perf_counter()
+            data_time += compute_start - batch_start
+            
+            batch_x = batch_x.to(device, non_blocking=non_blocking)
+            batch_y = batch_y.to(device, non_blocking=non_blocking)
             
             optimizer.zero_grad()
             outputs = model(batch_x)
@@ -49,34 +74,50 @@ def train_model(
             loss.backward()
             optimizer.step()
             
-            train_loss += loss.item()
+            train_loss += loss.detach()
             train_steps += 1
+            train_samples += batch_x.shape[0]
+            
+            batch_start = time.perf_counter()
+            compute_time += batch_start - compute_start
         
-        avg_train_loss = train_loss / train_steps
+        avg_train_loss = train_loss.item() / train_steps
         train_losses.append(avg_train_loss)
+        train_time = time.perf_counter() - epoch_start
         
         # 验证阶段
         model.eval()
-        val_loss = 0.0
+        val_loss = torch.zeros((), device=device)
         val_steps = 0
         
         with torch.no_grad():
             for batch_x, batch_y in val_loader:
-                batch_x = batch_x.to(device)
-                batch_y = batch_y.to(device)
+                batch_x = batch_x.to(device, non_blocking=non_blocking)
+                batch_y = batch_y.to(device, non_blocking=non_blocking)
                 
                 outputs = model(batch_x)
                 loss = criterion(outputs, batch_y)
                 
-                val_loss += loss.item()
+                val_loss += loss
                 val_steps += 1
         
-        avg_val_loss = val_loss / val_steps
+        avg_val_loss = val_loss.item() / val_steps
         val_losses.append(avg_val_loss)
         
+        stats = {
+            'samples': train_samples,
+            'samples_per_sec': train_samples / train_time if train_time > 0 else 0.0,
+            'data_time': data_time,
+            'compute_time': compute_time,
+            'epoch_time': time.perf_counter() - epoch_start
+        }
+        epoch_stats.append(stats)
+        
         print(f'Epoch {epoch + 1}/{num_epochs}:')
         print(f'Average Training Loss: {avg_train_loss:.4f}')
         print(f'Average Validation Loss: {avg_val_loss:.4f}')
+        print(f'Throughput: {stats["samples_per_sec"]:.1f} samples/sec '
+              f'(data wait {data_time:.2f}s, compute {compute_time:.2f}s)')
         
         # 早停检查
         if avg_val_loss < best_val_loss:
@@ -90,12 +131,65 @@ def train_model(
                 print(f'Early stopping triggered after {epoch + 1} epochs')
                 break
     
-    return train_losses, val_losses
+    return train_losses, val_losses, epoch_stats
+
+def create_data_loaders(
+    train_dataset,
+    val_dataset,
+    batch_size=32,
+    num_workers=0,
+    pin_memory=None,
+    persistent_workers=False,
+    prefetch_factor=None,
+    augment=True,
+    seed=42
+):
+    """
+    创建训练集和验证集的数据加载器
+    
+    Args:
+        num_workers: 数据加载进程数，0 表示在主进程中加载
+        pin_memory: 是否使用锁页内存，默认在有 CUDA 时开启
+        persistent_workers: epoch 之间是否保留工作进程（需要 num_workers > 0）
+        prefetch_factor: 每个工作进程预取的批次数（需要 num_workers > 0）
+        augment: 训练集是否在 collate 阶段做数据增强
+    """
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    
+    worker_kwargs = {}
+    if num_workers > 0:
+        worker_kwargs['persistent_workers'] = persistent_workers
+        if prefetch_factor is not None:
+            worker_kwargs['prefetch_factor'] = prefetch_factor
+    
+    # 训练集在 collate 阶段按样本随机增强，工作进程的随机种子由 generator 派生
+    train_loader = DataLoader(
+        train_dataset,
+        batch_size=batch_size,
+        shuffle=True,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        collate_fn=AugmentedCollate(default_augmentation()) if augment else None,
+        worker_init_fn=seed_worker,
+        generator=torch.Generator().manual_seed(seed),
+        **worker_kwargs
+    )
+    val_loader = DataLoader(
+        val_dataset,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        **worker_kwargs
+    )
+    return train_loader, val_loader
 
 def plot_training_history(train_losses, val_losses, save_dir):
     """
     绘制训练历史
     """
+    import matplotlib.pyplot as plt  # 只在绘图时导入
+    
     plt.figure(figsize=(10, 6))
     plt.plot(train_losses, label='Training Loss')
     plt.plot(val_losses, label='Validation Loss')
@@ -109,15 +203,17 @@ def plot_training_history(train_losses, val_losses, save_dir):
     plt.savefig(os.path.join(save_dir, 'training_history.png'))
     plt.close()
 
-def main():
-    # 设置随机种子
-    torch.manual_seed(42)
-    np.random.seed(42)
+def build_memory_datasets(horizon=1, per_hour=False):
+    """
+    在内存中生成数据并创建窗口
     
-    # 设置设备
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
+    Args:
+        horizon: 每个样本的目标步数（与 TrafficCNN 输出头一致）
+        per_hour: 归一化参数是否按小时区分
     
+    Returns:
+        tuple: (train_dataset, val_dataset, norm_state)，norm_state 只在训练部分上计算
+    """
     # 生成训练数据
     data_generator = TrafficDataGenerator()
     data = data_generator.generate_time_series(n_samples=1000)
@@ -127,40 +223,133 @@ def main():
     data = preprocessor.remove_outliers(data, 'traffic_flow')
     data = preprocessor.interpolate_missing(data)
     
-    # 准备序列数据
+    # 准备序列数据（归一化参数只用训练部分计算，随检查点保存供推理使用）；
+    # 模拟数据是单条代表性序列，以服务端的传感器ID命名，并作为所有传感器的默认参数，
+    # 否则按小时的参数在服务端查不到传感器
     flow_data = data['traffic_flow'].values
-    flow_data = preprocessor.normalize_data(flow_data)
-    X, y = preprocessor.create_sequences(flow_data)
-    
-    # 数据增强
-    augmentation = TrafficDataAugmentation()
-    X_aug = np.concatenate([
-        X,
-        augmentation.add_gaussian_noise(X),
-        augmentation.random_scaling(X)
-    ])
-    y_aug = np.concatenate([y, y, y])
-    
-    # 划分训练集和验证集
-    train_size = int(0.8 * len(X_aug))
-    X_train, X_val = X_aug[:train_size], X_aug[train_size:]
-    y_train, y_val = y_aug[:train_size], y_aug[train_size:]
+    timestamps = data['timestamp'].values
+    fit_size = int(0.8 * len(flow_data))
+    norm_state = NormalizationState.fit(
+        flow_data[:fit_size], timestamps[:fit_size], sensor_ids=[DEFAULT_SENSOR_ID],
+        per_hour=per_hour, default_sensor=DEFAULT_SENSOR_ID
+    )
+    flow_data = norm_state.transform(flow_data, DEFAULT_SENSOR_ID, timestamps)
+    X, y = sliding_windows(flow_data, preprocessor.sequence_length, horizon=horizon)
     
-    # 创建数据加载器
+    # 划分训练集和验证集（数据增强在 DataLoader 中按批次进行）
+    train_size = int(0.8 * len(X))
+    X_train, X_val = X[:train_size], X[train_size:]
+    y_train, y_val = y[:train_size], y[train_size:]
+    
+    # 窗口是只读的跨步视图，转换为 float32 时复制一次得到可写的连续数组
+    def to_tensor(array, *shape):
+        return torch.from_numpy(np.array(array, dtype=np.float32)).view(*shape)
+    
+    sequence_length = preprocessor.sequence_length
     train_dataset = TensorDataset(
-        torch.FloatTensor(X_train).view(-1, 1, 12),
-        torch.FloatTensor(y_train).view(-1, 1)
+        to_tensor(X_train, -1, 1, sequence_length),
+        to_tensor(y_train, -1, horizon)
     )
     val_dataset = TensorDataset(
-        torch.FloatTensor(X_val).view(-1, 1, 12),
-        torch.FloatTensor(y_val).view(-1, 1)
+        to_tensor(X_val, -1, 1, sequence_length),
+        to_tensor(y_val, -1, horizon)
     )
+    return train_dataset, val_dataset, norm_state
+
+def prepare_dataset(data_dir, n_samples=1000, sequence_length=12, train_fraction=0.8):
+    """
+    生成并预处理模拟数据，归一化后写入内存映射数据目录
+    
+    归一化参数只用前 train_fraction 部分计算，与 build_mmap_datasets 的时间划分一致。
+    """
+    data_generator = TrafficDataGenerator()
+    data = data_generator.generate_time_series(n_samples=n_samples)
+    
+    preprocessor = TrafficDataPreprocessor(sequence_length=sequence_length)
+    data = preprocessor.remove_outliers(data, 'traffic_flow')
+    data = preprocessor.interpolate_missing(data)
+    
+    flow_data = data['traffic_flow'].values
+    return write_series(data_dir, flow_data, data['timestamp'].values,
+                        fit_steps=int(len(flow_data) * train_fraction))
+
+def build_mmap_datasets(data_dir, sequence_length=12, train_fraction=0.8, horizon=1):
+    """
+    按时间划分训练集和验证集，窗口直接从内存映射文件读取
+    
+    Returns:
+        tuple: (train_dataset, val_dataset, norm_state)，norm_state 为写入数据时使用的全局参数
+        （prepare_dataset 写入的数据只在训练部分上计算）
+    """
+    meta = load_meta(data_dir)
+    n_steps = meta['n_steps']
+    split = int(n_steps * train_fraction)
     
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=32)
+    # 训练集的目标值都在 split 之前，验证集的目标值都在 split 及之后
+    train_dataset = MmapWindowDataset(data_dir, sequence_length, horizon=horizon, stop=split)
+    val_dataset = MmapWindowDataset(data_dir, sequence_length, horizon=horizon,
+                                    start=max(0, split - sequence_length))
+    norm_state = NormalizationState.from_meta(meta, load_sensor_ids(data_dir))
+    return train_dataset, val_dataset, norm_state
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='训练交通流量预测模型')
+    parser.add_argument('--data-dir', default=None,
+                        help='内存映射数据目录，指定后窗口直接从磁盘流式读取，不在内存中物化数据集')
+    parser.add_argument('--prepare-data', action='store_true',
+                        help='生成模拟数据并写入 --data-dir（目录不存在时自动生成）')
+    parser.add_argument('--no-augment', action='store_true',
+                        help='关闭训练集的数据增强')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--horizon', type=int, default=1,
+                        help='输出头一次预测的步数（大于 1 时训练多步预测模型）')
+    parser.add_argument('--per-hour-norm', action='store_true',
+                        help='归一化参数按小时区分（仅内存数据集）')
+    parser.add_argument('--batch-size', type=int, default=32, help='批大小')
+    parser.add_argument('--num-workers', type=int, default=0, help='数据加载进程数')
+    parser.add_argument('--prefetch-factor', type=int, default=None, help='每个数据加载进程预取的批次数')
+    parser.add_argument('--persistent-workers', action='store_true', help='在 epoch 之间保留数据加载进程')
+    parser.add_argument('--pin-memory', dest='pin_memory', action='store_true', default=None,
+                        help='使用锁页内存（默认在有 CUDA 时开启）')
+    parser.add_argument('--no-pin-memory', dest='pin_memory', action='store_false')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
+    # 设置随机种子
+    torch.manual_seed(args.seed)
+    np.random.seed(args.seed)
+    
+    # 设置设备
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using device: {device}")
+    
+    # 准备数据集
+    if args.data_dir:
+        if args.prepare_data or not os.path.exists(args.data_dir):
+            prepare_dataset(args.data_dir)
+        train_dataset, val_dataset, norm_state = build_mmap_datasets(args.data_dir, horizon=args.horizon)
+    else:
+        train_dataset, val_dataset, norm_state = build_memory_datasets(
+            horizon=args.horizon, per_hour=args.per_hour_norm
+        )
+    
+    # 创建数据加载器
+    train_loader, val_loader = create_data_loaders(
+        train_dataset,
+        val_dataset,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        pin_memory=args.pin_memory,
+        persistent_workers=args.persistent_workers,
+        prefetch_factor=args.prefetch_factor,
+        augment=not args.no_augment,
+        seed=args.seed
+    )
     
     # 初始化模型
-    model = TrafficCNN().to(device)
+    model = TrafficCNN(horizon=args.horizon).to(device)
     
     # 定义损失函数和优化器
     criterion = nn.MSELoss()
@@ -172,7 +361,9 @@ def main():
     
     # 训练模型
     save_path = os.path.join(save_dir, f'model_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pth')
-    train_losses, val_losses = train_model(
+    norm_path = artifact_path(save_path, NORM_SUFFIX)
+    norm_state.save(norm_path)
+    train_losses, val_losses, epoch_stats = train_model(
         model=model,
         train_loader=train_loader,
         val_loader=val_loader,
@@ -189,6 +380,14 @@ def main():
     
     print("Training completed!")
     print(f"Model saved to: {save_path}")
+    print(f"Normalization state saved to: {norm_path}")
+    
+    # 数据等待时间占比高说明训练受限于数据加载
+    total_data_time = sum(stats['data_time'] for stats in epoch_stats)
+    total_compute_time = sum(stats['compute_time'] for stats in epoch_stats)
+    mean_throughput = np.mean([stats['samples_per_sec'] for stats in epoch_stats])
+    print(f"Mean throughput: {mean_throughput:.1f} samples/sec, "
+          f"data wait {total_data_time / (total_data_time + total_compute_time):.1%} of training time")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,126 @@
+import abc
+import random
+import numpy as np
+import torch
+from torch.utils.data import default_collate
+from typing import Sequence, Tuple
+
+
+class BatchTransform(abc.ABC):
+    """
+    按样本以概率 p 作用的批量数据增强基类
+
+    输入形状为 (batch_size, channels, sequence_length)，每个样本独立抽样是否增强以及增强参数。
+    """
+
+    def __init__(self, p: float = 1.0):
+        self.p = p
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        if self.p <= 0:
+            return x
+        augmented = self.apply(x)
+        if self.p >= 1:
+            return augmented
+        mask = torch.rand(x.shape[0], device=x.device) < self.p
+        return torch.where(mask.view(-1, *([1] * (x.dim() - 1))), augmented, x)
+
+    @abc.abstractmethod
+    def apply(self, x: torch.Tensor) -> torch.Tensor:
+        """对整个批次做增强，由 __call__ 按 p 选择保留哪些样本的结果"""
+
+
+class GaussianNoise(BatchTransform):
+    """
+    添加高斯噪声
+    """
+
+    def __init__(self, mean: float = 0.0, std: float = 0.1, p: float = 1.0):
+        super().__init__(p)
+        self.mean = mean
+        self.std = std
+
+    def apply(self, x):
+        return x + torch.randn_like(x) * self.std + self.mean
+
+
+class RandomScaling(BatchTransform):
+    """
+    随机缩放，每个样本使用独立的缩放系数
+    """
+
+    def __init__(self, scale_range: Tuple[float, float] = (0.9, 1.1), p: float = 1.0):
+        super().__init__(p)
+        self.scale_range = scale_range
+
+    def apply(self, x):
+        low, high = self.scale_range
+        shape = (x.shape[0],) + (1,) * (x.dim() - 1)
+        return x * torch.empty(shape, dtype=x.dtype, device=x.device).uniform_(low, high)
+
+
+class RandomShift(BatchTransform):
+    """
+    随机循环移位（与 np.roll 相同），每个样本使用独立的位移量
+    """
+
+    def __init__(self, shift_range: int = 2, p: float = 1.0):
+        super().__init__(p)
+        self.shift_range = shift_range
+
+    def apply(self, x):
+        length = x.shape[-1]
+        shifts = torch.randint(-self.shift_range, self.shift_range + 1, (x.shape[0],), device=x.device)
+        # 输出位置 i 取输入位置 (i - shift) mod length
+        index = (torch.arange(length, device=x.device) - shifts.view(-1, 1)) % length
+        index = index.view(x.shape[0], *([1] * (x.dim() - 2)), length).expand_as(x)
+        return torch.gather(x, -1, index)
+
+
+class Compose:
+    """
+    依次应用多个批量增强
+    """
+
+    def __init__(self, transforms: Sequence):
+        self.transforms = list(transforms)
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        for transform in self.transforms:
+            x = transform(x)
+        return x
+
+
+class AugmentedCollate:
+    """
+    DataLoader 的 collate_fn：先组成批次，再对输入做增强，目标值保持不变
+
+    增强在 DataLoader 工作进程中执行，不会在内存中保存任何增强后的副本。
+    """
+
+    def __init__(self, transform):
+        self.transform = transform
+
+    def __call__(self, batch):
+        x, y = default_collate(batch)
+        return self.transform(x), y
+
+
+def default_augmentation() -> Compose:
+    """
+    训练使用的默认增强组合
+    """
+    return Compose([
+        GaussianNoise(std=0.1, p=0.5),
+        RandomScaling(scale_range=(0.9, 1.1), p=0.5),
+        RandomShift(shift_range=2, p=0.1),
+    ])
+
+
+def seed_worker(worker_id: int):
+    """
+    DataLoader 的 worker_init_fn：根据 torch 为每个工作进程分配的种子设置 numpy 与 random
+    """
+    worker_seed = torch.initial_seed() % 2 ** 32
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
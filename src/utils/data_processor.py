@@ -1,11 +1,14 @@
 import numpy as np
 import pandas as pd
-import cv2
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+
+from utils.windowing import sliding_windows
+
+# OpenCV 与 scikit-learn 只在对应功能中导入，避免拖慢只使用 ModelEvaluator 等轻量功能的调用方
 
 class DataProcessor:
     def __init__(self):
+        from sklearn.preprocessing import StandardScaler
+
         self.scaler = StandardScaler()
         
     def preprocess_flow_data(self, data):
@@ -31,6 +34,8 @@ class DataProcessor:
     
     def preprocess_image(self, image_path, target_size=(64, 64)):
         """预处理交通图像数据"""
+        import cv2
+
         # 读取图像
         img = cv2.imread(image_path)
         if img is None:
@@ -44,21 +49,31 @@ class DataProcessor:
         
         return img
     
-    def prepare_sequence_data(self, data, sequence_length=24):
-        """准备序列数据"""
-        sequences = []
-        targets = []
-        
-        for i in range(len(data) - sequence_length):
-            sequence = data[i:(i + sequence_length)]
-            target = data[i + sequence_length]
-            sequences.append(sequence)
-            targets.append(target)
-            
-        return np.array(sequences), np.array(targets)
+    def preprocess_images(self, image_paths, target_size=(64, 64), loader=None):
+        """
+        批量预处理交通图像
+        
+        与 preprocess_image 相同保持 BGR 通道顺序，在线程池中并行解码，返回 (N, 3, 高, 宽)
+        的 uint8 数组，浮点转换由模型完成。需要重复加载时传入共享的 ImageBatchLoader。
+        """
+        from utils.image_pipeline import ImageBatchLoader
+        
+        if loader is None:
+            loader = ImageBatchLoader(target_size, rgb=False)
+            try:
+                return loader.load(image_paths)
+            finally:
+                loader.close()
+        return loader.load(image_paths)
+    
+    def prepare_sequence_data(self, data, sequence_length=24, copy=True):
+        """准备序列数据（copy=False 时返回原数组的只读跨步视图）"""
+        return sliding_windows(data, sequence_length, copy=copy)
     
     def split_data(self, X, y, test_size=0.2, val_size=0.2):
         """划分训练、验证和测试集"""
+        from sklearn.model_selection import train_test_split
+
         # 首先划分训练集和测试集
         X_train, X_test, y_train, y_test = train_test_split(
             X, y, test_size=test_size, random_state=42
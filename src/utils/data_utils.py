@@ -1,8 +1,12 @@
 import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Tuple, List, Optional
-import cv2
+
+from utils.image_pipeline import ImageBatchLoader
+from utils.synthetic import PATTERN_SINE, SyntheticTrafficGenerator
+from utils.windowing import sliding_windows
 
 class TrafficDataGenerator:
     def __init__(self, start_date: datetime = None, noise_level: float = 0.1):
@@ -19,29 +23,20 @@ class TrafficDataGenerator:
         Returns:
             DataFrame: 包含时间戳和交通流量的数据框
         """
-        timestamps = [self.start_date - timedelta(hours=i) for i in range(n_samples)]
-        timestamps.reverse()
-        
-        # 生成基础流量
-        hours = np.array([t.hour for t in timestamps])
-        weekdays = np.array([t.weekday() for t in timestamps])
-        
-        # 日变化模式
-        daily_pattern = 100 + 50 * np.sin(2 * np.pi * hours / 24)
-        
-        # 工作日模式
-        weekday_factor = np.where(weekdays < 5, 1.2, 0.8)
-        
-        # 添加随机噪声
-        noise = np.random.normal(0, self.noise_level, n_samples)
-        
-        # 组合所有因素
-        traffic_flow = (daily_pattern * weekday_factor + noise) * 100
-        traffic_flow = np.maximum(traffic_flow, 0)  # 确保流量非负
+        generator = SyntheticTrafficGenerator(
+            pattern=PATTERN_SINE,
+            base=100,
+            amplitude=50,
+            noise_level=self.noise_level,
+            trend_level=0,
+            additive_noise=True,
+            scale=100
+        )
+        timestamps, values = generator.generate(n_samples, end_time=self.start_date)
         
         return pd.DataFrame({
             'timestamp': timestamps,
-            'traffic_flow': traffic_flow.astype(int)
+            'traffic_flow': values[0].astype(int)
         })
 
 class TrafficDataPreprocessor:
@@ -63,6 +58,9 @@ class TrafficDataPreprocessor:
         """
         插值处理缺失值
         """
+        # 按时间插值需要 DatetimeIndex
+        if 'timestamp' in df.columns:
+            return df.set_index('timestamp').interpolate(method='time').reset_index()
         return df.interpolate(method='time')
     
     def normalize_data(self, data: np.ndarray) -> np.ndarray:
@@ -73,20 +71,20 @@ class TrafficDataPreprocessor:
         std = np.std(data)
         return (data - mean) / std
     
-    def create_sequences(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    def create_sequences(self, data: np.ndarray, copy: bool = True) -> Tuple[np.ndarray, np.ndarray]:
         """
         创建时序序列
+
+        copy=False 时返回原数组的只读跨步视图（零拷贝），写入会抛出 ValueError。
         """
-        X, y = [], []
-        for i in range(len(data) - self.sequence_length):
-            X.append(data[i:(i + self.sequence_length)])
-            y.append(data[i + self.sequence_length])
-        return np.array(X), np.array(y)
+        return sliding_windows(data, self.sequence_length, copy=copy)
     
     def process_image_data(self, image_path: str, target_size: Tuple[int, int] = (224, 224)) -> np.ndarray:
         """
         处理交通图像数据
         """
+        import cv2  # 只有图像功能需要 OpenCV
+        
         # 读取图像
         img = cv2.imread(image_path)
         if img is None:
@@ -106,12 +104,31 @@ class TrafficDataPreprocessor:
     def prepare_batch_data(self, images: List[str], flow_data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
         准备批量训练数据
+        
+        返回形状为 (N, 224, 224, 3) 的 float64 数组（RGB，已除以 255），与 process_image_data 逐张处理的结果相同，
+        图像在线程池中并行处理。融合模型的训练与推理使用 prepare_image_batch。
         """
-        processed_images = []
-        for img_path in images:
-            processed_images.append(self.process_image_data(img_path))
+        with ThreadPoolExecutor(thread_name_prefix="image-decode") as executor:
+            processed_images = list(executor.map(self.process_image_data, images))
         
         return np.array(processed_images), flow_data
+    
+    def prepare_image_batch(self, images: List[str], flow_data: np.ndarray,
+                            target_size: Tuple[int, int] = (64, 64),
+                            loader: Optional[ImageBatchLoader] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        准备融合模型的批量数据
+        
+        图像在线程池中并行解码（INTER_AREA 缩放），返回形状为 (N, 3, 高, 宽) 的 uint8 数组（RGB），
+        浮点转换由模型完成。需要重复加载时传入共享的 loader（可带帧缓存）。
+        """
+        if loader is None:
+            loader = ImageBatchLoader(target_size)
+            try:
+                return loader.load(images), flow_data
+            finally:
+                loader.close()
+        return loader.load(images), flow_data
 
 class TrafficDataAugmentation:
     @staticmethod
@@ -0,0 +1,260 @@
+"""
+批量图像预处理模块
+
+摄像头帧在线程池中解码与缩放（OpenCV 在这些操作中释放 GIL），结果直接写入预分配的
+uint8 NCHW 批次缓冲区；转换为浮点与归一化留给模型（见 models/cnn_model.py），
+避免在 CPU 上生成 float64 副本。可选的帧缓存把预处理结果保存在内存映射文件中，
+按 (路径, 修改时间) 命中。
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+CACHE_VALUES_FILE = 'frames.u8'
+CACHE_INDEX_FILE = 'index.json'
+
+
+# JPEG 可以在解码时按 1/2、1/4、1/8 缩小（DCT 缩放），远小于原图的目标尺寸不必完整解码
+REDUCED_DECODE_FLAGS = {1: 'IMREAD_COLOR', 2: 'IMREAD_REDUCED_COLOR_2', 4: 'IMREAD_REDUCED_COLOR_4',
+                        8: 'IMREAD_REDUCED_COLOR_8'}
+
+
+def reduction_factor(source_shape: Tuple[int, int], target_size: Tuple[int, int]) -> int:
+    """
+    不小于目标尺寸的最大解码缩小倍数
+
+    Args:
+        source_shape: 原图 (高, 宽)
+        target_size: (宽, 高)
+    """
+    height, width = source_shape
+    for factor in (8, 4, 2):
+        if width // factor >= target_size[0] and height // factor >= target_size[1]:
+            return factor
+    return 1
+
+
+def decode_frame(path: str, target_size: Tuple[int, int], out: np.ndarray, rgb: bool = True,
+                 reduce: int = 1) -> Tuple[int, int]:
+    """
+    读取一帧并缩放，按 CHW 写入 out
+
+    Args:
+        path: 图像路径
+        target_size: (宽, 高)，与 cv2.resize 相同
+        out: 形状为 (3, 高, 宽) 的 uint8 数组
+        rgb: 是否从 OpenCV 的 BGR 转换为 RGB
+        reduce: 解码时的缩小倍数（1、2、4 或 8）
+
+    Returns:
+        tuple: 解码后（缩放前）的 (高, 宽)，reduce 为 1 时即原图尺寸
+    """
+    import cv2
+
+    img = cv2.imread(path, getattr(cv2, REDUCED_DECODE_FLAGS[reduce]))
+    if img is not None and reduce > 1 and (img.shape[1] < target_size[0] or img.shape[0] < target_size[1]):
+        # 与之前的帧尺寸不同，缩小解码后小于目标尺寸，改为完整解码
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"无法读取图像: {path}")
+    decoded_shape = img.shape[:2]
+    if img.shape[1] != target_size[0] or img.shape[0] != target_size[1]:
+        img = cv2.resize(img, target_size, interpolation=cv2.INTER_AREA)
+    if rgb:
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    np.copyto(out, img.transpose(2, 0, 1))
+    return decoded_shape
+
+
+class FrameCache:
+    """
+    预处理后帧的内存映射缓存
+
+    固定容量的 uint8 数组 (capacity, 3, 高, 宽) 存放在 cache_dir 中，索引以 JSON 保存；
+    键为 (路径, 修改时间)，文件被覆盖后自动失效。超出容量时淘汰最久未使用的帧。
+    """
+
+    def __init__(self, cache_dir: str, target_size: Tuple[int, int], capacity: int = 10_000):
+        """
+        Args:
+            cache_dir: 缓存目录
+            target_size: (宽, 高)
+            capacity: 最多缓存的帧数
+        """
+        self.cache_dir = cache_dir
+        self.target_size = tuple(target_size)
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        width, height = self.target_size
+        shape = (capacity, 3, height, width)
+        values_path = os.path.join(cache_dir, CACHE_VALUES_FILE)
+        index = self._load_index(shape)
+        mode = 'r+' if index is not None and os.path.exists(values_path) else 'w+'
+        self.frames = np.memmap(values_path, dtype=np.uint8, mode=mode, shape=shape)
+
+        # 键 -> 槽位，按最近使用排序
+        self._slots = OrderedDict()
+        if mode == 'r+':
+            for path, mtime_ns, slot in index:
+                self._slots[(path, mtime_ns)] = slot
+        self._free = sorted(set(range(capacity)) - set(self._slots.values()), reverse=True)
+
+    def _load_index(self, shape):
+        try:
+            with open(os.path.join(self.cache_dir, CACHE_INDEX_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # 尺寸或容量变化后旧缓存不可用
+        if tuple(meta.get('shape', ())) != shape:
+            return None
+        return meta['entries']
+
+    @staticmethod
+    def key(path: str) -> Tuple[str, int]:
+        return os.path.abspath(path), os.stat(path).st_mtime_ns
+
+    def get(self, key, out: np.ndarray) -> bool:
+        """
+        命中时把缓存的帧复制到 out
+
+        复制在锁内完成，否则槽位可能在复制过程中被并发的 put 淘汰并覆盖为另一帧。
+        """
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                self.misses += 1
+                return False
+            self._slots.move_to_end(key)
+            self.hits += 1
+            np.copyto(out, self.frames[slot])
+        return True
+
+    def put(self, key, frame: np.ndarray):
+        with self._lock:
+            if key in self._slots:
+                return
+            if self._free:
+                slot = self._free.pop()
+            else:
+                _, slot = self._slots.popitem(last=False)
+            self.frames[slot] = frame
+            self._slots[key] = slot
+
+    def flush(self):
+        """把缓存数据与索引写回磁盘"""
+        with self._lock:
+            entries = [[path, mtime_ns, slot] for (path, mtime_ns), slot in self._slots.items()]
+            self.frames.flush()
+        width, height = self.target_size
+        tmp_path = os.path.join(self.cache_dir, CACHE_INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'shape': [self.capacity, 3, height, width], 'entries': entries}, f)
+        os.replace(tmp_path, os.path.join(self.cache_dir, CACHE_INDEX_FILE))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._slots),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class ImageBatchLoader:
+    """
+    并行图像批次加载器
+
+    每个批次返回形状为 (N, 3, 高, 宽) 的 uint8 数组，可直接作为
+    models/cnn_model.py 中 TrafficCNN 的图像输入。同一摄像头的帧尺寸通常相同，
+    因此按第一帧的尺寸确定 JPEG 缩小解码倍数，之后的帧直接按该倍数解码。
+    """
+
+    def __init__(self, target_size: Tuple[int, int] = (64, 64), num_threads: Optional[int] = None,
+                 rgb: bool = True, cache: Optional[FrameCache] = None, reduced_decode: bool = True):
+        """
+        Args:
+            target_size: (宽, 高)
+            num_threads: 解码线程数，默认为 CPU 核数
+            rgb: 是否转换为 RGB 通道顺序
+            cache: 可选的帧缓存，尺寸必须与 target_size 一致
+            reduced_decode: 是否允许 JPEG 缩小解码
+        """
+        if cache is not None and tuple(cache.target_size) != tuple(target_size):
+            raise ValueError("帧缓存的尺寸与 target_size 不一致")
+        self.target_size = tuple(target_size)
+        self.rgb = rgb
+        self.cache = cache
+        self.reduced_decode = reduced_decode
+        self._reduce = None  # 由第一帧确定
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="image-decode")
+
+    def allocate(self, batch_size: int) -> np.ndarray:
+        width, height = self.target_size
+        return np.empty((batch_size, 3, height, width), dtype=np.uint8)
+
+    def _decode(self, path: str, out: np.ndarray):
+        reduce = self._reduce or 1
+        shape = decode_frame(path, self.target_size, out, self.rgb, reduce)
+        if self._reduce is None and self.reduced_decode:
+            self._reduce = reduction_factor(shape, self.target_size)
+
+    def _load_one(self, path: str, out: np.ndarray):
+        if self.cache is None:
+            self._decode(path, out)
+            return
+        key = self.cache.key(path)
+        if not self.cache.get(key, out):
+            self._decode(path, out)
+            self.cache.put(key, out)
+
+    def load(self, paths: Sequence[str], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        解码并缩放一批图像
+
+        Args:
+            paths: 图像路径
+            out: 可复用的缓冲区，形状至少为 (len(paths), 3, 高, 宽)
+
+        Returns:
+            np.ndarray: out 的前 len(paths) 个元素
+
+        Raises:
+            ValueError: 任一图像无法读取
+        """
+        n = len(paths)
+        if out is None:
+            out = self.allocate(n)
+        elif out.dtype != np.uint8 or out.shape[0] < n or out.shape[1:] != self.allocate(0).shape[1:]:
+            raise ValueError("缓冲区形状或类型与批次不一致")
+        batch = out[:n]
+        # list() 等待全部完成，并把线程中的异常抛给调用方
+        list(self._executor.map(self._load_one, paths, batch))
+        return batch
+
+    def iter_batches(self, paths: Sequence[str], batch_size: int = 256):
+        """
+        分批加载，所有批次复用同一个缓冲区
+
+        注意每个批次在下一次迭代时会被覆盖，需要保留时应自行复制。
+        """
+        buffer = self.allocate(min(batch_size, len(paths)))
+        for start in range(0, len(paths), batch_size):
+            yield self.load(paths[start:start + batch_size], buffer)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.cache is not None:
+            self.cache.flush()
@@ -0,0 +1,197 @@
+import os
+import json
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from typing import List, Optional, Sequence
+
+# 数据目录中的文件
+VALUES_FILE = 'values.f32'          # float32, 形状 (n_sensors, n_steps)，每个传感器连续存储
+TIMESTAMPS_FILE = 'timestamps.npy'  # int64 epoch 秒, 形状 (n_steps,)
+SENSORS_FILE = 'sensors.json'       # 传感器ID列表，顺序与 values 的行一致
+META_FILE = 'meta.json'             # 形状、数据类型与归一化参数
+
+
+class MmapSeriesWriter:
+    """
+    按时间分块写入内存映射时间序列文件
+
+    用法:
+        writer = MmapSeriesWriter(path, sensor_ids, n_steps)
+        writer.write(0, values_chunk, timestamps_chunk)
+        ...
+        writer.close(mean=..., std=...)
+    """
+
+    def __init__(self, path: str, sensor_ids: Sequence[str], n_steps: int):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.sensor_ids = [str(s) for s in sensor_ids]
+        self.n_steps = n_steps
+        self.values = np.memmap(
+            os.path.join(path, VALUES_FILE), dtype=np.float32, mode='w+',
+            shape=(len(self.sensor_ids), n_steps)
+        )
+        self.timestamps = np.lib.format.open_memmap(
+            os.path.join(path, TIMESTAMPS_FILE), mode='w+', dtype=np.int64, shape=(n_steps,)
+        )
+
+    def write(self, start: int, values: np.ndarray, timestamps: Optional[np.ndarray] = None):
+        """
+        写入一个时间块
+
+        Args:
+            start: 块在时间轴上的起始位置
+            values: 形状为 (n_sensors, chunk_steps) 的数据
+            timestamps: 形状为 (chunk_steps,) 的 epoch 秒
+        """
+        values = np.asarray(values, dtype=np.float32)
+        stop = start + values.shape[1]
+        self.values[:, start:stop] = values
+        if timestamps is not None:
+            self.timestamps[start:stop] = timestamps
+
+    def close(self, mean: float = 0.0, std: float = 1.0, **extra):
+        self.values.flush()
+        self.timestamps.flush()
+        with open(os.path.join(self.path, SENSORS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(self.sensor_ids, f, ensure_ascii=False)
+        meta = {
+            'n_sensors': len(self.sensor_ids),
+            'n_steps': self.n_steps,
+            'dtype': 'float32',
+            'mean': float(mean),
+            'std': float(std),
+            **extra
+        }
+        with open(os.path.join(self.path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        del self.values, self.timestamps
+
+
+def write_series(path: str, values: np.ndarray, timestamps: np.ndarray,
+                 sensor_ids: Optional[Sequence[str]] = None, normalize: bool = True,
+                 chunk_steps: int = 1 << 16, fit_steps: Optional[int] = None) -> dict:
+    """
+    将（可选归一化后的）时间序列写入内存映射数据目录
+
+    Args:
+        path: 输出目录
+        values: 形状为 (n_steps,) 或 (n_sensors, n_steps) 的原始数据
+        timestamps: 形状为 (n_steps,) 的时间戳（datetime64 或 epoch 秒）
+        sensor_ids: 传感器ID列表，默认为 0..n_sensors-1
+        normalize: 是否按全局均值/标准差归一化（与 TrafficDataPreprocessor.normalize_data 一致）
+        chunk_steps: 每次写入的时间步数
+        fit_steps: 只用前 fit_steps 个时间步（训练部分）计算归一化参数，None 时使用全部数据
+
+    Returns:
+        dict: 写入的元数据
+    """
+    values = np.atleast_2d(np.asarray(values))
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        timestamps = timestamps.astype('datetime64[s]').astype(np.int64)
+    n_sensors, n_steps = values.shape
+    sensor_ids = sensor_ids if sensor_ids is not None else [str(i) for i in range(n_sensors)]
+
+    mean, std = 0.0, 1.0
+    if normalize:
+        fit_values = values[:, :fit_steps] if fit_steps is not None else values
+        mean = float(np.mean(fit_values, dtype=np.float64))
+        std = float(np.std(fit_values, dtype=np.float64))
+
+    writer = MmapSeriesWriter(path, sensor_ids, n_steps)
+    for start in range(0, n_steps, chunk_steps):
+        chunk = values[:, start:start + chunk_steps]
+        writer.write(start, (chunk - mean) / std, timestamps[start:start + chunk_steps])
+    writer.close(mean=mean, std=std, fit_steps=min(fit_steps, n_steps) if fit_steps is not None else n_steps)
+    return load_meta(path)
+
+
+def load_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_sensor_ids(path: str) -> List[str]:
+    with open(os.path.join(path, SENSORS_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def open_values(path: str, mode: str = 'r') -> np.memmap:
+    """以内存映射方式打开数据矩阵"""
+    meta = load_meta(path)
+    return np.memmap(
+        os.path.join(path, VALUES_FILE), dtype=np.float32, mode=mode,
+        shape=(meta['n_sensors'], meta['n_steps'])
+    )
+
+
+def open_timestamps(path: str) -> np.ndarray:
+    return np.load(os.path.join(path, TIMESTAMPS_FILE), mmap_mode='r')
+
+
+class MmapWindowDataset(Dataset):
+    """
+    直接从内存映射文件按偏移读取窗口的数据集
+
+    样本按 (传感器, 窗口) 编号，__getitem__ 返回内存映射上的张量视图，
+    不复制数据；内存映射在每个进程中首次访问时打开，因此可用于多进程 DataLoader。
+    """
+
+    def __init__(self, path: str, sequence_length: int = 12, horizon: int = 1, stride: int = 1,
+                 start: int = 0, stop: Optional[int] = None, sensors: Optional[Sequence[int]] = None):
+        """
+        Args:
+            path: write_series 生成的数据目录
+            sequence_length: 输入序列长度
+            horizon: 预测步数
+            stride: 相邻窗口起点的间隔
+            start: 使用的时间范围起点（含）
+            stop: 使用的时间范围终点（不含），默认为序列末尾
+            sensors: 使用的传感器行号，默认为全部传感器
+        """
+        meta = load_meta(path)
+        self.path = path
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.stride = stride
+        self.start = start
+        self.stop = meta['n_steps'] if stop is None else min(stop, meta['n_steps'])
+        self.sensors = np.arange(meta['n_sensors']) if sensors is None else np.asarray(sensors)
+        self.mean = meta['mean']
+        self.std = meta['std']
+
+        span = sequence_length + horizon
+        n_steps = self.stop - self.start
+        self.windows_per_sensor = max(0, (n_steps - span) // stride + 1)
+        self._values = None
+
+    def __len__(self):
+        return len(self.sensors) * self.windows_per_sensor
+
+    def __getstate__(self):
+        # 不序列化内存映射本身，由工作进程重新打开
+        state = self.__dict__.copy()
+        state['_values'] = None
+        return state
+
+    def locate(self, idx: int):
+        """样本编号对应的 (传感器行号, 窗口起始时间步)"""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        sensor, window = divmod(idx, self.windows_per_sensor)
+        return int(self.sensors[sensor]), self.start + window * self.stride
+
+    def __getitem__(self, idx):
+        if self._values is None:
+            # copy-on-write 映射: 可以零拷贝地转换为张量，且任何写入都不会落盘
+            self._values = open_values(self.path, mode='c')
+
+        row, offset = self.locate(idx)
+        series = self._values[row]
+        x = torch.from_numpy(series[offset:offset + self.sequence_length]).view(1, -1)
+        target = series[offset + self.sequence_length:offset + self.sequence_length + self.horizon]
+        return x, torch.from_numpy(target)
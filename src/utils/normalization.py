@@ -0,0 +1,253 @@
+"""
+归一化状态模块
+
+训练时按传感器（可选再按小时）一次性计算均值/标准差，与检查点一起保存，
+推理时直接加载并用向量化运算完成归一化与反归一化，不再逐请求拟合 scaler。
+"""
+import json
+from typing import Optional, Sequence
+
+import numpy as np
+
+# 归一化状态文件后缀，与检查点同名放在同一目录，例如 model_xxx.pth -> model_xxx.norm.json
+NORM_SUFFIX = '.norm.json'
+
+HOURS_PER_DAY = 24
+
+
+def _hours(timestamps) -> np.ndarray:
+    """datetime64 或 epoch 秒 -> 小时（0-23）"""
+    ts = np.asarray(timestamps)
+    if np.issubdtype(ts.dtype, np.datetime64) or ts.dtype == object:
+        ts = ts.astype('datetime64[s]').astype(np.int64)
+    return (ts.astype(np.int64) // 3600) % HOURS_PER_DAY
+
+
+class NormalizationState:
+    """
+    按传感器（可选按小时）保存的归一化参数
+
+    未知传感器使用 default_sensor 的参数，未设置 default_sensor 时使用全局参数；
+    按小时统计时全局参数没有小时信息，因此未知传感器（且没有 default_sensor）直接报错。
+    按小时统计时没有样本的小时使用该传感器的整体参数。
+    """
+
+    def __init__(self, sensor_ids: Sequence[str], mean: np.ndarray, std: np.ndarray,
+                 global_mean: float, global_std: float, per_hour: bool = False,
+                 default_sensor: Optional[str] = None):
+        """
+        Args:
+            sensor_ids: 传感器ID列表
+            mean: 形状为 (n_sensors,) 或 (n_sensors, 24)（per_hour）的均值
+            std: 与 mean 形状相同的标准差
+            global_mean: 全局均值
+            global_std: 全局标准差
+            per_hour: 参数是否按小时区分
+            default_sensor: 未知传感器使用的传感器ID（例如用单条代表性序列训练的模型），
+                必须在 sensor_ids 中
+        """
+        self.sensor_ids = [str(sensor_id) for sensor_id in sensor_ids]
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.global_mean = float(global_mean)
+        self.global_std = float(global_std)
+        self.per_hour = per_hour
+        self._rows = {sensor_id: i for i, sensor_id in enumerate(self.sensor_ids)}
+        self.default_sensor = str(default_sensor) if default_sensor is not None else None
+        if self.default_sensor is not None and self.default_sensor not in self._rows:
+            raise ValueError(f"default_sensor {self.default_sensor} 不在 sensor_ids 中")
+
+    @classmethod
+    def fit(cls, values, timestamps=None, sensor_ids: Optional[Sequence[str]] = None,
+            per_hour: bool = False, min_std: float = 1e-6,
+            default_sensor: Optional[str] = None) -> 'NormalizationState':
+        """
+        从训练数据计算归一化参数
+
+        Args:
+            values: 形状为 (n_steps,) 或 (n_sensors, n_steps) 的原始数据，NaN 视为缺失
+            timestamps: 形状为 (n_steps,) 的时间戳（per_hour 时必需）
+            sensor_ids: 传感器ID列表，默认为 0..n_sensors-1
+            per_hour: 是否按小时分别计算
+            min_std: 标准差下限，避免常数序列除零
+            default_sensor: 未知传感器使用的传感器ID
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        n_sensors = values.shape[0]
+        sensor_ids = sensor_ids if sensor_ids is not None else [str(i) for i in range(n_sensors)]
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+
+        # 先按传感器计算整体参数，作为按小时参数缺失时的回退值
+        count = valid.sum(axis=1)
+        total = filled.sum(axis=1)
+        squares = (filled ** 2).sum(axis=1)
+        mean, std = cls._moments(count, total, squares, min_std, fallback=(0.0, 1.0))
+
+        global_mean, global_std = cls._moments(
+            count.sum(), total.sum(), squares.sum(), min_std, fallback=(0.0, 1.0)
+        )
+        mean = np.where(count > 0, mean, global_mean)
+        std = np.where(count > 0, std, global_std)
+
+        if per_hour:
+            if timestamps is None:
+                raise ValueError("per_hour 归一化需要提供 timestamps")
+            # (传感器, 小时) 组合编号后用 bincount 分组求和
+            groups = (np.arange(n_sensors)[:, None] * HOURS_PER_DAY + _hours(timestamps)[None, :]).ravel()
+            size = n_sensors * HOURS_PER_DAY
+            shape = (n_sensors, HOURS_PER_DAY)
+            hour_count = np.bincount(groups, weights=valid.ravel(), minlength=size).reshape(shape)
+            hour_total = np.bincount(groups, weights=filled.ravel(), minlength=size).reshape(shape)
+            hour_squares = np.bincount(groups, weights=(filled ** 2).ravel(), minlength=size).reshape(shape)
+            hour_mean, hour_std = cls._moments(hour_count, hour_total, hour_squares, min_std,
+                                               fallback=(mean[:, None], std[:, None]))
+            mean, std = hour_mean, hour_std
+
+        return cls(sensor_ids, mean, std, global_mean, global_std, per_hour=per_hour,
+                   default_sensor=default_sensor)
+
+    @staticmethod
+    def _moments(count, total, squares, min_std, fallback):
+        count = np.asarray(count, dtype=np.float64)
+        safe = np.maximum(count, 1.0)
+        mean = total / safe
+        std = np.sqrt(np.maximum(squares / safe - mean ** 2, 0.0))
+        std = np.maximum(std, min_std)
+        mean = np.where(count > 0, mean, fallback[0])
+        std = np.where(count > 0, std, fallback[1])
+        return mean, std
+
+    @classmethod
+    def from_meta(cls, meta: dict, sensor_ids: Sequence[str]) -> 'NormalizationState':
+        """
+        由内存映射数据目录的元数据构造（write_series 使用全局均值/标准差归一化）
+        """
+        return cls(
+            sensor_ids,
+            np.full(len(sensor_ids), meta['mean']),
+            np.full(len(sensor_ids), meta['std']),
+            meta['mean'],
+            meta['std']
+        )
+
+    def __contains__(self, sensor_id: str) -> bool:
+        return sensor_id in self._rows
+
+    def supports(self, sensor_id: Optional[str]) -> bool:
+        """是否有该传感器可用的参数（按小时归一化时未知传感器且没有 default_sensor 则没有）"""
+        return not self.per_hour or sensor_id in self._rows or self.default_sensor is not None
+
+    def _row(self, sensor_id: Optional[str]) -> Optional[int]:
+        """
+        传感器对应的参数行，使用全局参数时返回 None
+
+        Raises:
+            KeyError: 按小时归一化时传感器未知且没有 default_sensor
+        """
+        row = self._rows.get(sensor_id)
+        if row is None and self.default_sensor is not None:
+            row = self._rows[self.default_sensor]
+        if row is None and self.per_hour:
+            raise KeyError(f"按小时的归一化参数中没有传感器 {sensor_id}")
+        return row
+
+    def parameters(self, sensor_id: Optional[str] = None, timestamps=None):
+        """
+        指定传感器（与时间点）的归一化参数
+
+        Returns:
+            tuple: (mean, std)，per_hour 且给出 timestamps 时为与 timestamps 等长的数组，否则为标量
+        """
+        row = self._row(sensor_id)
+        if row is None:
+            return self.global_mean, self.global_std
+        if not self.per_hour:
+            return self.mean[row], self.std[row]
+        if timestamps is None:
+            # 未给出时间点时使用各小时参数的平均值
+            return self.mean[row].mean(), self.std[row].mean()
+        hours = _hours(timestamps)
+        return self.mean[row, hours], self.std[row, hours]
+
+    def parameters_many(self, sensor_ids: Sequence[str], timestamps=None):
+        """
+        多个传感器共享同一组时间点时的归一化参数
+
+        Returns:
+            tuple: (mean, std)，形状为 (n_sensors, 1)，per_hour 且给出 timestamps 时为 (n_sensors, n_steps)
+        """
+        rows = np.array([-1 if row is None else row for row in map(self._row, sensor_ids)], dtype=np.int64)
+        known = rows >= 0
+        if self.per_hour and timestamps is not None:
+            columns = _hours(timestamps)[None, :]
+        elif self.per_hour:
+            columns = slice(None)
+        else:
+            columns = None
+
+        def gather(table, fallback):
+            if columns is None:
+                selected = table[np.maximum(rows, 0)][:, None]
+            elif isinstance(columns, slice):
+                selected = table[np.maximum(rows, 0)].mean(axis=1, keepdims=True)
+            else:
+                selected = table[np.maximum(rows, 0)[:, None], columns]
+            return np.where(known[:, None], selected, fallback)
+
+        if len(self.sensor_ids) == 0:
+            shape = (len(rows), 1)
+            return np.full(shape, self.global_mean), np.full(shape, self.global_std)
+        return gather(self.mean, self.global_mean), gather(self.std, self.global_std)
+
+    def transform_many(self, values, sensor_ids: Sequence[str], timestamps=None) -> np.ndarray:
+        """批量归一化，values 形状为 (n_sensors, n_steps)"""
+        mean, std = self.parameters_many(sensor_ids, timestamps)
+        return (np.asarray(values, dtype=np.float64) - mean) / std
+
+    def inverse_transform_many(self, values, sensor_ids: Sequence[str], timestamps=None) -> np.ndarray:
+        """批量反归一化，values 形状为 (n_sensors, n_steps)"""
+        mean, std = self.parameters_many(sensor_ids, timestamps)
+        return np.asarray(values, dtype=np.float64) * std + mean
+
+    def transform(self, values, sensor_id: Optional[str] = None, timestamps=None) -> np.ndarray:
+        """归一化：(values - mean) / std"""
+        mean, std = self.parameters(sensor_id, timestamps)
+        return (np.asarray(values, dtype=np.float64) - mean) / std
+
+    def inverse_transform(self, values, sensor_id: Optional[str] = None, timestamps=None) -> np.ndarray:
+        """反归一化：values * std + mean"""
+        mean, std = self.parameters(sensor_id, timestamps)
+        return np.asarray(values, dtype=np.float64) * std + mean
+
+    def to_dict(self) -> dict:
+        return {
+            'sensor_ids': self.sensor_ids,
+            'per_hour': self.per_hour,
+            'default_sensor': self.default_sensor,
+            'global_mean': self.global_mean,
+            'global_std': self.global_std,
+            'mean': self.mean.tolist(),
+            'std': self.std.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'NormalizationState':
+        return cls(
+            state['sensor_ids'],
+            state['mean'],
+            state['std'],
+            state['global_mean'],
+            state['global_std'],
+            per_hour=state.get('per_hour', False),
+            default_sensor=state.get('default_sensor')
+        )
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> 'NormalizationState':
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,201 @@
+"""
+时序窗口构建模块
+
+基于跨步视图（numpy sliding_window_view / Tensor.unfold）一次性构建 (X, y) 窗口，
+默认零拷贝返回只读视图，需要写入或连续内存时传入 copy=True；
+大数据集可用 iter_window_batches 按批次惰性物化。
+autoregressive_rollout 是训练、预计算与在线服务共用的自回归多步展开逻辑。
+"""
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Awaitable, Callable, Generator, Iterator, Tuple
+
+
+def num_windows(n_steps: int, sequence_length: int, horizon: int = 1, stride: int = 1) -> int:
+    """
+    计算可生成的窗口数量
+    """
+    span = sequence_length + horizon
+    if n_steps < span:
+        return 0
+    return (n_steps - span) // stride + 1
+
+
+def _check_args(sequence_length: int, horizon: int, stride: int):
+    if sequence_length < 1 or horizon < 1 or stride < 1:
+        raise ValueError("sequence_length、horizon 与 stride 必须为正整数")
+
+
+def sliding_windows(data, sequence_length: int, horizon: int = 1, stride: int = 1,
+                    copy: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    基于跨步视图创建时序窗口
+
+    Args:
+        data: 时间序列，形状为 (n_steps, *features)，时间维在第 0 轴
+        sequence_length: 输入序列长度
+        horizon: 预测步数
+        stride: 相邻窗口起点的间隔
+        copy: 为 False 时返回原数组的只读视图（零拷贝），为 True 时返回连续的副本
+
+    Returns:
+        tuple: (X, y)
+            X 形状为 (n_windows, sequence_length, *features)
+            y 形状为 (n_windows, *features)（horizon == 1）或 (n_windows, horizon, *features)
+    """
+    _check_args(sequence_length, horizon, stride)
+    data = np.asarray(data)
+    span = sequence_length + horizon
+
+    if len(data) < span:
+        X = np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype)
+        y = np.empty((0,) + ((horizon,) if horizon > 1 else ()) + data.shape[1:], dtype=data.dtype)
+        return X, y
+
+    # (n_windows, *features, span) -> (n_windows, span, *features)
+    windows = np.moveaxis(sliding_window_view(data, span, axis=0)[::stride], -1, 1)
+    X = windows[:, :sequence_length]
+    y = windows[:, sequence_length] if horizon == 1 else windows[:, sequence_length:]
+
+    if copy:
+        return np.array(X), np.array(y)
+    return X, y
+
+
+def multi_sensor_windows(data, sequence_length: int, horizon: int = 1, stride: int = 1,
+                         copy: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    为多个传感器同时创建时序窗口
+
+    Args:
+        data: 形状为 (n_sensors, n_steps) 的时间序列矩阵
+        sequence_length: 输入序列长度
+        horizon: 预测步数
+        stride: 相邻窗口起点的间隔
+        copy: 是否返回连续的副本
+
+    Returns:
+        tuple: (X, y)
+            X 形状为 (n_sensors, n_windows, sequence_length)
+            y 形状为 (n_sensors, n_windows)（horizon == 1）或 (n_sensors, n_windows, horizon)
+    """
+    _check_args(sequence_length, horizon, stride)
+    data = np.asarray(data)
+    if data.ndim != 2:
+        raise ValueError("data 的形状必须为 (n_sensors, n_steps)")
+
+    n_sensors, n_steps = data.shape
+    span = sequence_length + horizon
+    if n_steps < span:
+        X = np.empty((n_sensors, 0, sequence_length), dtype=data.dtype)
+        y = np.empty((n_sensors, 0) + ((horizon,) if horizon > 1 else ()), dtype=data.dtype)
+        return X, y
+
+    windows = sliding_window_view(data, span, axis=1)[:, ::stride]
+    X = windows[..., :sequence_length]
+    y = windows[..., sequence_length] if horizon == 1 else windows[..., sequence_length:]
+
+    if copy:
+        return np.array(X), np.array(y)
+    return X, y
+
+
+def torch_sliding_windows(data, sequence_length: int, horizon: int = 1,
+                          stride: int = 1) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    基于 Tensor.unfold 创建时序窗口，返回共享同一存储的 float32 张量视图
+
+    Args:
+        data: 时间序列（numpy 数组或张量），时间维在第 0 轴
+        sequence_length: 输入序列长度
+        horizon: 预测步数
+        stride: 相邻窗口起点的间隔
+
+    Returns:
+        tuple: (X, y)，形状与 sliding_windows 相同
+    """
+    _check_args(sequence_length, horizon, stride)
+    if isinstance(data, torch.Tensor):
+        series = data.to(torch.float32)
+    else:
+        # 复制一次原始序列，避免窗口与调用方的数组共享内存
+        series = torch.tensor(np.asarray(data), dtype=torch.float32)
+    span = sequence_length + horizon
+
+    if series.shape[0] < span:
+        X = series.new_empty((0, sequence_length) + tuple(series.shape[1:]))
+        y = series.new_empty((0,) + ((horizon,) if horizon > 1 else ()) + tuple(series.shape[1:]))
+        return X, y
+
+    windows = series.unfold(0, span, stride).movedim(-1, 1)
+    X = windows[:, :sequence_length]
+    y = windows[:, sequence_length] if horizon == 1 else windows[:, sequence_length:]
+    return X, y
+
+
+def iter_window_batches(data, sequence_length: int, horizon: int = 1, stride: int = 1,
+                        batch_size: int = 4096) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    按批次惰性物化窗口，每次只复制 batch_size 个窗口
+
+    Yields:
+        tuple: (X_batch, y_batch)，均为连续数组
+    """
+    X, y = sliding_windows(data, sequence_length, horizon, stride)
+    for start in range(0, len(X), batch_size):
+        yield np.array(X[start:start + batch_size]), np.array(y[start:start + batch_size])
+
+
+def autoregressive_rollout(window, horizon: int,
+                           sequence_length: int) -> Generator[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    自回归多步预测的展开过程（生成器）
+
+    每次产出形状为 (batch_size, sequence_length) 的 float32 输入窗口，调用方完成前向计算后用
+    send 传回输出 (batch_size, k)（单输出模型 k 为 1，多输出头为 H）；取不超过剩余步数的部分
+    追加到窗口末尾后继续，直到凑满 horizon 步。前向计算由调用方决定，同步与异步（合批器）
+    调用方因此共用同一套展开逻辑，见 run_rollout 与 run_rollout_async。
+
+    Args:
+        window: 形状为 (batch_size, n_steps) 的归一化序列，n_steps >= sequence_length
+        horizon: 预测步数
+        sequence_length: 模型输入序列长度
+
+    Returns:
+        np.ndarray: 形状为 (batch_size, horizon) 的预测值（StopIteration.value）
+    """
+    window = np.asarray(window, dtype=np.float32)
+    batch_size = window.shape[0]
+    predictions = np.empty((batch_size, horizon), dtype=np.float32)
+    n_predicted = 0
+    while n_predicted < horizon:
+        output = yield window[:, -sequence_length:]
+        step = np.asarray(output, dtype=np.float32).reshape(batch_size, -1)[:, :horizon - n_predicted]
+        if step.shape[1] == 0:
+            raise ValueError("模型输出为空，无法继续自回归展开")
+        predictions[:, n_predicted:n_predicted + step.shape[1]] = step
+        n_predicted += step.shape[1]
+        window = np.concatenate([window[:, -sequence_length:], step], axis=1)
+    return predictions
+
+
+def run_rollout(rollout: Generator, forward: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """用同步的前向函数驱动 autoregressive_rollout，返回 (batch_size, horizon) 的预测值"""
+    try:
+        inputs = next(rollout)
+        while True:
+            inputs = rollout.send(forward(inputs))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_rollout_async(rollout: Generator,
+                            forward: Callable[[np.ndarray], Awaitable[np.ndarray]]) -> np.ndarray:
+    """用异步的前向函数（如合批器）驱动 autoregressive_rollout"""
+    try:
+        inputs = next(rollout)
+        while True:
+            inputs = rollout.send(await forward(inputs))
+    except StopIteration as stop:
+        return stop.value
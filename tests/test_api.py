@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SIMULATED_SENSORS", "3")
+os.environ.setdefault("STORE_CAPACITY", "200")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import main  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_sensor_behind_the_shared_clock_does_not_return_500(client):
+    latest = main.sensor_store.latest_timestamp
+    response = client.post("/ingest", json={"sensor_ids": ["sensor_late_new"], "timestamps": [latest + 3600],
+                                            "values": [100.0]})
+    assert response.status_code == 200
+
+    # sensor_2 在新时间槽上没有样本：统计与当前数据正常返回（缺失值为 null），预测返回 409
+    for path in ("/stats", "/analysis", "/data/current"):
+        assert client.get(path, params={"sensor_id": "sensor_2"}).status_code == 200
+    assert client.get("/data/current", params={"sensor_id": "sensor_2"}).json()["values"][-1] is None
+    assert client.get("/predict", params={"sensor_id": "sensor_2"}).status_code == 409
+    assert client.get("/stats", params={"sensor_id": "sensor_late_new"}).json()["std"] is None
+
+    # 补写后恢复
+    backfill = client.post("/ingest", json={"sensor_ids": ["sensor_2"], "timestamps": [latest + 3600],
+                                            "values": [100.0]})
+    assert backfill.status_code == 200
+    assert client.get("/predict", params={"sensor_id": "sensor_2"}).status_code == 200
+
+
+def test_conditional_get_returns_304_until_data_changes(client):
+    response = client.get("/stats", params={"sensor_id": "sensor_1"})
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    cached = client.get("/stats", params={"sensor_id": "sensor_1"}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    latest = main.sensor_store.latest_timestamp
+    ingest = client.post("/ingest", json={"sensor_ids": ["sensor_1"], "timestamps": [latest], "values": [1.0]})
+    assert ingest.status_code == 200
+    fresh = client.get("/stats", params={"sensor_id": "sensor_1"}, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+
+
+def test_sensor_missing_from_per_hour_normalization_returns_409(client, monkeypatch):
+    import numpy as np
+    from utils.normalization import NormalizationState
+
+    timestamps = np.arange(48) * 3600
+    per_hour = NormalizationState.fit(np.full((1, 48), 100.0), timestamps, sensor_ids=["sensor_0"], per_hour=True)
+    monkeypatch.setattr(main, "normalizer", per_hour)
+    monkeypatch.setattr(main.prediction_scheduler, "normalizer", per_hour)
+
+    # 写入一个完整的新窗口，使缓存与预计算结果失效
+    latest = main.sensor_store.latest_timestamp
+    sensors = ["sensor_0", "sensor_1", "sensor_2"]
+    steps = [latest + 3600 * (i + 1) for i in range(12)]
+    ingest = client.post("/ingest", json={"sensor_ids": sensors * 12, "timestamps": [t for t in steps for _ in sensors],
+                                          "values": [100.0] * 36})
+    assert ingest.status_code == 200
+
+    for params in ({}, {"horizon": 3}):
+        response = client.get("/predict", params={"sensor_id": "sensor_1", **params})
+        assert response.status_code == 409
+        assert "sensor_1" in response.json()["detail"]
+        assert client.get("/predict", params={"sensor_id": "sensor_0", **params}).status_code == 200
+
+
+def parse_metrics(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_expose_prediction_stage_histograms(client):
+    # 超过预计算步数的 horizon 一定按需计算，经过全部阶段
+    assert client.get("/predict", params={"sensor_id": "sensor_0", "horizon": 20}).status_code == 200
+    client.get("/no-such-route")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE traffic_prediction_stage_seconds histogram" in text
+    samples = parse_metrics(text)
+
+    for stage in ("lookup", "preprocess", "forward", "postprocess"):
+        labels = f'endpoint="forecast",stage="{stage}"'
+        count = samples[f"traffic_prediction_stage_seconds_count{{{labels}}}"]
+        assert count >= 1
+        assert samples[f'traffic_prediction_stage_seconds_bucket{{{labels},le="+Inf"}}'] == count
+        assert samples[f"traffic_prediction_stage_seconds_sum{{{labels}}}"] > 0
+        buckets = [v for k, v in samples.items()
+                   if k.startswith(f"traffic_prediction_stage_seconds_bucket{{{labels},")]
+        assert buckets == sorted(buckets)  # 累计分桶
+
+    assert samples['traffic_http_requests_total{method="GET",path="/predict",status="200"}'] >= 1
+    assert samples['traffic_http_requests_total{method="GET",path="unmatched",status="404"}'] >= 1
+    assert samples['traffic_http_request_duration_seconds_count{method="GET",path="/predict"}'] >= 1
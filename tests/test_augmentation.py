@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import torch
+from torch.utils.data import TensorDataset
+
+from utils.augmentation import AugmentedCollate, GaussianNoise, RandomScaling, RandomShift, default_augmentation
+from models.train import create_data_loaders
+
+
+def make_dataset(n=64, length=12):
+    x = torch.arange(n * length, dtype=torch.float32).view(n, 1, length) / 100
+    y = torch.arange(n, dtype=torch.float32).view(n, 1)
+    return TensorDataset(x, y)
+
+
+def collect(loader):
+    return [(x.clone(), y.clone()) for x, y in loader]
+
+
+@pytest.mark.parametrize("num_workers", [0, 1])
+def test_augmented_loader_is_deterministic_under_seed(num_workers):
+    dataset = make_dataset()
+    runs = []
+    for seed in (7, 7, 8):
+        torch.manual_seed(seed)  # 主进程加载时增强使用全局随机数生成器
+        train_loader, _ = create_data_loaders(dataset, dataset, batch_size=16,
+                                              num_workers=num_workers, seed=seed)
+        runs.append(collect(train_loader))
+
+    first, repeat, other = runs
+    for (x1, y1), (x2, y2) in zip(first, repeat):
+        assert torch.equal(x1, x2) and torch.equal(y1, y2)
+    assert any(not torch.equal(x1, x3) for (x1, _), (x3, _) in zip(first, other))
+
+
+def test_augmentation_leaves_stored_data_and_targets_unmodified():
+    dataset = make_dataset()
+    stored_x, stored_y = (t.clone() for t in dataset.tensors)
+
+    torch.manual_seed(0)
+    collate = AugmentedCollate(default_augmentation())
+    x, y = collate([dataset[i] for i in range(32)])
+
+    assert torch.equal(dataset.tensors[0], stored_x)
+    assert torch.equal(dataset.tensors[1], stored_y)
+    assert torch.equal(y, stored_y[:32])
+    assert not torch.equal(x, stored_x[:32])
+
+
+def test_probability_selects_whole_samples():
+    x = torch.ones(256, 1, 12)
+    torch.manual_seed(0)
+    out = RandomScaling(scale_range=(2.0, 3.0), p=0.5)(x)
+    unchanged = (out == 1).all(dim=-1).squeeze(1)
+    scaled = ((out >= 2) & (out <= 3)).all(dim=-1).squeeze(1)
+    assert bool((unchanged | scaled).all())
+    assert 64 < int(unchanged.sum()) < 192
+
+    assert torch.equal(GaussianNoise(p=0.0)(x), x)
+
+
+def test_random_shift_matches_np_roll():
+    x = torch.arange(8 * 12, dtype=torch.float32).view(8, 1, 12)
+    torch.manual_seed(3)
+    out = RandomShift(shift_range=3)(x)
+    for sample, shifted in zip(x.numpy(), out.numpy()):
+        matches = [s for s in range(-3, 4) if np.array_equal(np.roll(sample, s, axis=-1), shifted)]
+        assert matches
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from backend.batching import BatchPredictor
+from models.traffic_cnn import TrafficCNN
+
+
+class CountingForward:
+    """记录每次批量前向的批大小"""
+
+    def __init__(self, model, delay: float = 0.0):
+        self.model = model
+        self.delay = delay
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, inputs):
+        with self._lock:
+            self.batch_sizes.append(len(inputs))
+        time.sleep(self.delay)
+        with torch.no_grad():
+            return self.model(torch.from_numpy(inputs)).numpy()
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return TrafficCNN().eval()
+
+
+def run_concurrent(predictor, inputs):
+    async def run():
+        try:
+            return await asyncio.gather(*(predictor.predict(x) for x in inputs))
+        finally:
+            await predictor.stop()
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_forward_pass(model):
+    forward = CountingForward(model)
+    predictor = BatchPredictor(model, max_batch_size=64, max_wait_ms=50, forward_fn=forward)
+    inputs = np.random.default_rng(0).standard_normal((16, 1, 12)).astype(np.float32)
+
+    outputs = run_concurrent(predictor, inputs)
+
+    assert forward.batch_sizes == [16]
+    with torch.no_grad():
+        expected = [model(torch.from_numpy(x[None])).numpy()[0] for x in inputs]
+    np.testing.assert_allclose(np.stack(outputs), np.stack(expected), rtol=1e-5, atol=1e-5)
+
+
+def test_full_batch_is_flushed_before_max_wait(model):
+    forward = CountingForward(model)
+    predictor = BatchPredictor(model, max_batch_size=4, max_wait_ms=10_000, forward_fn=forward)
+    inputs = np.zeros((8, 1, 12), dtype=np.float32)
+
+    start = time.perf_counter()
+    run_concurrent(predictor, inputs)
+
+    assert time.perf_counter() - start < 5.0
+    assert forward.batch_sizes == [4, 4]
+
+
+def test_partial_batch_is_flushed_after_max_wait(model):
+    forward = CountingForward(model)
+    predictor = BatchPredictor(model, max_batch_size=64, max_wait_ms=20, forward_fn=forward)
+
+    async def run():
+        try:
+            first = await predictor.predict(np.zeros((1, 12), dtype=np.float32))
+            second = await predictor.predict(np.ones((1, 12), dtype=np.float32))
+            return first, second
+        finally:
+            await predictor.stop()
+
+    asyncio.run(run())
+    assert forward.batch_sizes == [1, 1]
+
+
+def test_stats_report_histogram_and_percentiles(model):
+    predictor = BatchPredictor(model, max_batch_size=8, max_wait_ms=20, forward_fn=CountingForward(model))
+
+    async def run():
+        try:
+            for n in (8, 3):
+                await asyncio.gather(*(predictor.predict(np.zeros((1, 12), dtype=np.float32)) for _ in range(n)))
+        finally:
+            await predictor.stop()
+
+    asyncio.run(run())
+
+    stats = predictor.stats.snapshot()
+    assert stats["total_requests"] == 11 and stats["total_batches"] == 2
+    assert stats["batch_size_histogram"] == {8: 1, 3: 1}
+    assert stats["mean_batch_size"] == pytest.approx(5.5)
+    latency = stats["latency_ms"]
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"]
+
+
+def test_forward_error_fails_every_request_in_the_batch(model):
+    def failing(inputs):
+        raise RuntimeError("boom")
+
+    predictor = BatchPredictor(model, max_batch_size=8, max_wait_ms=20, forward_fn=failing)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                *(predictor.predict(np.zeros((1, 12), dtype=np.float32)) for _ in range(3)),
+                return_exceptions=True
+            )
+        finally:
+            await predictor.stop()
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert predictor.stats.snapshot()["total_errors"] == 3
@@ -0,0 +1,113 @@
+import os
+import time
+import warnings
+
+import numpy as np
+import pytest
+import torch
+
+from models.traffic_cnn import TrafficCNN, autoregressive_forecast
+from models.export import (
+    export_onnx, export_torchscript, fold_batchnorm, load_checkpoint, load_inference_model, validate_equivalence
+)
+from models.quantize import predict, quantize_dynamic_model, accuracy_report
+
+HORIZON = 3
+
+
+@pytest.fixture(autouse=True)
+def _quiet_torch_deprecations():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", (FutureWarning, DeprecationWarning))
+        yield
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    torch.manual_seed(0)
+    path = str(tmp_path / "model.pth")
+    torch.save(TrafficCNN(horizon=HORIZON).eval().state_dict(), path)
+    return path
+
+
+def test_torchscript_round_trip_keeps_horizon(checkpoint):
+    model = load_checkpoint(checkpoint)
+    assert model.horizon == HORIZON
+
+    scripted = export_torchscript(model, checkpoint[:-len(".pth")] + ".ts")
+    assert validate_equivalence(model, scripted) < 1e-4
+
+    loaded, runtime = load_inference_model(checkpoint)
+    assert runtime == "torchscript"
+    x = torch.randn(5, 1, 12)
+    with torch.no_grad():
+        assert loaded(x).shape == (5, HORIZON)
+        torch.testing.assert_close(loaded(x), model(x), atol=1e-4, rtol=1e-4)
+
+
+def test_stale_torchscript_is_ignored(checkpoint):
+    export_torchscript(load_checkpoint(checkpoint), checkpoint[:-len(".pth")] + ".ts")
+    later = time.time() + 10
+    os.utime(checkpoint, (later, later))  # 检查点在导出之后被覆盖
+    _, runtime = load_inference_model(checkpoint)
+    assert runtime == "eager"
+
+
+
+def test_folded_batchnorm_matches_eager(checkpoint):
+    model = load_checkpoint(checkpoint)
+    folded = fold_batchnorm(model)
+    assert not any(isinstance(m, torch.nn.BatchNorm1d) for m in folded.modules())
+    assert validate_equivalence(model, folded) < 1e-4
+
+
+def test_onnx_round_trip_and_stale_artifact(checkpoint):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    model = load_checkpoint(checkpoint)
+    export_onnx(model, checkpoint[:-len(".pth")] + ".onnx")
+
+    loaded, runtime = load_inference_model(checkpoint, runtime="onnx")
+    assert runtime == "onnx"
+    assert validate_equivalence(model, loaded) < 1e-4
+
+    later = time.time() + 10
+    os.utime(checkpoint, (later, later))
+    with pytest.raises(ValueError):
+        load_inference_model(checkpoint, runtime="onnx")
+
+
+def test_quantized_predictions_keep_horizon(checkpoint):
+    model = load_checkpoint(checkpoint)
+    quantized = quantize_dynamic_model(model)
+    X = np.random.default_rng(0).standard_normal((40, 1, 12)).astype(np.float32)
+    y = np.random.default_rng(1).standard_normal(40).astype(np.float32)
+
+    assert predict(model, X, batch_size=16).shape == (40, HORIZON)
+    assert predict(quantized, X, batch_size=16).shape == (40, HORIZON)
+
+    report = accuracy_report(model, quantized, X, y, mean=100.0, std=10.0)
+    assert set(report) == {"float32", "int8"}
+    assert np.isfinite(report["int8"]["MAE"])
+
+
+def test_autoregressive_forecast_uses_every_output_step(checkpoint):
+    model = load_checkpoint(checkpoint)
+    x = torch.randn(2, 1, 12)
+    forecast = autoregressive_forecast(model, x, 5)
+    assert forecast.shape == (2, 5)
+    with torch.no_grad():
+        torch.testing.assert_close(forecast[:, :HORIZON], model(x))
+
+
+def test_autoregressive_forecast_matches_manual_rollout(checkpoint):
+    model = load_checkpoint(checkpoint)
+    x = torch.randn(2, 1, 12)
+    window, steps = x.clone(), []
+    with torch.no_grad():
+        while sum(s.shape[1] for s in steps) < 7:
+            out = model(window)
+            steps.append(out)
+            window = torch.cat([window[..., out.shape[1]:], out.unsqueeze(1)], dim=-1)
+    expected = torch.cat(steps, dim=1)[:, :7]
+    torch.testing.assert_close(autoregressive_forecast(model, x, 7), expected)
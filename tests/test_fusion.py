@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+import torch
+
+from models.cnn_model import TrafficCNN, FusionPredictor
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return TrafficCNN(num_classes=2, image_size=(32, 48)).eval()
+
+
+@pytest.fixture
+def inputs():
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, size=(6, 3, 32, 48), dtype=np.uint8)
+    flows = rng.standard_normal((6, 5, 128)).astype(np.float32)
+    return images, flows
+
+
+def reference(model, images, flows):
+    with torch.no_grad():
+        return model(torch.from_numpy(images).float() / 255.0, torch.from_numpy(flows)).numpy()
+
+
+def assert_matches(actual, expected):
+    # 不同批大小的卷积/矩阵乘法内核可能只在最后一位舍入上不同
+    np.testing.assert_allclose(actual, expected, rtol=1e-6, atol=1e-7)
+
+
+def test_matches_forward_without_cache(model, inputs):
+    images, flows = inputs
+    expected = reference(model, images, flows)
+
+    predictor = FusionPredictor(model, max_batch_size=4, cache_size=0)  # 6 个样本分两块计算
+    assert_matches(predictor.predict(images, flows), expected)
+    # 帧键在不缓存时被忽略
+    assert_matches(predictor.predict(images, flows, frame_keys=list(range(6))), expected)
+
+
+def test_matches_forward_with_embedding_cache(model, inputs):
+    images, flows = inputs
+    # 两个摄像头帧各对应 3 次流量更新
+    frame_images = np.stack([images[0]] * 3 + [images[1]] * 3)
+    keys = ["cam0"] * 3 + ["cam1"] * 3
+    expected = reference(model, frame_images, flows)
+
+    predictor = FusionPredictor(model, cache_size=4)
+    first = predictor.predict(frame_images, flows, frame_keys=keys).copy()
+    assert_matches(first, expected)
+    assert (predictor.hits, predictor.misses) == (4, 2)  # 批内同一帧只编码一次
+
+    # 全部命中时不需要图像
+    cached = predictor.predict(None, flows, frame_keys=keys)
+    assert_matches(cached, expected)
+    assert predictor.hits == 10
+
+    with pytest.raises(KeyError):
+        predictor.predict(None, flows[:1], frame_keys=["cam2"])
+
+
+def test_evicted_frames_are_recomputed(model, inputs):
+    images, flows = inputs
+    predictor = FusionPredictor(model, cache_size=2)
+    keys = [f"cam{i}" for i in range(6)]
+    for i in range(6):
+        predictor.predict(images[i:i + 1], flows[i:i + 1], frame_keys=keys[i:i + 1])
+    assert predictor.stats()["entries"] == 2
+
+    with pytest.raises(KeyError):
+        predictor.predict(None, flows[:1], frame_keys=["cam0"])
+    out = np.empty((6, 2), dtype=np.float32)
+    result = predictor.predict(images[4:], flows[4:], frame_keys=keys[4:], out=out)
+    assert result.base is out or np.shares_memory(result, out)
+    assert_matches(result, reference(model, images[4:], flows[4:]))
+
+
+def test_rejects_mismatched_image_size(model, inputs):
+    _, flows = inputs
+    with pytest.raises(ValueError):
+        FusionPredictor(model).predict(np.zeros((1, 3, 64, 64), dtype=np.uint8), flows[:1])
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from utils.data_utils import TrafficDataPreprocessor  # noqa: E402
+from utils.image_pipeline import FrameCache, ImageBatchLoader  # noqa: E402
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    # 100x70 的帧缩放到 64x48 时不会触发缩小解码，结果与直接 cv2.resize 逐像素一致
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"frame_{i}.png")
+        cv2.imwrite(path, rng.integers(0, 256, size=(70, 100, 3), dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+def test_prepare_batch_data_keeps_float_hwc_contract(image_paths):
+    preprocessor = TrafficDataPreprocessor()
+    flows = np.arange(3.0)
+    images, returned_flows = preprocessor.prepare_batch_data(image_paths, flows)
+
+    assert images.shape == (3, 224, 224, 3) and images.dtype == np.float64
+    assert 0.0 <= images.min() and images.max() <= 1.0
+    for image, path in zip(images, image_paths):
+        np.testing.assert_array_equal(image, preprocessor.process_image_data(path))
+    assert returned_flows is flows
+
+
+def test_prepare_image_batch_returns_uint8_nchw(image_paths):
+    images, _ = TrafficDataPreprocessor().prepare_image_batch(image_paths, np.arange(3.0), target_size=(64, 48))
+
+    assert images.shape == (3, 3, 48, 64) and images.dtype == np.uint8
+    for image, path in zip(images, image_paths):
+        expected = cv2.cvtColor(cv2.resize(cv2.imread(path), (64, 48), interpolation=cv2.INTER_AREA),
+                                cv2.COLOR_BGR2RGB)
+        np.testing.assert_array_equal(image, expected.transpose(2, 0, 1))
+
+
+def test_frame_cache_hits_return_the_same_frames(tmp_path, image_paths):
+    cache = FrameCache(str(tmp_path / "cache"), (64, 64), capacity=8)
+    loader = ImageBatchLoader((64, 64), num_threads=2, cache=cache)
+    try:
+        first = loader.load(image_paths).copy()
+        again = loader.load(image_paths)
+    finally:
+        loader.close()
+    np.testing.assert_array_equal(first, again)
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 3
+
+    # 索引写回磁盘后，新的缓存实例直接命中
+    reopened = FrameCache(str(tmp_path / "cache"), (64, 64), capacity=8)
+    out = np.empty((3, 64, 64), dtype=np.uint8)
+    assert reopened.get(FrameCache.key(image_paths[0]), out)
+    np.testing.assert_array_equal(out, first[0])
@@ -0,0 +1,94 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.ingest import IngestQueue, IngestPartialWrite
+from backend.sensor_store import SensorStore
+
+HOUR = 3600
+
+
+def batch(sensor_id, hours, value=1.0):
+    return (np.array([sensor_id] * len(hours)), np.asarray(hours, dtype=np.int64) * HOUR,
+            np.full(len(hours), value, dtype=np.float32))
+
+
+async def submit_all(queue, *batches):
+    try:
+        return await asyncio.gather(*(queue.submit(*b) for b in batches), return_exceptions=True)
+    finally:
+        await queue.stop()
+
+
+def test_chunked_write_of_merged_batches():
+    store = SensorStore(capacity=32)
+    queue = IngestQueue(store, max_write_samples=3)
+    results = asyncio.run(submit_all(queue, batch("a", [0, 2, 4, 6]), batch("b", [1, 3, 5, 7])))
+
+    assert results[0] == results[1] == store.revision
+    assert store.revision == 3  # 8 个样本分 3 块写入
+    for sensor_id in ("a", "b"):
+        assert np.count_nonzero(~np.isnan(store.window(sensor_id)[1])) == 4
+    assert queue.stats.total_requests == 2 and queue.stats.total_samples == 8
+
+
+def test_out_of_order_batch_is_rejected_before_anything_is_written():
+    store = SensorStore(capacity=32)
+    store.append_many(*batch("a", [5]))
+    queue = IngestQueue(store, max_write_samples=1)
+    results = asyncio.run(submit_all(queue, batch("a", [3, 6, 7]), batch("b", [6])))
+
+    assert isinstance(results[0], ValueError)
+    assert results[1] == store.revision
+    assert np.count_nonzero(~np.isnan(store.window("a")[1])) == 1
+    assert store.window("b")[1].tolist() == [1.0]
+
+
+async def write_between_chunks(store, *samples):
+    """在第一块写入后（块之间让出事件循环时）直接写入存储，模拟其他写入方"""
+    while store.revision == 0:
+        await asyncio.sleep(0)
+    store.append_many(*samples)
+
+
+def test_failure_in_a_later_chunk_reports_accepted_rows():
+    store = SensorStore(capacity=32)
+    queue = IngestQueue(store, max_write_samples=2)
+
+    async def scenario():
+        # 按时间排序后: a0 b0 | a1 b1 | c9；第二块之前 b 被写到第 5 小时，第二块乱序失败
+        interfere = asyncio.ensure_future(write_between_chunks(store, *batch("b", [5], value=2.0)))
+        results = await submit_all(queue, batch("a", [0, 1]), batch("b", [0, 1]), batch("c", [9]))
+        await interfere
+        return results
+
+    results = asyncio.run(scenario())
+    for result in results[:2]:
+        assert isinstance(result, IngestPartialWrite)
+        assert (result.accepted, result.total) == (1, 2)
+        assert isinstance(result.__cause__, ValueError)
+        assert result.revision == 1
+    assert isinstance(results[2], ValueError)
+
+    # 第一块已写入且不回滚，失败的块没有写入任何样本
+    assert store.revision == 2
+    assert np.count_nonzero(~np.isnan(store.window("a")[1])) == 1
+    assert "c" not in store
+    assert queue.stats.failed_requests == 3 and queue.stats.total_samples == 2
+
+
+def test_completed_batches_succeed_when_a_later_chunk_fails():
+    store = SensorStore(capacity=32)
+    queue = IngestQueue(store, max_write_samples=2)
+
+    async def scenario():
+        interfere = asyncio.ensure_future(write_between_chunks(store, *batch("b", [9])))
+        results = await submit_all(queue, batch("a", [0, 1]), batch("b", [5, 6]))
+        await interfere
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[0] == 1
+    assert isinstance(results[1], ValueError)
+    assert queue.stats.failed_requests == 1 and queue.stats.total_requests == 1
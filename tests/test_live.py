@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+from backend.live import LiveHub
+from backend.sensor_store import SensorStore
+
+HOUR = 3600
+
+
+async def snapshot_body(sensor_id):
+    return json.dumps({"sensor_id": sensor_id}).encode("utf-8")
+
+
+async def predict_body(sensor_id):
+    return b'{"predicted_value": 1.0}'
+
+
+def make_hub(queue_size=4):
+    store = SensorStore(capacity=32)
+    store.append_many(["a", "b"], [0, 0], [1.0, 2.0])
+    hub = LiveHub(store, predict_body, snapshot_body, queue_size=queue_size)
+    store.add_listener(hub)
+    return store, hub
+
+
+def drain(client):
+    messages = []
+    while not client.queue.empty():
+        messages.append(json.loads(client.queue.get_nowait()))
+    return messages
+
+
+async def wait_for_cycles(hub, cycles):
+    for _ in range(100):
+        if hub.cycles + hub.errors >= cycles:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("发布周期未完成")
+
+
+def test_resubscribe_after_overflow_sends_snapshot():
+    async def scenario():
+        store, hub = make_hub(queue_size=2)
+        hub.start()
+        client = hub.connect()
+        await hub.subscribe(client, ["a", "b"])
+        assert [m["type"] for m in drain(client)] == ["snapshot", "snapshot"]
+
+        # 客户端不读取，连续写入使发送队列溢出
+        for hour in range(1, 4):
+            store.append_many(["a"], [hour * HOUR], [float(hour)])
+            await wait_for_cycles(hub, hour)
+        assert [m["type"] for m in drain(client)] == ["resync"]
+        assert client.subscriptions == set() and hub.stats()["subscribed_sensors"] == 0
+
+        # 溢出后不再收到增量，重新订阅时每个传感器都会再收到快照
+        store.append_many(["a"], [4 * HOUR], [4.0])
+        await asyncio.sleep(0.05)
+        assert drain(client) == []
+
+        await hub.subscribe(client, ["a", "b"])
+        messages = drain(client)
+        assert [(m["type"], m["sensor_id"]) for m in messages] == [("snapshot", "a"), ("snapshot", "b")]
+
+        store.append_many(["a"], [5 * HOUR], [5.0])
+        await wait_for_cycles(hub, 4)
+        delta = drain(client)
+        assert [(m["type"], m["data"]["values"]) for m in delta] == [("delta", [5.0])]
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_publish_cycle_does_not_stop_the_hub(caplog):
+    async def scenario():
+        store, hub = make_hub()
+        original = hub._publish
+        calls = []
+
+        async def flaky_publish(pending):
+            calls.append(len(pending))
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+            await original(pending)
+
+        hub._publish = flaky_publish
+        hub.start()
+        client = hub.connect()
+        await hub.subscribe(client, ["a"])
+        drain(client)
+
+        store.append_many(["a"], [HOUR], [1.0])
+        await wait_for_cycles(hub, 1)
+        assert hub.errors == 1 and not hub._task.done()
+
+        store.append_many(["a"], [2 * HOUR], [2.0])
+        await wait_for_cycles(hub, 2)
+        assert [m["data"]["values"] for m in drain(client)] == [[2.0]]
+        assert hub.stats()["publish_errors"] == 1
+        await hub.stop()
+
+    asyncio.run(scenario())
+    assert "boom" in caplog.text
+
+
+def test_done_callback_reports_unexpected_exit():
+    async def scenario():
+        _, hub = make_hub()
+        finished = []
+        hub.start(done_callback=finished.append)
+        hub.start(done_callback=finished.append)  # 任务已存在时不重复注册
+        await hub.stop()
+        return finished
+
+    finished = asyncio.run(scenario())
+    assert len(finished) == 1 and finished[0].cancelled()
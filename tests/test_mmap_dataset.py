@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from utils.mmap_dataset import MmapWindowDataset, write_series, load_meta, open_values
+from utils.windowing import sliding_windows
+from models.train import build_mmap_datasets
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    n_steps = 200
+    values = rng.normal(100.0, 20.0, size=(3, n_steps))
+    values[:, 160:] += 500.0  # 测试期的数据分布明显不同
+    timestamps = np.arange(n_steps, dtype=np.int64) * 300
+    return values, timestamps
+
+
+def test_normalization_fitted_on_training_prefix_only(tmp_path, series):
+    values, timestamps = series
+    meta = write_series(str(tmp_path), values, timestamps, chunk_steps=64, fit_steps=160)
+
+    prefix = values[:, :160]
+    assert meta['fit_steps'] == 160
+    assert meta['mean'] == pytest.approx(prefix.mean())
+    assert meta['std'] == pytest.approx(prefix.std())
+    assert meta['mean'] < values.mean()
+
+    stored = np.asarray(open_values(str(tmp_path)))
+    np.testing.assert_allclose(stored, (values - meta['mean']) / meta['std'], rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("sequence_length, horizon, stride", [(12, 1, 1), (12, 3, 1), (8, 2, 5)])
+def test_windows_match_in_memory_path(tmp_path, series, sequence_length, horizon, stride):
+    values, timestamps = series
+    meta = write_series(str(tmp_path), values, timestamps)
+    normalized = ((values - meta['mean']) / meta['std']).astype(np.float32)
+
+    dataset = MmapWindowDataset(str(tmp_path), sequence_length, horizon=horizon, stride=stride,
+                                start=20, stop=150)
+    expected = [sliding_windows(row[20:150], sequence_length, horizon, stride) for row in normalized]
+    assert len(dataset) == sum(len(X) for X, _ in expected)
+
+    for idx in range(len(dataset)):
+        x, y = dataset[idx]
+        sensor, window = divmod(idx, dataset.windows_per_sensor)
+        X_ref, y_ref = expected[sensor]
+        assert x.shape == (1, sequence_length)
+        np.testing.assert_array_equal(x.numpy()[0], X_ref[window])
+        np.testing.assert_array_equal(y.numpy(), np.atleast_1d(y_ref[window]))
+
+
+def test_train_and_validation_targets_split_in_time(tmp_path, series):
+    values, timestamps = series
+    write_series(str(tmp_path), values[:1], timestamps, fit_steps=160)
+    train_dataset, val_dataset, norm_state = build_mmap_datasets(str(tmp_path), sequence_length=12)
+
+    split = int(load_meta(str(tmp_path))['n_steps'] * 0.8)
+    train_targets = [train_dataset.locate(i)[1] + 12 for i in range(len(train_dataset))]
+    val_targets = [val_dataset.locate(i)[1] + 12 for i in range(len(val_dataset))]
+    assert max(train_targets) < split <= min(val_targets)
+    assert len(train_dataset) + len(val_dataset) == 200 - 12
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch
+
+from backend.model_registry import LoadedModel, ModelRegistry, model_memory
+from models.export import load_checkpoint
+from models.traffic_cnn import TrafficCNN
+
+
+class FakeLoader:
+    """记录加载次数的加载函数，每个检查点占用 nbytes 字节"""
+
+    def __init__(self, nbytes=100, delay=0.0):
+        self.nbytes = nbytes
+        self.delay = delay
+        self.calls = []
+        self.fail = set()
+
+    def __call__(self, path):
+        self.calls.append(os.path.basename(path))
+        time.sleep(self.delay)
+        if os.path.basename(path) in self.fail:
+            raise RuntimeError(f"cannot load {path}")
+        return LoadedModel(path, lambda x: x * 2, "eager", None, self.nbytes)
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path):
+    for name in ("a.pth", "b.pth", "c.pth", "new.pth"):
+        (tmp_path / name).write_bytes(b"")
+    return tmp_path
+
+
+def make_registry(checkpoint_dir, loader, max_bytes=250, **models):
+    return ModelRegistry({"a": "a.pth", "b": "b.pth", "c": "c.pth", **models},
+                         {"sensor_1": "a", "sensor_2": "a", "sensor_3": "b"},
+                         checkpoint_dir=str(checkpoint_dir), max_bytes=max_bytes, loader=loader)
+
+
+def test_lru_eviction_by_bytes(checkpoint_dir):
+    loader = FakeLoader(nbytes=100)
+    registry = make_registry(checkpoint_dir, loader)
+
+    registry.get("a")
+    registry.get("b")
+    assert registry.cached("a") is not None  # a 成为最近使用
+    registry.get("c")                        # 超过 250 字节，淘汰最久未使用的 b
+
+    assert registry.cached("b") is None
+    assert registry.cached("a") is not None and registry.cached("c") is not None
+    assert registry.loaded_bytes == 200 and registry.evictions == 1
+
+    registry.get("b")
+    assert loader.calls == ["a.pth", "b.pth", "c.pth", "b.pth"]
+
+    # 单个模型超过上限时仍保留一个
+    small = make_registry(checkpoint_dir, FakeLoader(nbytes=1000), max_bytes=10)
+    small.get("a")
+    small.get("b")
+    assert small.loaded_models == 1 and small.cached("b") is not None
+
+
+def test_concurrent_gets_share_one_load(checkpoint_dir):
+    loader = FakeLoader(delay=0.05)
+    registry = make_registry(checkpoint_dir, loader)
+    entries = []
+    threads = [threading.Thread(target=lambda: entries.append(registry.get("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loader.calls == ["a.pth"]
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_swap_loads_first_and_bumps_revisions(checkpoint_dir):
+    loader = FakeLoader()
+    registry = make_registry(checkpoint_dir, loader, alias="a.pth")  # 另一个模型键共享 a.pth
+    old = registry.get("a")
+
+    entry = registry.swap("a", "new.pth")
+    assert entry.path.endswith("new.pth") and registry.get("a") is entry
+    assert old is not entry  # 已经拿到旧模型的请求不受影响
+    assert registry.revision("sensor_1") == registry.revision("sensor_2") == 1
+    assert registry.revision("sensor_3") == 0
+
+    # 覆盖同一路径的检查点：强制重新加载，共享该路径的模型键都失效
+    registry.swap("alias", "new.pth")
+    assert loader.calls.count("new.pth") == 2
+    assert registry.revision("sensor_1") == 2 and registry.revision("alias") == 1
+
+    # 加载失败或路径非法时映射保持不变
+    loader.fail.add("c.pth")
+    with pytest.raises(RuntimeError):
+        registry.swap("a", "c.pth")
+    assert registry.get("a") is registry.cached("a") and registry.get("a").path.endswith("new.pth")
+    with pytest.raises(ValueError):
+        registry.swap("a", "../outside.pth")
+    with pytest.raises(ValueError):
+        registry.swap("a", "missing.pth")
+    assert registry.swaps == 2
+
+
+def test_run_counters_are_exact_under_concurrency():
+    entry = LoadedModel("x.pth", lambda x: x + 1, "eager", None, 0)
+    inputs = np.zeros((3, 1, 12), dtype=np.float32)
+
+    def worker():
+        for _ in range(200):
+            entry.run(inputs)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert entry.to_dict()["batches"] == 800 and entry.to_dict()["samples"] == 2400
+
+
+def test_model_memory_separates_mmap_weights(tmp_path):
+    torch.manual_seed(0)
+    model = TrafficCNN(horizon=2).eval()
+    path = str(tmp_path / "model.pth")
+    torch.save(model.state_dict(), path)
+    total = sum(t.numel() * t.element_size() for t in model.state_dict().values())
+
+    assert model_memory(model, path) == (total, 0)
+
+    mapped_model = load_checkpoint(path)
+    resident, mapped = model_memory(mapped_model, path)
+    assert resident + mapped == total
+    if os.path.exists("/proc/self/maps"):
+        assert mapped == total and resident == 0
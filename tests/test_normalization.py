@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from utils.normalization import NormalizationState
+
+
+def test_training_state_matches_serving_sensor_ids(tmp_path):
+    from models.train import build_memory_datasets, DEFAULT_SENSOR_ID
+
+    _, _, state = build_memory_datasets(per_hour=True)
+    path = str(tmp_path / "model.norm.json")
+    state.save(path)
+    served = NormalizationState.load(path)
+
+    timestamps = np.arange(24) * 3600
+    mean, std = served.parameters(DEFAULT_SENSOR_ID, timestamps)
+    row = served.sensor_ids.index(DEFAULT_SENSOR_ID)
+    np.testing.assert_allclose(mean, served.mean[row])
+    np.testing.assert_allclose(std, served.std[row])
+    # 按小时的参数确实不同，而不是回退到全局参数
+    assert np.ptp(mean) > 0
+
+    # 其他服务端传感器使用同一条训练序列的参数
+    other_mean, _ = served.parameters("sensor_5", timestamps)
+    np.testing.assert_allclose(other_mean, mean)
+    many_mean, _ = served.parameters_many([DEFAULT_SENSOR_ID, "sensor_5"], timestamps)
+    np.testing.assert_allclose(many_mean, np.vstack([mean, mean]))
+
+
+def test_transform_round_trip_per_hour():
+    rng = np.random.default_rng(0)
+    timestamps = np.arange(96) * 3600
+    values = 100 + 50 * np.sin(np.arange(96) / 24 * 2 * np.pi) + rng.normal(0, 5, (2, 96))
+    state = NormalizationState.fit(values, timestamps, sensor_ids=["a", "b"], per_hour=True)
+
+    normalized = state.transform_many(values, ["a", "b"], timestamps)
+    np.testing.assert_allclose(state.inverse_transform_many(normalized, ["a", "b"], timestamps), values)
+    np.testing.assert_allclose(state.transform(values[1], "b", timestamps), normalized[1])
+
+
+def test_unknown_sensor_with_per_hour_state_raises():
+    timestamps = np.arange(48) * 3600
+    state = NormalizationState.fit(np.random.rand(1, 48), timestamps, sensor_ids=["a"], per_hour=True)
+    with pytest.raises(KeyError):
+        state.parameters("sensor_0", timestamps)
+
+    # 不按小时时未知传感器仍使用全局参数
+    flat = NormalizationState.fit(np.random.rand(1, 48), sensor_ids=["a"])
+    assert flat.parameters("sensor_0") == (flat.global_mean, flat.global_std)
+    assert not state.supports("sensor_0") and state.supports("a")
+    assert flat.supports("sensor_0")
+
+    fallback = NormalizationState.fit(np.random.rand(1, 48), timestamps, sensor_ids=["a"],
+                                      per_hour=True, default_sensor="a")
+    assert fallback.supports("sensor_0")
+    np.testing.assert_allclose(fallback.parameters("sensor_0", timestamps)[0],
+                               fallback.parameters("a", timestamps)[0])
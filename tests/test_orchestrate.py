@@ -0,0 +1,92 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from models.orchestrate import STATE_FILE, SUMMARY_FILE, SweepState, main, partition_threads
+from utils.mmap_dataset import write_series
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    n_steps = 120
+    values = 100.0 + 20.0 * np.sin(np.arange(n_steps) / 6.0) + rng.normal(0.0, 2.0, size=(2, n_steps))
+    path = str(tmp_path / "data")
+    write_series(path, values, np.arange(n_steps, dtype=np.int64) * 300, sensor_ids=["sensor_0", "sensor_1"],
+                 fit_steps=96)
+    return path
+
+
+def run(data_dir, output_dir, *extra):
+    # 两个学习率 -> 两个任务，单进程单线程，每个任务只训练 1 个 epoch
+    main([data_dir, output_dir, "--lr", "0.001,0.01", "--epochs", "1", "--batch-size", "16",
+          "--workers", "1", "--threads-per-job", "1", *extra])
+
+
+def load_state(output_dir, key="jobs"):
+    with open(os.path.join(output_dir, STATE_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)[key]
+
+
+def test_partition_threads():
+    assert partition_threads(10, cpu_count=8) == (8, 1)
+    assert partition_threads(10, threads_per_job=2, cpu_count=8) == (4, 2)
+    assert partition_threads(10, workers=3, cpu_count=8) == (3, 2)
+    assert partition_threads(2, threads_per_job=1, cpu_count=8) == (2, 1)  # 进程数不超过任务数
+    assert partition_threads(4, threads_per_job=16, cpu_count=8) == (1, 16)
+
+
+def test_sweep_resumes_from_state_file(data_dir, tmp_path, capsys):
+    output_dir = str(tmp_path / "sweep")
+    run(data_dir, output_dir)
+
+    jobs = load_state(output_dir)
+    assert sorted(jobs) == ["all-seq12-bs16-lr0.001", "all-seq12-bs16-lr0.01"]
+    assert all(entry["status"] == "done" for entry in jobs.values())
+    assert os.path.exists(os.path.join(output_dir, SUMMARY_FILE))
+    capsys.readouterr()
+
+    # 全部完成时重新运行不训练任何任务
+    run(data_dir, output_dir)
+    assert "Resuming: 2 of 2 jobs already done" in capsys.readouterr().out
+    assert load_state(output_dir) == jobs
+
+    # 失败（或中断）的任务重新训练
+    state = SweepState(output_dir, load_state(output_dir, "config"))
+    state.record("all-seq12-bs16-lr0.001", "failed", error="interrupted")
+    run(data_dir, output_dir)
+    out = capsys.readouterr().out
+    assert "Resuming: 1 of 2 jobs already done" in out
+    assert "Trained 1 jobs" in out
+    resumed = load_state(output_dir)
+    assert resumed["all-seq12-bs16-lr0.001"]["status"] == "done"
+    assert resumed["all-seq12-bs16-lr0.01"] == jobs["all-seq12-bs16-lr0.01"]
+
+
+def test_jobs_with_missing_checkpoint_are_retrained(data_dir, tmp_path, capsys):
+    output_dir = str(tmp_path / "sweep")
+    run(data_dir, output_dir)
+    done = load_state(output_dir)
+    os.remove(done["all-seq12-bs16-lr0.01"]["result"]["checkpoint"])
+    capsys.readouterr()
+
+    run(data_dir, output_dir)
+    out = capsys.readouterr().out
+    assert "Resuming: 1 of 2 jobs already done" in out
+    assert "Trained 1 jobs" in out
+    resumed = load_state(output_dir)
+    # 已完成的任务未被重新训练
+    assert resumed["all-seq12-bs16-lr0.001"] == done["all-seq12-bs16-lr0.001"]
+    assert resumed["all-seq12-bs16-lr0.01"]["updated_at"] > done["all-seq12-bs16-lr0.01"]["updated_at"]
+
+
+def test_state_rejects_different_config(data_dir, tmp_path):
+    output_dir = str(tmp_path / "sweep")
+    run(data_dir, output_dir)
+    with pytest.raises(ValueError):
+        run(data_dir, output_dir, "--epochs", "2")
+    # --restart 丢弃旧的进度文件
+    run(data_dir, output_dir, "--epochs", "2", "--restart")
+    assert all(entry["status"] == "done" for entry in load_state(output_dir).values())
@@ -0,0 +1,63 @@
+import asyncio
+
+from backend.response_cache import ResponseCache
+
+
+def test_data_version_is_part_of_the_key():
+    async def run():
+        cache = ResponseCache(max_entries=8)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"n": len(calls)}
+
+        first = await cache.get_or_compute(("stats", "a", 1), compute)
+        again = await cache.get_or_compute(("stats", "a", 1), compute)
+        bumped = await cache.get_or_compute(("stats", "a", 2), compute)
+        return first, again, bumped, calls
+
+    first, again, bumped, calls = asyncio.run(run())
+    assert first is again and first.etag == again.etag
+    assert bumped.etag != first.etag
+    assert len(calls) == 2
+
+
+def test_result_is_not_stored_when_version_changes_during_compute():
+    async def run():
+        cache = ResponseCache(max_entries=8)
+        version = [1]
+
+        async def compute():
+            await asyncio.sleep(0)
+            version[0] += 1  # 计算期间有新数据写入
+            return {"v": version[0]}
+
+        entry = await cache.get_or_compute(("k", 1), compute, current_key=lambda: ("k", version[0]))
+        return cache, entry
+
+    cache, entry = asyncio.run(run())
+    assert entry.body == b'{"v":2}'
+    assert len(cache) == 0
+
+
+def test_waiters_recompute_when_leader_is_cancelled():
+    async def run():
+        cache = ResponseCache(max_entries=8)
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return {"ok": True}
+
+        leader = asyncio.create_task(cache.get_or_compute("k", compute))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return leader, await waiter
+
+    leader, entry = asyncio.run(run())
+    assert leader.cancelled()
+    assert entry.body == b'{"ok":true}'
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.sensor_store import SensorStore
+from backend.rolling_stats import RollingStatistics
+
+SENSORS = ["a", "b", "c"]
+
+
+def reference(store, sensor_id):
+    """直接用 pandas 对保留窗口做全量计算"""
+    timestamps, values = store.window(sensor_id)
+    frame = pd.DataFrame({"ts": pd.to_datetime(timestamps, unit="s"), "value": values.astype(np.float64)})
+    frame = frame.dropna()
+    frame["day_type"] = (frame["ts"].dt.dayofweek >= 5).astype(int)
+    frame["hour"] = frame["ts"].dt.hour
+    return frame
+
+
+def assert_matches(stats, store, sensor_id):
+    frame = reference(store, sensor_id)
+    summary = stats.summary(sensor_id)
+    assert summary["count"] == len(frame)
+    if len(frame):
+        assert summary["mean"] == pytest.approx(frame["value"].mean(), rel=1e-9)
+        assert summary["max"] == frame["value"].max()
+        assert summary["min"] == frame["value"].min()
+    if len(frame) > 1:
+        assert summary["std"] == pytest.approx(frame["value"].std(ddof=1), rel=1e-6)
+
+    expected = frame.groupby(["day_type", "hour"])["value"].mean()
+    for (day_type, hour), value in expected.items():
+        assert stats.group_mean(sensor_id, [day_type], [hour]) == pytest.approx(value, rel=1e-9)
+    if len(frame):
+        weekday = frame.loc[frame["day_type"] == 0, "value"]
+        if len(weekday):
+            assert stats.group_mean(sensor_id, [0]) == pytest.approx(weekday.mean(), rel=1e-9)
+
+
+def test_incremental_statistics_match_full_recompute():
+    rng = np.random.default_rng(0)
+    store = SensorStore(capacity=48, initial_sensors=1)
+    stats = RollingStatistics(store)
+
+    # 500 个小时，跨越多次环形缓冲回绕；每个时间点随机缺少部分传感器，偶尔重写最新时间点
+    for tick in range(500):
+        ts = 1_700_000_000 + tick * 3600
+        reporting = [s for s in SENSORS if rng.random() < 0.7]
+        if not reporting:
+            continue
+        values = rng.normal(1000, 300, len(reporting)).round(1)
+        if rng.random() < 0.1:
+            values[0] = np.nan  # 显式上报的缺失值
+        store.append_many(reporting, [ts] * len(reporting), values)
+        if rng.random() < 0.2:
+            store.append_many(reporting[:1], [ts], rng.normal(1000, 300, 1).round(1))
+        if tick % 37 == 0:
+            for sensor_id in SENSORS:
+                if sensor_id in store:
+                    assert_matches(stats, store, sensor_id)
+
+    for sensor_id in SENSORS:
+        assert_matches(stats, store, sensor_id)
+
+    # 与从存储重新构建的统计量一致
+    rebuilt = RollingStatistics(store)
+    for sensor_id in SENSORS:
+        incremental, full = stats.summary(sensor_id), rebuilt.summary(sensor_id)
+        assert incremental["count"] == full["count"]
+        for key in ("mean", "std", "max", "min"):
+            assert incremental[key] == pytest.approx(full[key], rel=1e-9)
+
+
+def test_sensor_without_samples_in_window_reports_nan():
+    store = SensorStore(capacity=4, initial_sensors=2)
+    stats = RollingStatistics(store)
+    store.append_many(["a", "b"], [0, 0], [1.0, 2.0])
+    store.append_many(["b"] * 4, [60, 120, 180, 240], [3.0, 4.0, 5.0, 6.0])
+
+    summary = stats.summary("a")
+    assert summary["count"] == 0
+    assert np.isnan(summary["mean"]) and np.isnan(summary["max"]) and np.isnan(summary["min"])
+    assert stats.summary("b")["min"] == 3.0
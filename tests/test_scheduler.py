@@ -0,0 +1,88 @@
+import asyncio
+
+import numpy as np
+
+from backend.scheduler import PredictionScheduler
+from backend.sensor_store import SensorStore
+from utils.normalization import NormalizationState
+
+SEQUENCE_LENGTH = 12
+HOUR = 3600
+
+
+def last_value_forward(x):
+    """把窗口最后一个值作为下一步的预测"""
+    return x[:, 0, -1:]
+
+
+def fill_store(sensor_ids, steps=24):
+    store = SensorStore(capacity=48)
+    timestamps = np.arange(steps) * HOUR
+    for i, sensor_id in enumerate(sensor_ids):
+        store.append_many([sensor_id] * steps, timestamps, np.full(steps, 10.0 * (i + 1)))
+    return store
+
+
+def test_sensors_without_normalization_are_skipped():
+    store = fill_store(["a", "b", "c"])
+    timestamps = np.arange(48) * HOUR
+    # 按小时归一化且只有 a、b 的参数：c 无法归一化，但不能让整个周期失败
+    normalizer = NormalizationState.fit(np.array([[10.0] * 48, [20.0] * 48]), timestamps,
+                                        sensor_ids=["a", "b"], per_hour=True)
+    scheduler = PredictionScheduler(store, normalizer, last_value_forward, horizon=3)
+
+    asyncio.run(scheduler.run_cycle())
+
+    assert scheduler.cycles == 1
+    assert scheduler.last_cycle_sensors == 2 and scheduler.last_cycle_skipped == 1
+    np.testing.assert_allclose(scheduler.lookup("a", 3).values, 10.0)
+    np.testing.assert_allclose(scheduler.lookup("b", 3).values, 20.0)
+    assert scheduler.lookup("c") is None
+
+
+def flat_normalizer(sensor_ids):
+    return NormalizationState.fit(np.zeros((len(sensor_ids), 1)), sensor_ids=sensor_ids)
+
+
+def test_lookup_misses_until_the_cycle_catches_up():
+    store = fill_store(["a"])
+    scheduler = PredictionScheduler(store, flat_normalizer(["a"]), last_value_forward, horizon=4)
+    asyncio.run(scheduler.run_cycle())
+
+    entry = scheduler.lookup("a", 2)
+    assert entry.values.tolist() == [10.0, 10.0]
+    assert entry.timestamps.tolist() == [24 * HOUR, 25 * HOUR]
+    assert scheduler.lookup("a", 5) is None  # 超过预计算的步数
+
+    store.append_many(["a"], [24 * HOUR], [30.0])
+    assert scheduler.lookup("a") is None  # 数据版本已变化
+    assert scheduler.stats()["stale_sensors"] == 1
+
+
+def test_writes_trigger_a_refresh():
+    async def scenario():
+        store = fill_store(["a", "b"])
+        scheduler = PredictionScheduler(store, flat_normalizer(["a", "b"]), last_value_forward,
+                                        horizon=3, min_interval_ms=0)
+        store.add_listener(scheduler)
+        scheduler.start()
+
+        async def wait_for(condition):
+            for _ in range(200):
+                if condition():
+                    return
+                await asyncio.sleep(0.005)
+            raise AssertionError("调度器未刷新")
+
+        await wait_for(lambda: scheduler.cycles >= 1)
+        assert scheduler.lookup("a").values.tolist() == [10.0]
+
+        store.append_many(["a", "b"], [24 * HOUR] * 2, [42.0, 7.0])
+        await wait_for(lambda: scheduler.lookup("a") is not None and scheduler.lookup("b") is not None)
+        assert scheduler.lookup("a", 3).values.tolist() == [42.0] * 3
+        assert scheduler.lookup("b").timestamps.tolist() == [25 * HOUR]
+        assert scheduler.stats()["stale_sensors"] == 0
+        assert scheduler.last_data_revision == store.revision
+        await scheduler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import torch
+
+from models.traffic_cnn import TrafficCNN
+from models.export import load_checkpoint
+from models.score import main
+from utils.mmap_dataset import write_series, load_meta
+from utils.windowing import sliding_windows
+
+
+@pytest.fixture
+def scoring_inputs(tmp_path):
+    torch.manual_seed(0)
+    checkpoint = str(tmp_path / "model.pth")
+    torch.save(TrafficCNN(horizon=2).eval().state_dict(), checkpoint)
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(100.0, 20.0, size=(3, 90))
+    timestamps = np.arange(90, dtype=np.int64) * 300
+    data_dir = str(tmp_path / "data")
+    write_series(data_dir, values, timestamps)
+    return checkpoint, data_dir
+
+
+def expected_predictions(checkpoint, data_dir, stride):
+    meta = load_meta(data_dir)
+    normalized = np.fromfile(f"{data_dir}/values.f32", dtype=np.float32).reshape(meta["n_sensors"], -1)
+    model = load_checkpoint(checkpoint)
+    rows = []
+    for row in normalized:
+        X, _ = sliding_windows(row, 12, stride=stride, copy=True)
+        with torch.no_grad():
+            rows.append(model(torch.from_numpy(X).unsqueeze(1)).numpy())
+    return np.stack(rows) * meta["std"] + meta["mean"]
+
+
+@pytest.mark.parametrize("stride", [1, 4])
+def test_npy_output_round_trips(tmp_path, scoring_inputs, stride):
+    checkpoint, data_dir = scoring_inputs
+    output = str(tmp_path / "predictions.npy")
+    # 块和批次都小于窗口数，覆盖分块读取与分批前向计算
+    main([checkpoint, data_dir, output, "--runtime", "eager", "--batch-size", "7",
+          "--chunk-windows", "10", "--stride", str(stride)])
+
+    predictions = np.load(output)
+    expected = expected_predictions(checkpoint, data_dir, stride)
+    assert predictions.shape == expected.shape == (3, (90 - 12 - 1) // stride + 1, 2)
+    np.testing.assert_allclose(predictions, expected, rtol=1e-5, atol=1e-4)
+
+
+def test_parquet_output_round_trips(tmp_path, scoring_inputs):
+    pq = pytest.importorskip("pyarrow.parquet")
+    checkpoint, data_dir = scoring_inputs
+    output = str(tmp_path / "predictions.parquet")
+    main([checkpoint, data_dir, output, "--runtime", "eager", "--chunk-windows", "10"])
+
+    table = pq.read_table(output).to_pandas()
+    expected = expected_predictions(checkpoint, data_dir, 1)
+    assert list(table.columns) == ["sensor_id", "timestamp", "prediction_1", "prediction_2"]
+    assert len(table) == expected.shape[0] * expected.shape[1]
+    np.testing.assert_allclose(table[["prediction_1", "prediction_2"]].to_numpy(),
+                               expected.reshape(-1, 2), rtol=1e-5, atol=1e-4)
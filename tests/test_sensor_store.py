@@ -0,0 +1,59 @@
+import numpy as np
+
+from backend.sensor_store import SensorStore
+
+
+def test_wraparound_keeps_latest_window_contiguous():
+    store = SensorStore(capacity=5, initial_sensors=1)
+    for start in range(0, 12, 3):
+        ts = np.arange(start, start + 3) * 60
+        store.append_many(["a"] * 3, ts, np.arange(start, start + 3, dtype=np.float32))
+
+    timestamps, values = store.window("a")
+    np.testing.assert_array_equal(timestamps, np.arange(7, 12) * 60)
+    np.testing.assert_array_equal(values, np.arange(7, 12))
+    assert not values.flags.writeable
+    assert store.head == 12 and store.length("a") == 5
+    np.testing.assert_array_equal(store.window("a", 3)[1], [9, 10, 11])
+
+
+def test_mixed_sensor_writes_leave_gaps_as_nan():
+    store = SensorStore(capacity=4, initial_sensors=1)
+    store.append_many(["a"] * 4, [0, 60, 120, 180], [1, 2, 3, 4])
+    store.append_many(["b"], [240], [10])
+
+    # 共享时钟前进后，a 在新时间槽上没有样本；b 在开辟之前的时间槽上也没有样本
+    timestamps, values = store.latest_windows(["a", "b"], 2)
+    np.testing.assert_array_equal(timestamps, [180, 240])
+    assert values[0, 0] == 4 and np.isnan(values[0, 1])
+    assert np.isnan(values[1, 0]) and values[1, 1] == 10
+
+    # 复用的位置被清空，不会残留被淘汰的旧样本
+    store.append_many(["b"] * 3, [300, 360, 420], [11, 12, 13])
+    timestamps, values = store.window("a")
+    np.testing.assert_array_equal(timestamps, [240, 300, 360, 420])
+    assert np.isnan(values).all()
+    np.testing.assert_array_equal(store.window("b")[1], [10, 11, 12, 13])
+
+
+def test_rows_grow_beyond_initial_allocation():
+    store = SensorStore(capacity=3, initial_sensors=1)
+    ids = [f"s{i}" for i in range(5)]
+    store.append_many(ids, [0] * 5, np.arange(5))
+    assert store.n_rows >= 5
+    assert [store.sensor_id(store.row(s)) for s in ids] == ids
+    np.testing.assert_array_equal(store.latest_windows(ids, 1)[1][:, 0], np.arange(5))
+
+
+def test_data_version_changes_on_write_and_clock_advance():
+    store = SensorStore(capacity=4, initial_sensors=2)
+    store.append_many(["a", "b"], [0, 0], [1, 1])
+    version_a, version_b = store.data_version("a"), store.data_version("b")
+
+    store.append_many(["a"], [0], [2])
+    assert store.data_version("a") != version_a
+    assert store.data_version("b") == version_b
+
+    # 新时间槽会淘汰旧样本，所有传感器的版本都变化
+    store.append_many(["a"], [60], [3])
+    assert store.data_version("b") != version_b
@@ -0,0 +1,50 @@
+import numpy as np
+import torch
+
+from backend.serving import ServingConfig, ModelPool
+from models.traffic_cnn import TrafficCNN
+
+
+def make_pool(replicas=3):
+    torch.manual_seed(0)
+    model = TrafficCNN(horizon=2)
+    model.train()  # 副本池负责切换到 eval，否则 Dropout 会让输出不一致
+    return model, ModelPool(model, replicas=replicas)
+
+
+def test_replicas_give_identical_outputs():
+    model, pool = make_pool()
+    try:
+        inputs = np.random.default_rng(0).standard_normal((8, 1, 12)).astype(np.float32)
+        with torch.no_grad():
+            expected = model(torch.from_numpy(inputs)).numpy()
+
+        for replica in pool.models:
+            assert not replica.training
+            with torch.no_grad():
+                np.testing.assert_array_equal(replica(torch.from_numpy(inputs)).numpy(), expected)
+
+        # 副本是独立的参数副本，而不是共享同一个模块
+        params = [next(replica.parameters()) for replica in pool.models]
+        assert len({p.data_ptr() for p in params}) == pool.size
+
+        futures = [pool.executor.submit(pool.run, inputs) for _ in range(24)]
+        for future in futures:
+            np.testing.assert_array_equal(future.result(), expected)
+
+        stats = pool.utilization()
+        assert sum(s["batches"] for s in stats) == 24
+        assert sum(s["samples"] for s in stats) == 24 * len(inputs)
+    finally:
+        pool.shutdown()
+
+
+def test_serving_config_splits_cores_between_workers():
+    config = ServingConfig(workers=2, intra_op_threads=2, cpu_count=8)
+    assert config.replicas == 2
+
+    config = ServingConfig(workers=4, intra_op_threads=4, cpu_count=8)
+    assert config.replicas == 1
+
+    config = ServingConfig(workers=1, intra_op_threads=1, replicas=3, cpu_count=8)
+    assert config.replicas == 3
@@ -0,0 +1,50 @@
+import numpy as np
+
+from utils.synthetic import SyntheticTrafficGenerator, PATTERN_SINE
+from utils.mmap_dataset import open_values, open_timestamps
+
+END = "2024-01-07T23:00:00"
+
+
+def test_shape_and_time_axis():
+    generator = SyntheticTrafficGenerator.random_profiles(5, seed=0)
+    timestamps, values = generator.generate(48, end_time=END)
+
+    assert values.shape == (5, 48) and values.dtype == np.float64
+    assert timestamps.dtype == np.dtype("datetime64[s]")
+    assert timestamps[-1] == np.datetime64(END)
+    assert (np.diff(timestamps).astype(np.int64) == 3600).all()
+    assert (values >= 0).all()
+    # 每个传感器的参数不同
+    assert len({round(float(v), 6) for v in values.mean(axis=1)}) == 5
+
+
+def test_same_seed_reproduces_and_different_seed_differs():
+    _, first = SyntheticTrafficGenerator.random_profiles(3, seed=1).generate(100, end_time=END)
+    _, again = SyntheticTrafficGenerator.random_profiles(3, seed=1).generate(100, end_time=END)
+    _, other = SyntheticTrafficGenerator.random_profiles(3, seed=2).generate(100, end_time=END)
+    np.testing.assert_array_equal(first, again)
+    assert not np.allclose(first, other)
+
+    # seed 为 None 时受 np.random.seed 控制
+    np.random.seed(3)
+    _, global_first = SyntheticTrafficGenerator(pattern=PATTERN_SINE).generate(50, end_time=END)
+    np.random.seed(3)
+    _, global_again = SyntheticTrafficGenerator(pattern=PATTERN_SINE).generate(50, end_time=END)
+    np.testing.assert_array_equal(global_first, global_again)
+
+
+def test_chunked_generation_matches_single_pass(tmp_path):
+    _, expected = SyntheticTrafficGenerator(n_sensors=2, seed=4).generate(100, end_time=END)
+    chunks = list(SyntheticTrafficGenerator(n_sensors=2, seed=4).iter_chunks(100, end_time=END, chunk_steps=30))
+    assert [start for start, _, _ in chunks] == [0, 30, 60, 90]
+    np.testing.assert_allclose(np.concatenate([values for _, _, values in chunks], axis=1), expected)
+
+    meta = SyntheticTrafficGenerator(n_sensors=2, seed=4).write(
+        str(tmp_path), 100, end_time=END, chunk_steps=30, fit_steps=80
+    )
+    np.testing.assert_allclose(meta["mean"], expected[:, :80].mean())
+    np.testing.assert_allclose(meta["std"], expected[:, :80].std())
+    np.testing.assert_allclose(np.asarray(open_values(str(tmp_path))),
+                               (expected - meta["mean"]) / meta["std"], rtol=1e-5, atol=1e-5)
+    assert open_timestamps(str(tmp_path))[-1] == np.datetime64(END).astype(np.int64)
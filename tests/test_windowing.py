@@ -0,0 +1,109 @@
+import warnings
+
+import numpy as np
+import pytest
+import torch
+
+from utils.windowing import (
+    sliding_windows, multi_sensor_windows, torch_sliding_windows, iter_window_batches, num_windows
+)
+from utils.data_utils import TrafficDataPreprocessor
+from utils.data_processor import DataProcessor
+from models.traffic_cnn import create_sequences
+
+CASES = [
+    # (n_steps, sequence_length, horizon, stride)
+    (50, 12, 1, 1),
+    (50, 12, 3, 1),
+    (50, 5, 1, 4),
+    (50, 7, 4, 3),
+    (13, 12, 1, 1),   # 恰好一个窗口
+    (12, 12, 1, 1),   # n < sequence_length + horizon
+    (5, 12, 2, 1),
+]
+
+
+def loop_windows(data, sequence_length, horizon=1, stride=1):
+    """原来的逐窗口 Python 循环（推广到 horizon 与 stride）"""
+    X, y = [], []
+    for i in range(0, len(data) - sequence_length - horizon + 1, stride):
+        X.append(data[i:i + sequence_length])
+        y.append(data[i + sequence_length] if horizon == 1 else data[i + sequence_length:i + sequence_length + horizon])
+    X = np.array(X).reshape((len(X), sequence_length) + data.shape[1:])
+    y = np.array(y).reshape((len(y),) + ((horizon,) if horizon > 1 else ()) + data.shape[1:])
+    return X, y
+
+
+@pytest.mark.parametrize("n_steps, sequence_length, horizon, stride", CASES)
+def test_sliding_windows_match_loop(n_steps, sequence_length, horizon, stride):
+    data = np.random.default_rng(n_steps).standard_normal(n_steps)
+    expected_X, expected_y = loop_windows(data, sequence_length, horizon, stride)
+
+    for copy in (False, True):
+        X, y = sliding_windows(data, sequence_length, horizon, stride, copy=copy)
+        np.testing.assert_array_equal(X, expected_X)
+        np.testing.assert_array_equal(y, expected_y)
+        assert X.flags.writeable == copy or len(X) == 0
+    assert len(expected_X) == num_windows(n_steps, sequence_length, horizon, stride)
+
+    X, y = torch_sliding_windows(data, sequence_length, horizon, stride)
+    np.testing.assert_allclose(X.numpy(), expected_X.astype(np.float32))
+    np.testing.assert_allclose(y.numpy(), expected_y.astype(np.float32))
+
+    batches = list(iter_window_batches(data, sequence_length, horizon, stride, batch_size=4))
+    if batches:
+        np.testing.assert_array_equal(np.concatenate([b[0] for b in batches]), expected_X)
+        np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), expected_y)
+    else:
+        assert len(expected_X) == 0
+
+
+@pytest.mark.parametrize("n_steps, sequence_length, horizon, stride", CASES)
+def test_multi_feature_and_multi_sensor_windows_match_loop(n_steps, sequence_length, horizon, stride):
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((n_steps, 3))
+    X, y = sliding_windows(features, sequence_length, horizon, stride)
+    expected_X, expected_y = loop_windows(features, sequence_length, horizon, stride)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+    sensors = rng.standard_normal((4, n_steps))
+    X, y = multi_sensor_windows(sensors, sequence_length, horizon, stride)
+    for i, row in enumerate(sensors):
+        expected_X, expected_y = loop_windows(row, sequence_length, horizon, stride)
+        np.testing.assert_array_equal(X[i], expected_X)
+        np.testing.assert_array_equal(y[i], expected_y)
+
+
+@pytest.mark.parametrize("n_steps, sequence_length", [(50, 12), (30, 24), (20, 24)])
+def test_create_sequences_wrappers_match_original_loops(n_steps, sequence_length):
+    data = np.arange(n_steps, dtype=np.float64) * 1.5
+    expected_X, expected_y = loop_windows(data, sequence_length)
+
+    X, y = TrafficDataPreprocessor(sequence_length=sequence_length).create_sequences(data)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+    assert X.flags.writeable and y.flags.writeable
+
+    X, y = DataProcessor().prepare_sequence_data(data, sequence_length=sequence_length)
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+    X[...] = 0  # 默认返回副本，写入不影响原数组
+    assert data[0] == 0 and data[-1] == (n_steps - 1) * 1.5
+
+    X, y = create_sequences(data, sequence_length)
+    assert isinstance(X, torch.Tensor) and X.dtype == torch.float32
+    np.testing.assert_allclose(X.numpy(), expected_X.astype(np.float32))
+    np.testing.assert_allclose(y.numpy(), expected_y.astype(np.float32))
+
+
+def test_memory_datasets_are_writable_and_use_sequence_length():
+    from models.train import build_memory_datasets
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)  # 只读数组转张量会发出 UserWarning
+        train_dataset, val_dataset, _ = build_memory_datasets(horizon=2)
+    X, y = train_dataset.tensors
+    assert X.shape[1:] == (1, 12) and y.shape[1:] == (2,)
+    X[0, 0, 0] = 1.0  # 可写
+